@@ -1,6 +1,7 @@
 # core/admin.py
 from django.contrib import admin
 from .models import ClienteLocal, Compra, Producto
+from . import busqueda
 
 
 @admin.register(ClienteLocal)
@@ -8,6 +9,13 @@ class ClienteLocalAdmin(admin.ModelAdmin):
     list_display = ('id', 'nombre_cliente', 'apellido_cliente', 'telefono_cliente', 'email_cliente')
     search_fields = ('nombre_cliente', 'apellido_cliente', 'dni', 'email_cliente')
 
+    # Usa el índice de trigramas en lugar de LIKE '%x%' sobre cada campo
+    def get_search_results(self, request, queryset, search_term):
+        if not busqueda.trigramas(search_term):
+            return queryset, False
+        ids = busqueda.ids_coincidentes('cliente_local', search_term)
+        return queryset.filter(pk__in=ids), False
+
 
 @admin.register(Compra)
 class CompraAdmin(admin.ModelAdmin):
@@ -0,0 +1,32 @@
+# core/authentication.py
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .perfiles import usuario_en_cache, guardar_usuario
+
+
+class JWTAuthenticationCache(JWTAuthentication):
+    """
+    JWTAuthentication que resuelve el Usuario desde la cache de core/perfiles.py
+    y solo va a la base cuando no está (o expiró).
+    """
+    def get_user(self, validated_token):
+        usuario_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = usuario_en_cache(usuario_id) if usuario_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            guardar_usuario(user)
+            return user
+
+        # Las mismas validaciones que hace JWTAuthentication sobre el usuario
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,319 @@
+# core/avisos.py
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import SolicitudContacto
+from .recursos import CupoHilos
+from .renderers import codificar, evento_sse
+from .serializer import SolicitudContactoSerializer
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------
+# Broker de avisos de solicitudes ###################################################################################
+# Reparte los eventos de SolicitudContacto (creada, aceptada, cancelada) a las
+# conexiones SSE abiertas. BrokerLocal reparte dentro del proceso (con varios
+# workers los streams además sondean, ver SOLICITUDES_SSE_SONDEO);
+# SOLICITUDES_BROKER = 'core.avisos.BrokerRedis' publica en un canal de Redis y
+# cada proceso reparte a sus conexiones.
+class Suscripcion:
+    """
+    Cola de eventos de una conexión. Si el cliente no da abasto y se llena
+    (SOLICITUDES_SSE_BUFFER), se descarta y la conexión reenvía el listado.
+    """
+    def __init__(self, broker):
+        self.broker = broker
+        self.desbordada = False
+        self._eventos = deque()
+        self._condicion = threading.Condition()
+        self._futuro = None
+
+    def entregar(self, evento):
+        with self._condicion:
+            if len(self._eventos) >= settings.SOLICITUDES_SSE_BUFFER:
+                self.desbordada = True
+            else:
+                self._eventos.append(evento)
+            futuro = self._despertar()
+        _resolver_en_su_loop(futuro)
+
+    def desbordar(self):
+        """
+        Los eventos se perdieron: la conexión tiene que reenviar el listado.
+        """
+        with self._condicion:
+            self.desbordada = True
+            futuro = self._despertar()
+        _resolver_en_su_loop(futuro)
+
+    def _despertar(self):
+        # con el lock tomado
+        self._condicion.notify()
+        futuro, self._futuro = self._futuro, None
+        return futuro
+
+    def _sacar(self):
+        # con el lock tomado
+        desbordada, self.desbordada = self.desbordada, False
+        if desbordada:
+            self._eventos.clear()
+            return DESBORDE
+        return self._eventos.popleft() if self._eventos else None
+
+    def siguiente(self, segundos):
+        """
+        Próximo evento, DESBORDE, o None si pasan `segundos` sin eventos.
+        """
+        with self._condicion:
+            self._condicion.wait_for(lambda: self._eventos or self.desbordada, timeout=segundos)
+            return self._sacar()
+
+    async def asiguiente(self, segundos):
+        with self._condicion:
+            if not self._eventos and not self.desbordada:
+                self._futuro = asyncio.get_running_loop().create_future()
+            futuro = self._futuro
+        if futuro is not None:
+            try:
+                await asyncio.wait_for(futuro, segundos)
+            except asyncio.TimeoutError:
+                pass
+        with self._condicion:
+            self._futuro = None
+            return self._sacar()
+
+    def cerrar(self):
+        self.broker.desuscribir(self)
+
+
+DESBORDE = object()
+
+
+def _resolver(futuro):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+def _resolver_en_su_loop(futuro):
+    if futuro is not None:
+        futuro.get_loop().call_soon_threadsafe(_resolver, futuro)
+
+
+class BrokerLocal:
+    def __init__(self):
+        self._suscripciones = set()
+        self._lock = threading.Lock()
+
+    def suscribir(self):
+        suscripcion = Suscripcion(self)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def conectados(self):
+        return len(self._suscripciones)
+
+    def publicar(self, evento):
+        self.repartir(evento)
+
+    def repartir(self, evento):
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            suscripcion.entregar(evento)
+
+
+class BrokerRedis(BrokerLocal):
+    """
+    Publica en el canal SOLICITUDES_BROKER_CANAL de SOLICITUDES_BROKER_URL; un
+    hilo por proceso escucha el canal (desde la primera suscripción) y reparte.
+    Requiere el paquete redis.
+    """
+    def __init__(self):
+        super().__init__()
+        import redis
+
+        self._redis = redis.Redis.from_url(settings.SOLICITUDES_BROKER_URL)
+        self._canal = settings.SOLICITUDES_BROKER_CANAL
+        self._hilo = None
+
+    def publicar(self, evento):
+        try:
+            self._redis.publish(self._canal, orjson.dumps(evento))
+        except Exception:
+            # corre en on_commit: el cambio ya se confirmó, solo se pierde el aviso
+            logger.exception("No se pudo publicar el aviso de solicitud en Redis")
+
+    def suscribir(self):
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._escuchar, name='avisos-redis', daemon=True)
+                self._hilo.start()
+        return super().suscribir()
+
+    def _desbordar_todas(self):
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            suscripcion.desbordar()
+
+    def _escuchar(self):
+        caido = False
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._canal)
+                if caido:
+                    # lo publicado mientras no hubo conexión se perdió: reenviar el listado
+                    self._desbordar_todas()
+                    caido = False
+                for mensaje in pubsub.listen():
+                    self.repartir(orjson.loads(mensaje['data']))
+            except Exception:
+                if not caido:
+                    logger.exception("Se perdió la conexión con Redis (avisos de solicitudes)")
+                    self._desbordar_todas()
+                caido = True
+                time.sleep(1)
+
+
+@lru_cache(maxsize=None)
+def broker():
+    return import_string(settings.SOLICITUDES_BROKER)()
+
+
+# --------------------
+# Publicación #######################################################################################################
+# Las señales publican al confirmar la transacción: una solicitud que se
+# revierte no llega a los vendedores.
+def publicar(tipo, solicitud):
+    evento = {
+        'tipo': tipo,
+        'usuario': solicitud.usuario_id,
+        # ya en tipos JSON (fechas como las devuelve la API): se puede mandar por Redis
+        'solicitud': orjson.loads(codificar(SolicitudContactoSerializer(solicitud).data)),
+    }
+    transaction.on_commit(lambda: broker().publicar(evento))
+
+
+# --------------------
+# Stream SSE ########################################################################################################
+# Al conectarse se envía `pendientes` (el mismo listado que
+# /solicitudes/pendientes/) y después `creada`, `aceptada` y `cancelada` a
+# medida que ocurren; cada SOLICITUDES_SSE_LATIDO segundos un comentario
+# mantiene viva la conexión. A los SOLICITUDES_SSE_DURACION segundos se cierra
+# y EventSource reconecta solo (recibe otra vez el listado). Con
+# SOLICITUDES_SSE_SONDEO el latido consulta el listado y, si cambió, lo envía
+# como `pendientes` en lugar del comentario. Un evento puede
+# llegar después de que su solicitud ya figure en `pendientes`: el cliente
+# actualiza por id.
+def pendientes(usuario):
+    if usuario.rol.lower() == 'vendedor':
+        solicitudes = SolicitudContacto.objects.filter(estado='pendiente')
+    else:
+        solicitudes = SolicitudContacto.objects.filter(usuario=usuario)
+    return SolicitudContactoSerializer(solicitudes.order_by('-fecha_creacion'), many=True).data
+
+
+def _visible(evento, usuario):
+    return usuario.rol.lower() == 'vendedor' or evento['usuario'] == usuario.pk
+
+
+def _latido(usuario, enviado):
+    """
+    (bytes, listado enviado) para un intervalo sin eventos.
+    """
+    if settings.SOLICITUDES_SSE_SONDEO:
+        listado = pendientes(usuario)
+        if listado != enviado:
+            return evento_sse('pendientes', listado), listado
+    return b': latido\n\n', enviado
+
+
+def _inicio():
+    return f"retry: {settings.SOLICITUDES_SSE_REINTENTO_MS}\n\n".encode()
+
+
+# Bajo WSGI cada conexión ocupa un hilo del worker durante todo el stream: se
+# admiten hasta SOLICITUDES_SSE_MAX_WSGI por proceso, para que los streams no
+# dejen sin hilos al resto de la API. El resto pasa a sondeo (instantanea()).
+# El long-poll de core/cambios.py usa otro cupo igual (CAMBIOS_ESPERA_MAX_WSGI).
+hilos_sse = CupoHilos('SOLICITUDES_SSE_MAX_WSGI')
+
+
+def instantanea(usuario):
+    """
+    Respuesta SSE completa cuando no hay cupo: el listado y un `retry` largo.
+    EventSource vuelve a conectar solo a los SOLICITUDES_SSE_SONDEO_MS, así el
+    cliente queda sondeando sin cambios de código hasta que haya lugar.
+    """
+    return f"retry: {settings.SOLICITUDES_SSE_SONDEO_MS}\n\n".encode() + evento_sse('pendientes', pendientes(usuario))
+
+
+def flujo(usuario, suscripcion, listado):
+    """
+    Bytes del stream SSE a partir de lo que devuelve conectar(). Libera el
+    lugar en hilos_sse que la vista tomó antes de conectar.
+    """
+    try:
+        yield _inicio() + evento_sse('pendientes', listado)
+        fin = time.monotonic() + settings.SOLICITUDES_SSE_DURACION
+        while time.monotonic() < fin:
+            evento = suscripcion.siguiente(min(settings.SOLICITUDES_SSE_LATIDO, fin - time.monotonic()))
+            if evento is DESBORDE:
+                listado = pendientes(usuario)
+                yield evento_sse('pendientes', listado)
+            elif evento is None:
+                contenido, listado = _latido(usuario, listado)
+                yield contenido
+            elif _visible(evento, usuario):
+                yield evento_sse(evento['tipo'], evento['solicitud'])
+    finally:
+        suscripcion.cerrar()
+        hilos_sse.liberar()
+
+
+async def aflujo(usuario, suscripcion, listado):
+    """
+    Igual que flujo() para ASGI: la espera no ocupa un hilo por conexión.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        yield _inicio() + evento_sse('pendientes', listado)
+        fin = loop.time() + settings.SOLICITUDES_SSE_DURACION
+        while loop.time() < fin:
+            evento = await suscripcion.asiguiente(min(settings.SOLICITUDES_SSE_LATIDO, fin - loop.time()))
+            if evento is DESBORDE:
+                listado = await sync_to_async(pendientes)(usuario)
+                yield evento_sse('pendientes', listado)
+            elif evento is None:
+                contenido, listado = await sync_to_async(_latido)(usuario, listado)
+                yield contenido
+            elif _visible(evento, usuario):
+                yield evento_sse(evento['tipo'], evento['solicitud'])
+    finally:
+        suscripcion.cerrar()
+
+
+def conectar(usuario):
+    """
+    (suscripción, listado inicial) para flujo() / aflujo(). La suscripción se
+    toma antes de consultar: nada de lo que pase entre uno y otro se pierde.
+    """
+    suscripcion = broker().suscribir()
+    return suscripcion, pendientes(usuario)
@@ -4,12 +4,20 @@ from .models import Usuario
 
 class EmailBackend(ModelBackend):
     """
-    Permite autenticar usando email en lugar de username (usado por Django por defecto)
+    Permite autenticar usando email en lugar de username (usado por Django por defecto).
+    Es el único backend configurado: hereda los permisos de ModelBackend y
+    acepta `username` para el login del admin, así cada login hashea una sola vez.
     """
-    def authenticate(self, request, email=None, password=None, **kwargs):
+    def authenticate(self, request, email=None, password=None, username=None, **kwargs):
+        if email is None:
+            email = username
+        if email is None or password is None:
+            return None
         try:
             user = Usuario.objects.get(email=email)
         except Usuario.DoesNotExist:
+            # Mismo costo que un login con usuario existente (evita distinguir por tiempo)
+            Usuario().set_password(password)
             return None
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
@@ -0,0 +1,78 @@
+# core/benchmarks/carga.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+# --------------------
+# Prueba de carga HTTP ##############################################################################################
+# Golpea un servidor ya levantado (gunicorn WSGI o ASGI) con N clientes
+# concurrentes; cada hilo reutiliza su propia sesión keep-alive.
+RUTAS_PUBLICAS = (
+    '/api/productos/promocion/',
+    '/api/compras/estado/?dni={dni}',
+    '/api/graphql/',
+)
+
+CONSULTA_GRAPHQL = (
+    'query($dni: Int!) { comprasPorClienteMovilLocal(dni: $dni) '
+    '{ id fecha vendedor { id } productos { cantidad producto { id nombreProducto } } envio { empresaFlete } venta { id } } }'
+)
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class Carga:
+    def __init__(self, base_url, concurrencia=20, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.concurrencia = concurrencia
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _sesion(self):
+        if not hasattr(self._local, 'sesion'):
+            self._local.sesion = requests.Session()
+        return self._local.sesion
+
+    def _pedir(self, ruta, dni):
+        url = self.base_url + ruta.format(dni=dni)
+        inicio = time.perf_counter()
+        try:
+            if ruta == '/api/graphql/':
+                respuesta = self._sesion().post(
+                    url, json={'query': CONSULTA_GRAPHQL, 'variables': {'dni': int(dni)}}, timeout=self.timeout
+                )
+            else:
+                respuesta = self._sesion().get(url, timeout=self.timeout)
+            ok = respuesta.status_code < 500
+        except requests.RequestException:
+            ok = False
+        return (time.perf_counter() - inicio) * 1000, ok
+
+    def correr(self, ruta, cantidad, dni):
+        """
+        Ejecuta `cantidad` requests a la ruta y retorna throughput y latencias (ms).
+        """
+        self._pedir(ruta, dni)  # calentamiento
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as pool:
+            resultados = list(pool.map(lambda _: self._pedir(ruta, dni), range(cantidad)))
+        duracion = time.perf_counter() - inicio
+
+        tiempos = [ms for ms, ok in resultados if ok]
+        return {
+            'ruta': ruta,
+            'requests': cantidad,
+            'errores': cantidad - len(tiempos),
+            'req_s': round(cantidad / duracion, 1),
+            'p50': round(percentil(tiempos, 50), 2),
+            'p95': round(percentil(tiempos, 95), 2),
+            'p99': round(percentil(tiempos, 99), 2),
+        }
@@ -0,0 +1,197 @@
+# core/benchmarks/datos.py
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    Rubro, Producto, Proveedor, ProductoProveedor, Usuario, Cliente, Vendedor, ClienteMovilLocal,
+    ClienteLocal, Compra, CompraProducto, Venta, VentaLocal, SolicitudContacto
+)
+from core.catalogo import invalidar_catalogo
+from core.consultas_graphql import invalidar_resultados
+from core import busqueda, reportes
+
+
+# --------------------
+# Datos de prueba reproducibles #####################################################################################
+# Volúmenes por unidad de escala; con la misma semilla se generan los mismos
+# datos. Todo va por bulk_create (sin señales), así que al final se
+# reconstruyen los resúmenes y el índice de búsqueda y se invalidan el
+# catálogo y los resultados de GraphQL.
+VOLUMENES = {
+    'rubros': 20,
+    'productos': 2000,
+    'vendedores': 10,
+    'clientes': 100,
+    'clientes_moviles': 2000,
+    'clientes_locales': 1000,
+    'compras': 5000,
+    'ventas_locales': 3000,
+    'solicitudes': 500,
+}
+PASSWORD = 'bench-password'
+DIAS_HISTORIA = 365
+DOMINIO = 'bench.example.com'
+
+NOMBRES = ('Juan', 'María', 'Lucía', 'Martín', 'Sofía', 'Diego', 'Camila', 'Pablo', 'Valentina', 'Tomás')
+APELLIDOS = ('González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez', 'Pérez', 'Romero', 'Sosa')
+RUBROS = ('Cascos', 'Cubiertas', 'Aceites', 'Frenos', 'Transmisión', 'Iluminación', 'Escapes', 'Filtros',
+          'Baterías', 'Indumentaria')
+PRODUCTOS = ('Casco', 'Cubierta', 'Aceite', 'Pastilla de freno', 'Kit de arrastre', 'Faro', 'Escape',
+             'Filtro de aire', 'Batería', 'Campera', 'Guantes', 'Espejo', 'Bujía', 'Cadena', 'Manubrio')
+MARCAS = ('Honda', 'Yamaha', 'Motomel', 'Zanella', 'Corven', 'Gilera', 'Bajaj', 'Suzuki')
+
+
+def base_local():
+    # nunca sembrar sobre la base de producción por error
+    base = settings.DATABASES['default']
+    return 'sqlite' in base['ENGINE'] or base.get('HOST', '') in ('', 'localhost', '127.0.0.1')
+
+
+def _cantidades(escala):
+    return {nombre: max(1, int(cantidad * escala)) for nombre, cantidad in VOLUMENES.items()}
+
+
+def _ids(model, **filtros):
+    # bulk_create no devuelve pk en MySQL
+    return list(model.objects.filter(**filtros).order_by('pk').values_list('pk', flat=True))
+
+
+def _repartir_fechas(model, campo, ids, azar):
+    """
+    auto_now_add pisa la fecha en bulk_create: se reparte después con un
+    UPDATE por día.
+    """
+    ahora = timezone.now()
+    por_dia = {}
+    for pk in ids:
+        por_dia.setdefault(azar.randrange(DIAS_HISTORIA), []).append(pk)
+    for dias, pks in por_dia.items():
+        for inicio in range(0, len(pks), 500):
+            model.objects.filter(pk__in=pks[inicio:inicio + 500]).update(**{campo: ahora - timedelta(days=dias)})
+
+
+def _nombre(azar):
+    return azar.choice(NOMBRES), azar.choice(APELLIDOS)
+
+
+def sembrar(escala=1.0, semilla=42, lote=2000):
+    """
+    Carga los datos de prueba y retorna {tabla: filas creadas}.
+    """
+    azar = random.Random(semilla)
+    n = _cantidades(escala)
+    password = make_password(PASSWORD)  # un solo hash para todos los usuarios
+
+    with transaction.atomic():
+        Rubro.objects.bulk_create([
+            Rubro(nombre_rubro=f'{RUBROS[i % len(RUBROS)]} {i // len(RUBROS) + 1}') for i in range(n['rubros'])
+        ], ignore_conflicts=True)
+        rubros = _ids(Rubro)
+
+        proveedor, _ = Proveedor.objects.get_or_create(
+            email=f'proveedor@{DOMINIO}', defaults={'nombre_proveedor': 'Bench', 'telefono': '0', 'domicilio': '-'}
+        )
+        productos = [
+            Producto(
+                id_rubro_id=azar.choice(rubros),
+                nombre_producto=f'{azar.choice(PRODUCTOS)} {azar.choice(MARCAS)} {i}',
+                descripcion=f'{azar.choice(PRODUCTOS)} para {azar.choice(MARCAS)}',
+                precio=Decimal(azar.randrange(1000, 500000)) / 100,
+                stock_actual=azar.randrange(0, 200),
+                en_promocion=azar.random() < 0.1,
+            )
+            for i in range(n['productos'])
+        ]
+        Producto.objects.bulk_create(productos, batch_size=lote)
+        productos = list(Producto.objects.order_by('pk').values_list('pk', 'precio'))
+        ProductoProveedor.objects.bulk_create([
+            ProductoProveedor(id_proveedor=proveedor, id_producto_id=pk) for pk, _ in productos
+        ], batch_size=lote, ignore_conflicts=True)
+
+        Usuario.objects.bulk_create([
+            Usuario(email=f'vendedor{i}@{DOMINIO}', rol='vendedor', password=password) for i in range(n['vendedores'])
+        ] + [
+            Usuario(email=f'cliente{i}@{DOMINIO}', rol='cliente', password=password) for i in range(n['clientes'])
+        ], ignore_conflicts=True)
+        usuarios = dict(Usuario.objects.filter(email__endswith=f'@{DOMINIO}').values_list('email', 'pk'))
+        Vendedor.objects.bulk_create([
+            Vendedor(id_usuario_id=usuarios[f'vendedor{i}@{DOMINIO}'], nombre_vendedor=nombre,
+                     apellido_vendedor=apellido, email_vendedor=f'vendedor{i}@{DOMINIO}', zona='Centro')
+            for i, (nombre, apellido) in ((i, _nombre(azar)) for i in range(n['vendedores']))
+        ], ignore_conflicts=True)
+        vendedores = _ids(Vendedor, email_vendedor__endswith=f'@{DOMINIO}')
+        Cliente.objects.bulk_create([
+            Cliente(id_usuario_id=usuarios[f'cliente{i}@{DOMINIO}'], nombre_cliente=nombre, apellido_cliente=apellido,
+                    email_cliente=f'cliente{i}@{DOMINIO}', dni_cliente=f'B{semilla}-{i}')
+            for i, (nombre, apellido) in ((i, _nombre(azar)) for i in range(n['clientes']))
+        ], ignore_conflicts=True)
+
+        existentes_moviles = ClienteMovilLocal.objects.count()
+        ClienteMovilLocal.objects.bulk_create([
+            ClienteMovilLocal(nombre_cliente_movil_local=nombre, apellido_cliente_movil_local=apellido,
+                              dni_cliente_movil_local=str(20000000 + i))
+            for i, (nombre, apellido) in ((i, _nombre(azar)) for i in range(n['clientes_moviles']))
+        ], batch_size=lote)
+        moviles = _ids(ClienteMovilLocal)[existentes_moviles:]
+        ClienteLocal.objects.bulk_create([
+            ClienteLocal(nombre_cliente=nombre, apellido_cliente=apellido, dni=str(30000000 + i),
+                         email_cliente=f'local{i}@{DOMINIO}')
+            for i, (nombre, apellido) in ((i, _nombre(azar)) for i in range(n['clientes_locales']))
+        ], batch_size=lote)
+        locales = _ids(ClienteLocal, email_cliente__endswith=f'@{DOMINIO}')
+
+        existentes_compras = Compra.objects.count()
+        Compra.objects.bulk_create([
+            Compra(id_cliente_movil_local_id=azar.choice(moviles), id_vendedor_id=azar.choice(vendedores),
+                   estado=azar.choice(('pendiente', 'en_proceso', 'completada', 'completada', 'cancelada')))
+            for _ in range(n['compras'])
+        ], batch_size=lote)
+        compras = _ids(Compra)[existentes_compras:]
+        _repartir_fechas(Compra, 'fecha', compras, azar)
+
+        lineas, totales = [], {}
+        for compra_id in compras:
+            for producto_id, precio in azar.sample(productos, azar.randint(1, 4)):
+                cantidad = azar.randint(1, 3)
+                lineas.append(CompraProducto(id_compra_id=compra_id, id_producto_id=producto_id,
+                                             cantidad=cantidad, precio_unitario=precio))
+                totales[compra_id] = totales.get(compra_id, 0) + cantidad * precio
+        CompraProducto.objects.bulk_create(lineas, batch_size=lote)
+
+        vendidas = [compra_id for compra_id in compras if azar.random() < 0.6]
+        Venta.objects.bulk_create([
+            Venta(id_compra_id=compra_id, id_vendedor_id=azar.choice(vendedores), monto_total=totales[compra_id])
+            for compra_id in vendidas
+        ], batch_size=lote)
+        _repartir_fechas(Venta, 'fecha_venta', _ids(Venta, id_compra_id__in=vendidas), azar)
+
+        existentes_ventas_locales = VentaLocal.objects.count()
+        VentaLocal.objects.bulk_create([
+            VentaLocal(id_cliente_local_id=azar.choice(locales) if azar.random() < 0.8 else None,
+                       id_vendedor_id=azar.choice(vendedores), monto_total=Decimal(azar.randrange(1000, 90000)) / 100)
+            for _ in range(n['ventas_locales'])
+        ], batch_size=lote)
+        _repartir_fechas(VentaLocal, 'fecha_venta', _ids(VentaLocal)[existentes_ventas_locales:], azar)
+
+        clientes = [usuarios[f'cliente{i}@{DOMINIO}'] for i in range(n['clientes'])]
+        SolicitudContacto.objects.bulk_create([
+            SolicitudContacto(usuario_id=azar.choice(clientes),
+                              estado=azar.choice(('pendiente', 'pendiente', 'aceptada', 'cancelada')))
+            for _ in range(n['solicitudes'])
+        ], batch_size=lote)
+
+    reportes.reconstruir_resumenes()
+    busqueda.reindexar()
+    invalidar_catalogo()
+    invalidar_resultados()
+    return {
+        'productos': n['productos'], 'compras': n['compras'], 'lineas': len(lineas), 'ventas': len(vendidas),
+        'ventas_locales': n['ventas_locales'], 'clientes_moviles': n['clientes_moviles'],
+        'solicitudes': n['solicitudes'],
+    }
@@ -0,0 +1,289 @@
+# core/benchmarks/suite.py
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .carga import CONSULTA_GRAPHQL, percentil
+from .datos import PASSWORD, DOMINIO, PRODUCTOS, MARCAS, _cantidades
+
+
+# --------------------
+# Escenarios ########################################################################################################
+# Cada escenario es un request (método, ruta, cuerpo) con parámetros que se
+# sortean por request (dni, término de búsqueda) sobre los datos de
+# core.benchmarks.datos. Los autenticados usan el token de un vendedor.
+class Escenario:
+    def __init__(self, metodo, ruta, cuerpo=None, autenticado=False):
+        self.metodo = metodo
+        self.ruta = ruta
+        self.cuerpo = cuerpo
+        self.autenticado = autenticado
+
+    def request(self, azar, parametros):
+        valores = {nombre: azar.choice(opciones) for nombre, opciones in parametros.items()}
+        cuerpo = self.cuerpo(valores) if callable(self.cuerpo) else self.cuerpo
+        return self.metodo, self.ruta.format(**valores), cuerpo
+
+
+CONSULTA_GRAPHQL_PAGINADA = (
+    'query($dni: String) { compras(dni: $dni, first: 20) { edges { node { id fecha vendedor { id } '
+    'productos { cantidad producto { id nombreProducto } } } } pageInfo { endCursor hasNextPage } } }'
+)
+
+
+def _hoy_menos(dias):
+    return (date.today() - timedelta(days=dias)).isoformat()
+
+
+# los listados piden la primera página (sin page_size responden el array completo)
+ESCENARIOS = {
+    'productos': Escenario('GET', '/api/productos/?page_size=100'),
+    'promocion': Escenario('GET', '/api/productos/promocion/'),
+    'compras': Escenario('GET', '/api/compras/?page_size=100'),
+    'estado_compra': Escenario('GET', '/api/compras/estado/?dni={dni}'),
+    'ventas_locales': Escenario('GET', '/api/ventas_locales/?page_size=100'),
+    'busqueda': Escenario('GET', '/api/search/?q={termino}'),
+    'reporte_ventas': Escenario(
+        'GET', f'/api/reportes/ventas/?periodo=mes&desde={_hoy_menos(365)}&hasta={_hoy_menos(0)}', autenticado=True
+    ),
+    'solicitudes': Escenario('GET', '/api/solicitudes/pendientes/', autenticado=True),
+    'graphql': Escenario(
+        'POST', '/api/graphql/', lambda v: {'query': CONSULTA_GRAPHQL, 'variables': {'dni': int(v['dni'])}}
+    ),
+    'graphql_paginado': Escenario(
+        'POST', '/api/graphql/', lambda v: {'query': CONSULTA_GRAPHQL_PAGINADA, 'variables': {'dni': v['dni']}}
+    ),
+    'cambios': Escenario('GET', '/api/changes/?since=0&dni={dni}'),
+    'sincronizacion': Escenario('GET', '/api/sync/?limite=200', autenticado=True),
+    'login': Escenario('POST', '/api/token/', lambda v: {'email': v['email'], 'password': PASSWORD}),
+}
+
+
+def parametros(escala=1.0):
+    """
+    Valores que se sortean en las rutas; coinciden con los que genera datos.sembrar.
+    """
+    n = _cantidades(escala)
+    return {
+        'dni': [str(20000000 + i) for i in range(n['clientes_moviles'])],
+        'termino': [p.lower() for p in PRODUCTOS] + [m.lower() for m in MARCAS] + ['casko', 'yamah', 'filtro aire'],
+        'email': [f'cliente{i}@{DOMINIO}' for i in range(n['clientes'])],
+    }
+
+
+# --------------------
+# Clientes ##########################################################################################################
+# Ambos responden (estado, consultas, tiempo_db_ms); consultas y tiempo de
+# base salen de las cabeceras de MetricasMiddleware (METRICAS_CABECERAS) y
+# quedan en None si el servidor no las envía.
+def _cabeceras_metricas(cabeceras):
+    consultas = cabeceras.get('X-Consultas')
+    tiempo_db = cabeceras.get('X-Tiempo-DB')
+    return (int(consultas) if consultas is not None else None,
+            float(tiempo_db) if tiempo_db is not None else None)
+
+
+class ClienteEnProceso:
+    """
+    django.test.Client contra este mismo proceso (sin servidor ni red); mide
+    la aplicación sin gunicorn.
+    """
+    nombre = 'en_proceso'
+
+    def __init__(self):
+        from django.test import Client
+
+        self._local = threading.local()
+        self._clase = Client
+
+    def _cliente(self):
+        if not hasattr(self._local, 'cliente'):
+            self._local.cliente = self._clase(raise_request_exception=False)
+        return self._local.cliente
+
+    def pedir(self, metodo, ruta, cuerpo=None, token=None):
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        if metodo == 'POST':
+            respuesta = self._cliente().post(ruta, cuerpo, content_type='application/json', **extra)
+        else:
+            respuesta = self._cliente().get(ruta, **extra)
+        if getattr(respuesta, 'streaming', False):
+            b''.join(respuesta.streaming_content)
+        return (respuesta.status_code, *_cabeceras_metricas(respuesta.headers)), respuesta
+
+    def cerrar_hilo(self):
+        connections.close_all()
+
+
+class ClienteHTTP:
+    """
+    requests.Session keep-alive por hilo contra un servidor ya levantado.
+    """
+    nombre = 'http'
+
+    def __init__(self, base_url, timeout=30):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._requests = requests
+        self._local = threading.local()
+
+    def _sesion(self):
+        if not hasattr(self._local, 'sesion'):
+            self._local.sesion = self._requests.Session()
+        return self._local.sesion
+
+    def pedir(self, metodo, ruta, cuerpo=None, token=None):
+        cabeceras = {'Authorization': f'Bearer {token}'} if token else {}
+        try:
+            respuesta = self._sesion().request(
+                metodo, self.base_url + ruta, json=cuerpo, headers=cabeceras, timeout=self.timeout
+            )
+        except self._requests.RequestException:
+            return (0, None, None), None
+        return (respuesta.status_code, *_cabeceras_metricas(respuesta.headers)), respuesta
+
+    def cerrar_hilo(self):
+        pass
+
+
+def obtener_token(cliente, email=f'vendedor0@{DOMINIO}'):
+    (estado, _, _), respuesta = cliente.pedir('POST', '/api/token/', {'email': email, 'password': PASSWORD})
+    if estado != 200:
+        return None
+    return respuesta.json()['access']
+
+
+# --------------------
+# Corrida ###########################################################################################################
+def _estadisticas(resultados, duracion):
+    tiempos = [ms for ms, estado, _, _ in resultados if 200 <= estado < 400]
+    consultas = [c for _, _, c, _ in resultados if c is not None]
+    tiempos_db = [t for _, _, _, t in resultados if t is not None]
+    return {
+        'requests': len(resultados),
+        'errores': len(resultados) - len(tiempos),
+        'req_s': round(len(resultados) / duracion, 1) if duracion else None,
+        'p50': round(percentil(tiempos, 50), 2),
+        'p95': round(percentil(tiempos, 95), 2),
+        'p99': round(percentil(tiempos, 99), 2),
+        'consultas_promedio': round(sum(consultas) / len(consultas), 2) if consultas else None,
+        'db_ms_promedio': round(sum(tiempos_db) / len(tiempos_db), 2) if tiempos_db else None,
+    }
+
+
+class Suite:
+    def __init__(self, cliente, concurrencia=10, requests=200, semilla=42, escala=1.0):
+        self.cliente = cliente
+        self.concurrencia = concurrencia
+        self.requests = requests
+        self.semilla = semilla
+        self.escala = escala
+        self.parametros = parametros(escala)
+        self.token = None
+
+    def _pedir(self, escenario, azar):
+        metodo, ruta, cuerpo = escenario.request(azar, self.parametros)
+        inicio = time.perf_counter()
+        (estado, consultas, tiempo_db), _ = self.cliente.pedir(
+            metodo, ruta, cuerpo, self.token if escenario.autenticado else None
+        )
+        return (time.perf_counter() - inicio) * 1000, estado, consultas, tiempo_db
+
+    def _hilo(self, escenario, numero, cantidad):
+        # cada hilo sortea con su propia semilla: misma secuencia en cada corrida
+        azar = random.Random(f'{self.semilla}-{numero}')
+        try:
+            return [self._pedir(escenario, azar) for _ in range(cantidad)]
+        finally:
+            self.cliente.cerrar_hilo()
+
+    def correr_escenario(self, nombre):
+        escenario = ESCENARIOS[nombre]
+        if escenario.autenticado and self.token is None:
+            self.token = obtener_token(self.cliente)
+        self._hilo(escenario, 'calentamiento', min(10, self.requests))
+
+        por_hilo = [self.requests // self.concurrencia] * self.concurrencia
+        for i in range(self.requests % self.concurrencia):
+            por_hilo[i] += 1
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as pool:
+            partes = list(pool.map(lambda i: self._hilo(escenario, i, por_hilo[i]), range(self.concurrencia)))
+        duracion = time.perf_counter() - inicio
+        return _estadisticas([r for parte in partes for r in parte], duracion)
+
+    def correr(self, escenarios=None):
+        return {nombre: self.correr_escenario(nombre) for nombre in (escenarios or ESCENARIOS)}
+
+
+# --------------------
+# Reporte ###########################################################################################################
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def reporte(suite, resultados, url=None):
+    return {
+        'meta': {
+            'commit': _commit(),
+            'fecha': timezone.now().isoformat(timespec='seconds'),
+            'cliente': suite.cliente.nombre,
+            'url': url,
+            'concurrencia': suite.concurrencia,
+            'requests': suite.requests,
+            'semilla': suite.semilla,
+            'escala': suite.escala,
+            'base': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'servidor_modo': 'asgi' if settings.SERVIDOR_ASGI else 'wsgi',
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'escenarios': resultados,
+    }
+
+
+# Para cada métrica, si "más es mejor"
+METRICAS_COMPARADAS = {
+    'req_s': True, 'p50': False, 'p95': False, 'p99': False, 'consultas_promedio': False,
+}
+
+
+def comparar(base, actual, umbral=10.0):
+    """
+    Filas (escenario, métrica, base, actual, variación %, empeoró) entre dos
+    reportes; empeoró cuando la variación en contra supera `umbral` %.
+    """
+    filas = []
+    for nombre, datos in actual['escenarios'].items():
+        anteriores = base['escenarios'].get(nombre)
+        if anteriores is None:
+            continue
+        for metrica, mas_es_mejor in METRICAS_COMPARADAS.items():
+            antes, ahora = anteriores.get(metrica), datos.get(metrica)
+            if antes is None or ahora is None:
+                continue
+            variacion = (ahora - antes) / antes * 100 if antes else (0.0 if ahora == antes else 100.0)
+            en_contra = -variacion if mas_es_mejor else variacion
+            if metrica == 'consultas_promedio':
+                # cualquier consulta de más es una regresión
+                empeoro = ahora > antes
+            else:
+                empeoro = en_contra > umbral
+            filas.append((nombre, metrica, antes, ahora, round(variacion, 1), empeoro))
+    return filas
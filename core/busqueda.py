@@ -0,0 +1,180 @@
+# core/busqueda.py
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Producto, Cliente, ClienteLocal, IndiceBusqueda, TrigramaBusqueda
+from .serializer import ProductoSerializer, ClienteSerializer, ClienteLocalSerializer
+from .optimizacion import optimizar_queryset
+
+
+# --------------------
+# Búsqueda por trigramas ############################################################################################
+# El texto se normaliza (minúsculas, sin acentos, solo letras y números) y
+# cada palabra se parte en trigramas con relleno, como pg_trgm: "moto" ->
+# "  m", " mo", "mot", "oto", "to ". Una consulta con un error de tipeo o
+# incompleta (prefijo) sigue compartiendo la mayoría de sus trigramas con el
+# texto buscado, y el puntaje es la fracción de trigramas de la consulta que
+# aparecen en la entrada.
+INDEXADOS = {
+    'producto': (Producto, ('nombre_producto', 'descripcion'), ProductoSerializer),
+    'cliente': (Cliente, ('nombre_cliente', 'apellido_cliente', 'dni_cliente', 'email_cliente'), ClienteSerializer),
+    'cliente_local': (ClienteLocal, ('nombre_cliente', 'apellido_cliente', 'dni', 'email_cliente'), ClienteLocalSerializer),
+}
+TIPO_POR_MODELO = {model: tipo for tipo, (model, _, _) in INDEXADOS.items()}
+
+SIMILITUD_MINIMA = 0.5
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return ' '.join(re.findall(r'[a-z0-9]+', texto.lower()))
+
+
+def trigramas(texto):
+    resultado = set()
+    for palabra in normalizar(texto).split():
+        relleno = f'  {palabra} '
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+
+def texto_de(tipo, instancia):
+    _, campos, _ = INDEXADOS[tipo]
+    return normalizar(' '.join(str(getattr(instancia, campo) or '') for campo in campos))
+
+
+def _filas_trigramas(entrada, tipo):
+    return [
+        TrigramaBusqueda(trigrama=trigrama, tipo=tipo, entrada=entrada)
+        for trigrama in trigramas(entrada.texto)
+    ]
+
+
+# --------------------
+# Mantenimiento del índice ##########################################################################################
+def indexar(instancia):
+    tipo = TIPO_POR_MODELO[type(instancia)]
+    texto = texto_de(tipo, instancia)
+    with transaction.atomic():
+        entrada, creada = IndiceBusqueda.objects.get_or_create(
+            tipo=tipo, objeto_id=instancia.pk, defaults={'texto': texto}
+        )
+        if not creada:
+            if entrada.texto == texto:
+                return
+            entrada.texto = texto
+            entrada.trigramas.all().delete()
+        filas = _filas_trigramas(entrada, tipo)
+        entrada.cantidad_trigramas = len(filas)
+        entrada.save(update_fields=['texto', 'cantidad_trigramas'])
+        TrigramaBusqueda.objects.bulk_create(filas)
+
+
+def desindexar(model, objeto_id):
+    IndiceBusqueda.objects.filter(tipo=TIPO_POR_MODELO[model], objeto_id=objeto_id).delete()
+
+
+def _indexar_instancias(tipo, instancias):
+    entradas = []
+    for instancia in instancias:
+        texto = texto_de(tipo, instancia)
+        entradas.append(IndiceBusqueda(
+            tipo=tipo, objeto_id=instancia.pk, texto=texto, cantidad_trigramas=len(trigramas(texto))
+        ))
+    IndiceBusqueda.objects.bulk_create(entradas)
+    # bulk_create no devuelve pk en MySQL: se releen por objeto_id
+    entradas = IndiceBusqueda.objects.filter(tipo=tipo, objeto_id__in=[instancia.pk for instancia in instancias])
+    TrigramaBusqueda.objects.bulk_create(
+        [fila for entrada in entradas for fila in _filas_trigramas(entrada, tipo)], batch_size=2000
+    )
+
+
+def indexar_ids(model, ids, lote=500):
+    """
+    Para altas / modificaciones en bloque (bulk_create / update no disparan señales).
+    """
+    tipo = TIPO_POR_MODELO[model]
+    _, campos, _ = INDEXADOS[tipo]
+    ids = list(ids)
+    for inicio in range(0, len(ids), lote):
+        parte = ids[inicio:inicio + lote]
+        with transaction.atomic():
+            IndiceBusqueda.objects.filter(tipo=tipo, objeto_id__in=parte).delete()
+            _indexar_instancias(tipo, list(model.objects.filter(pk__in=parte).only('pk', *campos)))
+
+
+def reindexar(tipos=None, lote=500):
+    """
+    Reconstruye el índice de los tipos indicados (todos por defecto). Retorna las entradas creadas.
+    """
+    total = 0
+    for tipo in tipos or INDEXADOS:
+        model, campos, _ = INDEXADOS[tipo]
+        with transaction.atomic():
+            IndiceBusqueda.objects.filter(tipo=tipo).delete()
+            ultimo = 0
+            while True:
+                instancias = list(model.objects.filter(pk__gt=ultimo).order_by('pk').only('pk', *campos)[:lote])
+                if not instancias:
+                    break
+                _indexar_instancias(tipo, instancias)
+                total += len(instancias)
+                ultimo = instancias[-1].pk
+    return total
+
+
+# --------------------
+# Consultas #########################################################################################################
+def candidatos(consulta, tipos, similitud_minima=SIMILITUD_MINIMA):
+    """
+    Queryset de {'entrada', 'comunes'} ordenado por relevancia: más trigramas
+    en común con la consulta y, a igualdad, textos más cortos (más específicos).
+    """
+    buscados = trigramas(consulta)
+    if not buscados:
+        return TrigramaBusqueda.objects.none().values('entrada')
+    minimo = max(1, int(len(buscados) * similitud_minima + 0.999))
+    return TrigramaBusqueda.objects.filter(
+        trigrama__in=buscados, tipo__in=tipos
+    ).values('entrada').annotate(
+        comunes=Count('id')
+    ).filter(comunes__gte=minimo).order_by('-comunes', 'entrada__cantidad_trigramas', 'entrada')
+
+
+def ids_coincidentes(tipo, consulta, limite=1000):
+    entradas = [fila['entrada'] for fila in candidatos(consulta, [tipo])[:limite]]
+    return list(IndiceBusqueda.objects.filter(id__in=entradas).values_list('objeto_id', flat=True))
+
+
+def resultados(filas, consulta):
+    """
+    Arma la página de resultados: un par de consultas por tipo, no por fila.
+    """
+    buscados = len(trigramas(consulta)) or 1
+    entradas = IndiceBusqueda.objects.in_bulk([fila['entrada'] for fila in filas])
+
+    por_tipo = {}
+    for entrada in entradas.values():
+        por_tipo.setdefault(entrada.tipo, []).append(entrada.objeto_id)
+    objetos = {}
+    for tipo, ids in por_tipo.items():
+        model, _, serializer_class = INDEXADOS[tipo]
+        instancias = optimizar_queryset(model.objects.filter(pk__in=ids), serializer_class)
+        for instancia in instancias:
+            objetos[(tipo, instancia.pk)] = serializer_class(instancia).data
+
+    salida = []
+    for fila in filas:
+        entrada = entradas.get(fila['entrada'])
+        if entrada is None or (entrada.tipo, entrada.objeto_id) not in objetos:
+            continue
+        salida.append({
+            'tipo': entrada.tipo,
+            'id': entrada.objeto_id,
+            'puntaje': round(fila['comunes'] / buscados, 3),
+            'objeto': objetos[(entrada.tipo, entrada.objeto_id)],
+        })
+    return salida
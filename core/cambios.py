@@ -0,0 +1,273 @@
+# core/cambios.py
+import asyncio
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import EventoCompra, ClienteMovilLocal
+from .posiciones import numerar, ultima
+from .recursos import CupoHilos, Recientes
+
+SECUENCIA = 'cambios'
+# espera máxima entre sondeos del vigía mientras la base falla
+ESPERA_MAXIMA_FALLAS = 10
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------
+# Registro de eventos ###############################################################################################
+# Las señales llaman a registrar() dentro de la transacción del cambio: si
+# se revierte, el evento tampoco queda. Al confirmar se le asigna su posición
+# en el feed y se avisa al vigía del proceso para despertar a los que esperan
+# sin esperar al próximo sondeo.
+def registrar(tipo, compra_id, cliente_id=None, anterior=None, nuevo=None):
+    evento = EventoCompra.objects.create(
+        tipo=tipo, compra_id=compra_id, id_cliente_movil_local=cliente_id,
+        estado_anterior=anterior, estado_nuevo=nuevo,
+    )
+    # robust: el cambio ya confirmó, si numerar falla lo retoma el próximo lote()
+    transaction.on_commit(publicar, robust=True)
+    return evento
+
+
+def publicar():
+    """
+    Numera los eventos confirmados sin posición. Corre al confirmar cada
+    transacción con eventos y antes de armar un lote (si un proceso cayó entre
+    el COMMIT y el on_commit, el próximo que lea los numera).
+    """
+    posicion = numerar(SECUENCIA, [EventoCompra])
+    if posicion is not None:
+        vigia.notificar(posicion)
+
+
+# --------------------
+# Feed de cambios ###################################################################################################
+# El cursor es la posición (orden de confirmación, ver core/posiciones.py): un
+# evento de una transacción que confirma tarde recibe una posición mayor que
+# todo lo ya entregado, así ningún cliente lo saltea. Los eventos todavía sin
+# posición no se entregan.
+def _visibles(since, clientes=None):
+    eventos = EventoCompra.objects.filter(posicion__gt=since)
+    if clientes is not None:
+        eventos = eventos.filter(id_cliente_movil_local__in=clientes)
+    return eventos
+
+
+def clientes_por_dni(dni):
+    return list(ClienteMovilLocal.objects.filter(dni_cliente_movil_local=dni).values_list('pk', flat=True))
+
+
+def ultimo_visible():
+    publicar()
+    return ultima(EventoCompra)
+
+
+def _dato(evento):
+    return {
+        'seq': evento.posicion,
+        'tipo': evento.tipo,
+        'compra': evento.compra_id,
+        'estado_anterior': evento.estado_anterior,
+        'estado_nuevo': evento.estado_nuevo,
+        'fecha': evento.fecha,
+    }
+
+
+_lotes = Recientes(256)
+
+
+def lote(since, clientes=None, limite=None):
+    """
+    {'eventos': [...], 'ultimo': posición, 'hay_mas': bool} con los eventos
+    posteriores a `since`. El mismo lote se comparte entre los que piden lo
+    mismo mientras no haya eventos nuevos (long-poll con muchos clientes).
+    """
+    limite = min(limite or settings.CAMBIOS_LIMITE, settings.CAMBIOS_LIMITE)
+    # solo con el vigía activo vigia.ultimo está al día
+    clave = (since, tuple(clientes) if clientes is not None else None, limite, vigia.ultimo)
+    guardado = _lotes.get(clave) if vigia.activo else None
+    if guardado is not None:
+        return guardado
+
+    publicar()
+    eventos = list(_visibles(since, clientes).order_by('posicion')[:limite + 1])
+    hay_mas = len(eventos) > limite
+    eventos = eventos[:limite]
+    resultado = {
+        'eventos': [_dato(evento) for evento in eventos],
+        'ultimo': eventos[-1].posicion if eventos else since,
+        'hay_mas': hay_mas,
+    }
+    if eventos and not hay_mas:
+        _lotes.set(clave, resultado)
+    return resultado
+
+
+# --------------------
+# Vigía (long-poll) #################################################################################################
+# Un solo hilo por proceso numera lo pendiente y consulta MAX(posicion) cada
+# CAMBIOS_INTERVALO_SEGUNDOS mientras haya alguien esperando y despierta a
+# todos (hilos de la vista síncrona y futures de la async). La base recibe una consulta por intervalo,
+# no una por cliente en espera.
+class Vigia:
+    def __init__(self):
+        self.ultimo = 0
+        self.consultas = 0
+        self._condicion = threading.Condition()
+        self._esperando = 0
+        self._futuros = set()
+        self._hilo = None
+        self._fallas = 0
+
+    @property
+    def activo(self):
+        # sondeando sin errores: self.ultimo está al día
+        return self._hilo is not None and not self._fallas
+
+    def notificar(self, posicion):
+        with self._condicion:
+            if posicion <= self.ultimo:
+                return
+            self.ultimo = posicion
+            self._condicion.notify_all()
+            futuros, self._futuros = self._futuros, set()
+        for loop, futuro in futuros:
+            loop.call_soon_threadsafe(_resolver, futuro)
+
+    def _arrancar(self):
+        # con el lock tomado
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._sondear, name='vigia-cambios', daemon=True)
+            self._hilo.start()
+
+    def _sondear(self):
+        try:
+            while True:
+                with self._condicion:
+                    if not self._esperando and not self._futuros:
+                        self._hilo = None
+                        return
+                self.consultas += 1
+                try:
+                    posicion = numerar(SECUENCIA, [EventoCompra])
+                    self.notificar(posicion if posicion is not None else ultima(EventoCompra))
+                    self._fallas = 0
+                except Exception:
+                    logger.exception("Fallo al sondear el feed de cambios")
+                    self._fallas += 1
+                    connection.close()
+                intervalo = settings.CAMBIOS_INTERVALO_SEGUNDOS
+                time.sleep(min(intervalo * 2 ** self._fallas, max(intervalo, ESPERA_MAXIMA_FALLAS)))
+        finally:
+            with self._condicion:
+                if self._hilo is threading.current_thread():
+                    self._hilo = None
+                self._fallas = 0
+            connection.close()
+
+    def esperar(self, since, segundos):
+        """
+        Bloquea hasta que haya un evento posterior a `since` o pasen `segundos`.
+        """
+        limite = time.monotonic() + segundos
+        with self._condicion:
+            self._esperando += 1
+            self._arrancar()
+            try:
+                return self._condicion.wait_for(lambda: self.ultimo > since, timeout=max(0, limite - time.monotonic()))
+            finally:
+                self._esperando -= 1
+
+    async def aesperar(self, since, segundos):
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + segundos
+        while self.ultimo <= since:
+            restante = limite - loop.time()
+            if restante <= 0:
+                return False
+            futuro = loop.create_future()
+            with self._condicion:
+                if self.ultimo > since:
+                    break
+                self._futuros.add((loop, futuro))
+                self._arrancar()
+            try:
+                await asyncio.wait_for(futuro, restante)
+            except asyncio.TimeoutError:
+                with self._condicion:
+                    self._futuros.discard((loop, futuro))
+                return self.ultimo > since
+        return True
+
+
+def _resolver(futuro):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+vigia = Vigia()
+
+
+# La vista síncrona (WSGI) ocupa un hilo del worker mientras espera: hasta
+# CAMBIOS_ESPERA_MAX_WSGI esperas por proceso, el resto recibe el lote sin
+# esperar (sondeo) con Retry-After.
+hilos_espera = CupoHilos('CAMBIOS_ESPERA_MAX_WSGI')
+
+
+def cambios(since, clientes=None, limite=None, espera=0):
+    """
+    Lote de eventos posteriores a `since`; si no hay y `espera` > 0, espera
+    (long-poll) hasta que aparezcan o pasen `espera` segundos.
+    """
+    fin = time.monotonic() + espera
+    resultado = lote(since, clientes, limite)
+    visto = since
+    while not resultado['eventos'] and time.monotonic() < fin:
+        if vigia.ultimo <= visto and not vigia.esperar(visto, fin - time.monotonic()):
+            break
+        # hay eventos nuevos (quizás de otros clientes)
+        visto = vigia.ultimo
+        resultado = lote(since, clientes, limite)
+    return resultado
+
+
+async def acambios(since, clientes=None, limite=None, espera=0):
+    """
+    Igual que cambios() sin ocupar un hilo mientras espera (vista async).
+    """
+    alote = sync_to_async(lote)
+    loop = asyncio.get_running_loop()
+    fin = loop.time() + espera
+    resultado = await alote(since, clientes, limite)
+    visto = since
+    while not resultado['eventos'] and loop.time() < fin:
+        if vigia.ultimo <= visto and not await vigia.aesperar(visto, fin - loop.time()):
+            break
+        visto = vigia.ultimo
+        resultado = await alote(since, clientes, limite)
+    return resultado
+
+
+def parametros(query):
+    """
+    (since, dni, limite, espera) de ?since=&dni=&limite=&wait=; ValueError si
+    algún número no es válido. since None: el cliente todavía no tiene cursor.
+    """
+    since = query.get('since')
+    since = int(since) if since not in (None, '') else None
+    limite = int(query.get('limite') or settings.CAMBIOS_LIMITE)
+    espera = float(query.get('wait') or 0)
+    if (since is not None and since < 0) or limite < 1 or espera < 0:
+        raise ValueError
+    return since, query.get('dni') or None, limite, min(espera, settings.CAMBIOS_ESPERA_MAXIMA)
+
+
+def inicio():
+    # sin since se devuelve solo el cursor desde el que empezar a seguir el feed
+    return {'eventos': [], 'ultimo': ultimo_visible(), 'hay_mas': False}
@@ -0,0 +1,146 @@
+# core/catalogo.py
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import VersionCache
+from .recursos import Recientes
+from .renderers import FragmentoJSON, RendererJSONRapido, codificar
+
+
+# --------------------
+# Cache del catálogo (Producto / Rubro) ##############################################################################
+# Todas las claves llevan la versión del catálogo; al guardar o borrar un
+# Producto o Rubro se incrementa la versión y las entradas viejas quedan
+# huérfanas (expiran solas). El backend es el alias 'catalogo' de CACHES; la
+# versión está en la base (VersionCache), compartida por todos los workers.
+# Con RendererJSONRapido se guarda el JSON ya codificado (FragmentoJSON) y las
+# entradas más pedidas quedan además en memoria del proceso, así un acierto
+# no deserializa ni vuelve a codificar nada.
+VERSION_CATALOGO = 'catalogo'
+FRAGMENTOS_EN_MEMORIA = 256
+
+
+recientes = Recientes(FRAGMENTOS_EN_MEMORIA)
+
+
+def cache_catalogo():
+    return caches['catalogo']
+
+
+class _Versiones:
+    """
+    Versiones de VersionCache. Cada proceso recuerda la leída durante
+    CACHE_VERSION_SEGUNDOS (una consulta por intervalo, no por request): otro
+    worker ve una invalidación a lo sumo ese tiempo después; el que la hizo,
+    enseguida.
+    """
+    def __init__(self):
+        self._leidas = {}
+
+    def leer(self, nombre):
+        leida = self._leidas.get(nombre)
+        ahora = time.monotonic()
+        if leida is not None and ahora - leida[1] < settings.CACHE_VERSION_SEGUNDOS:
+            return leida[0]
+        version = VersionCache.objects.filter(nombre=nombre).values_list('version', flat=True).first()
+        if version is None:
+            # primera vez: un valor nuevo para no reutilizar claves que todavía puedan existir
+            try:
+                with transaction.atomic():
+                    VersionCache.objects.create(nombre=nombre, version=int(time.time() * 1000))
+            except IntegrityError:
+                pass
+            version = VersionCache.objects.values_list('version', flat=True).get(nombre=nombre)
+        self._leidas[nombre] = (version, ahora)
+        return version
+
+    def incrementar(self, nombre):
+        self._leidas.pop(nombre, None)
+        if not VersionCache.objects.filter(nombre=nombre).update(version=F('version') + 1):
+            self.leer(nombre)
+
+
+versiones = _Versiones()
+
+
+def version_catalogo():
+    return versiones.leer(VERSION_CATALOGO)
+
+
+def invalidar_catalogo():
+    versiones.incrementar(VERSION_CATALOGO)
+
+
+def clave_y_etag(request, version, formato=None):
+    if formato is None:
+        formato = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+    clave = f'catalogo:{version}:{formato}:{request.build_absolute_uri()}'
+    etag = '"%s"' % hashlib.md5(clave.encode()).hexdigest()
+    return clave, etag
+
+
+def etag_coincide(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    etags = [e.removeprefix('W/') for e in parse_etags(if_none_match)]
+    return '*' in etags or etag in etags
+
+
+def respuesta_catalogo(request, construir):
+    """
+    Responde un listado del catálogo desde cache. `construir` arma los datos
+    (lo que iría en Response.data) solo si no están cacheados.
+    Con If-None-Match de la versión vigente responde 304 sin cuerpo.
+    """
+    clave, etag = clave_y_etag(request, version_catalogo())
+    if etag_coincide(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        data = recientes.get(clave)
+        if data is None:
+            cache = cache_catalogo()
+            data = cache.get(clave)
+            if data is None:
+                data = construir()
+                if isinstance(getattr(request, 'accepted_renderer', None), RendererJSONRapido):
+                    data = FragmentoJSON(codificar(data))
+                cache.set(clave, data)
+            recientes.set(clave, data)
+        response = Response(data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+async def arespuesta_catalogo(request, construir, responder):
+    """
+    Igual que respuesta_catalogo para las vistas async (siempre JSON):
+    `construir` es una corrutina y `responder(data, status)` arma el HttpResponse.
+    Comparte claves y ETag con la versión síncrona.
+    """
+    clave, etag = clave_y_etag(request, await sync_to_async(version_catalogo)(), formato='json')
+    if etag_coincide(request, etag):
+        response = responder(None, status.HTTP_304_NOT_MODIFIED)
+    else:
+        data = recientes.get(clave)
+        if data is None:
+            cache = cache_catalogo()
+            data = await cache.aget(clave)
+            if data is None:
+                data = FragmentoJSON(codificar(await construir()))
+                await cache.aset(clave, data)
+            recientes.set(clave, data)
+        response = responder(data, status.HTTP_200_OK)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
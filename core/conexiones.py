@@ -0,0 +1,123 @@
+# core/conexiones.py
+import base64
+import inspect
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from graphene.relay import PageInfo
+from graphql import GraphQLError
+
+
+# --------------------
+# Conexiones Relay con paginación por keyset ########################################################################
+# El cursor lleva los valores de las columnas de orden de la fila (p. ej.
+# fecha e id) y la página siguiente se pide con un WHERE sobre esas columnas
+# en lugar de un OFFSET: el costo de cada página es el mismo en la primera
+# que en la número mil, siempre que haya un índice con ese orden.
+def codificar_cursor(valores):
+    valores = [valor.isoformat() if hasattr(valor, 'isoformat') else valor for valor in valores]
+    return base64.urlsafe_b64encode(json.dumps(valores, separators=(',', ':')).encode()).decode()
+
+
+def decodificar_cursor(cursor, cantidad):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        valores = None
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise GraphQLError('Cursor inválido')
+    return valores
+
+
+def _despues_de(orden, valores, invertir=False):
+    """
+    Q de las filas que siguen a `valores` en `orden` ((campo, descendente), ...).
+    """
+    condiciones = []
+    for i, (campo, descendente) in enumerate(orden):
+        operador = 'lt' if descendente != invertir else 'gt'
+        iguales = {campo_previo: valor for (campo_previo, _), valor in zip(orden[:i], valores)}
+        condiciones.append(Q(**iguales, **{f'{campo}__{operador}': valores[i]}))
+    # cota redundante sobre la primera columna: con el OR solo, el motor no
+    # acota el rango del índice y recorre desde el principio
+    campo, descendente = orden[0]
+    cota = Q(**{f"{campo}__{'lte' if descendente != invertir else 'gte'}": valores[0]})
+    return cota & reduce(or_, condiciones)
+
+
+def _order_by(orden, invertir=False):
+    return [('-' if descendente != invertir else '') + campo for campo, descendente in orden]
+
+
+class Pagina:
+    """
+    Una página de `queryset` ordenado por `orden` según los argumentos Relay
+    (first / after hacia adelante, last / before hacia atrás).
+    """
+    def __init__(self, queryset, orden, first=None, after=None, last=None, before=None):
+        if first is not None and last is not None:
+            raise GraphQLError('Usar first o last, no ambos')
+        tamano = last if last is not None else first
+        if tamano is None:
+            tamano = settings.GRAPHQL_TAMANO_LISTA
+        if tamano < 0 or tamano > settings.GRAPHQL_PAGINA_MAXIMA:
+            raise GraphQLError(f'first / last debe estar entre 0 y {settings.GRAPHQL_PAGINA_MAXIMA}')
+
+        self.orden = orden
+        self.tamano = tamano
+        self.hacia_atras = last is not None
+        self.after = after
+        self.before = before
+
+        if after is not None:
+            queryset = queryset.filter(_despues_de(orden, decodificar_cursor(after, len(orden))))
+        if before is not None:
+            queryset = queryset.filter(_despues_de(orden, decodificar_cursor(before, len(orden)), invertir=True))
+        # una fila de más para saber si hay otra página
+        self.queryset = queryset.order_by(*_order_by(orden, self.hacia_atras))[:tamano + 1]
+
+    def cursor(self, fila):
+        return codificar_cursor([getattr(fila, campo) for campo, _ in self.orden])
+
+    def conexion(self, tipo, filas):
+        filas = list(filas)
+        hay_mas = len(filas) > self.tamano
+        filas = filas[:self.tamano]
+        if self.hacia_atras:
+            filas.reverse()
+        edges = [tipo.Edge(node=fila, cursor=self.cursor(fila)) for fila in filas]
+        return tipo(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                # sin contar filas: solo se sabe que hay página previa si se llegó con un cursor
+                has_next_page=hay_mas if not self.hacia_atras else self.before is not None,
+                has_previous_page=hay_mas if self.hacia_atras else self.after is not None,
+            ),
+        )
+
+
+def resolver_conexion(info, tipo, pagina, evaluar=None):
+    """
+    Conexión `tipo` con las filas de la página. `evaluar(info, queryset)`
+    trae las filas (p. ej. loaders.resolver_compras); por defecto se listan,
+    con el ORM async si la vista es async.
+    """
+    if evaluar is not None:
+        filas = evaluar(info, pagina.queryset)
+    elif getattr(info.context, 'graphql_async', False):
+        async def listar():
+            return [fila async for fila in pagina.queryset]
+        filas = listar()
+    else:
+        filas = list(pagina.queryset)
+
+    if inspect.isawaitable(filas):
+        async def armar():
+            return pagina.conexion(tipo, await filas)
+        return armar()
+    return pagina.conexion(tipo, filas)
@@ -0,0 +1,315 @@
+# core/consultas_graphql.py
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponseBadRequest
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, parse, validate,
+    value_from_ast_untyped, get_named_type, get_nullable_type, is_list_type,
+)
+from graphql.language import FieldNode, FragmentDefinitionNode, FragmentSpreadNode, InlineFragmentNode
+
+from .catalogo import version_catalogo, versiones
+from .recursos import Recientes
+
+
+# --------------------
+# Consultas persistidas y documentos validados ######################################################################
+# Cada consulta se identifica por el sha256 de su texto (protocolo de
+# "persisted queries" de Apollo: extensions.persistedQuery.sha256Hash). El
+# cliente puede mandar solo el hash; el texto se guarda en el alias 'graphql'
+# de CACHES. Con GRAPHQL_SOLO_PERSISTIDAS solo se aceptan las consultas de
+# los archivos .graphql de GRAPHQL_CONSULTAS_DIR o registradas con el comando
+# registrar_consultas_graphql (el staff puede seguir usando GraphiQL). Los documentos ya parseados y validados quedan en memoria del
+# proceso, así una consulta repetida no se vuelve a parsear ni validar.
+VERSION_GRAPHQL = 'graphql'
+
+documentos = Recientes(settings.GRAPHQL_DOCUMENTOS_EN_MEMORIA)
+textos = Recientes(settings.GRAPHQL_DOCUMENTOS_EN_MEMORIA)
+
+
+def cache_graphql():
+    return caches['graphql']
+
+
+def hash_consulta(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def registrar_consulta(query):
+    hash_ = hash_consulta(query)
+    cache_graphql().set(f'graphql:consulta:{hash_}', query, timeout=None)
+    textos.set(hash_, query)
+    return hash_
+
+
+@lru_cache(maxsize=None)
+def consultas_del_directorio():
+    if not settings.GRAPHQL_CONSULTAS_DIR:
+        return {}
+    consultas = (archivo.read_text() for archivo in sorted(Path(settings.GRAPHQL_CONSULTAS_DIR).glob('*.graphql')))
+    return {hash_consulta(query): query for query in consultas}
+
+
+def texto_persistido(hash_):
+    query = textos.get(hash_) or consultas_del_directorio().get(hash_)
+    if query is None:
+        query = cache_graphql().get(f'graphql:consulta:{hash_}')
+        if query is not None:
+            textos.set(hash_, query)
+    return query
+
+
+def _error(mensaje, codigo, **extra):
+    return GraphQLError(mensaje, extensions={'code': codigo, **extra})
+
+
+def _hash_pedido(request, data):
+    extensions = request.GET.get('extensions') or data.get('extensions')
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+    persistida = (extensions or {}).get('persistedQuery') or {}
+    return persistida.get('sha256Hash')
+
+
+def resolver_consulta(request, data, query):
+    """
+    (texto, hash) de la consulta del request; GraphQLError si el hash no está
+    registrado, no coincide con el texto o solo se aceptan persistidas.
+    """
+    hash_ = _hash_pedido(request, data)
+    if not query:
+        if hash_ is None:
+            return None, None
+        query = texto_persistido(hash_)
+        if query is None:
+            raise _error('PersistedQueryNotFound', 'PERSISTED_QUERY_NOT_FOUND')
+        return query, hash_
+
+    calculado = hash_consulta(query)
+    if hash_ is not None and hash_ != calculado:
+        raise _error('provided sha does not match query', 'PERSISTED_QUERY_HASH_MISMATCH')
+    if settings.GRAPHQL_SOLO_PERSISTIDAS and not getattr(request.user, 'is_staff', False):
+        if texto_persistido(calculado) is None:
+            raise _error('Solo se aceptan consultas persistidas', 'PERSISTED_QUERY_REQUIRED')
+    elif hash_ is not None:
+        registrar_consulta(query)
+    return query, calculado
+
+
+def documento_validado(schema, query, hash_, reglas=None):
+    """
+    (documento, errores) de la consulta; los válidos quedan en memoria por hash.
+    """
+    documento = documentos.get(hash_)
+    if documento is not None:
+        return documento, None
+    try:
+        documento = parse(query)
+    except GraphQLError as e:
+        return None, [e]
+    errores = validate(schema, documento, reglas)
+    if errores:
+        return None, errores
+    documentos.set(hash_, documento)
+    return documento, None
+
+
+# --------------------
+# Costo de la consulta ##############################################################################################
+# Se estima antes de ejecutar: cada objeto que resuelve un campo cuesta 1 y
+# los campos lista multiplican el costo de su selección por `first` / `last`
+# (o GRAPHQL_TAMANO_LISTA si no lo traen; las listas que no se paginan, como
+# los productos de una compra, cuentan lo que diga GRAPHQL_TAMANO_CAMPOS). Si
+# el argumento está en una conexión (campo objeto), multiplica a su lista `edges`. Los escalares no
+# suman: lo que cuesta son las filas que hay que traer de la base.
+def _tamano(nodo, variables):
+    for argumento in nodo.arguments or ():
+        if argumento.name.value in ('first', 'last'):
+            valor = value_from_ast_untyped(argumento.value, variables)
+            if isinstance(valor, int) and valor >= 0:
+                return valor
+    return None
+
+
+def costo_consulta(schema, documento, operacion, variables=None):
+    """
+    (costo, profundidad) de `operacion` dentro de `documento`.
+    """
+    fragmentos = {d.name.value: d for d in documento.definitions if isinstance(d, FragmentDefinitionNode)}
+    variables = variables or {}
+
+    def recorrer(seleccion, tipo, profundidad, pendiente):
+        total, maxima = 0, profundidad
+        for nodo in seleccion.selections:
+            if isinstance(nodo, FieldNode):
+                campo = getattr(tipo, 'fields', {}).get(nodo.name.value)
+                if campo is None or nodo.selection_set is None:
+                    continue  # escalares y __typename
+                tamano = _tamano(nodo, variables)
+                if is_list_type(get_nullable_type(campo.type)):
+                    estimado = settings.GRAPHQL_TAMANO_CAMPOS.get(f'{tipo.name}.{nodo.name.value}')
+                    multiplicador = tamano or pendiente or estimado or settings.GRAPHQL_TAMANO_LISTA
+                    hijo_pendiente = None
+                else:
+                    multiplicador, hijo_pendiente = 1, tamano
+                costo, hondura = recorrer(nodo.selection_set, get_named_type(campo.type), profundidad + 1, hijo_pendiente)
+                total += multiplicador * (1 + costo)
+            elif isinstance(nodo, InlineFragmentNode):
+                condicion = schema.get_type(nodo.type_condition.name.value) if nodo.type_condition else tipo
+                costo, hondura = recorrer(nodo.selection_set, condicion, profundidad, pendiente)
+                total += costo
+            elif isinstance(nodo, FragmentSpreadNode):
+                fragmento = fragmentos.get(nodo.name.value)
+                if fragmento is None:
+                    continue
+                condicion = schema.get_type(fragmento.type_condition.name.value)
+                costo, hondura = recorrer(fragmento.selection_set, condicion, profundidad, pendiente)
+                total += costo
+            else:
+                continue
+            maxima = max(maxima, hondura)
+        return total, maxima
+
+    return recorrer(operacion.selection_set, schema.get_root_type(operacion.operation), 0, None)
+
+
+def verificar_costo(schema, documento, operacion, variables):
+    costo, profundidad = costo_consulta(schema, documento, operacion, variables)
+    if profundidad > settings.GRAPHQL_PROFUNDIDAD_MAXIMA:
+        raise _error(
+            f'La consulta supera la profundidad máxima ({profundidad} > {settings.GRAPHQL_PROFUNDIDAD_MAXIMA})',
+            'PROFUNDIDAD_EXCEDIDA', profundidad=profundidad, maximo=settings.GRAPHQL_PROFUNDIDAD_MAXIMA,
+        )
+    if costo > settings.GRAPHQL_COSTO_MAXIMO:
+        raise _error(
+            f'La consulta supera el costo máximo ({costo} > {settings.GRAPHQL_COSTO_MAXIMO})',
+            'COSTO_EXCEDIDO', costo=costo, maximo=settings.GRAPHQL_COSTO_MAXIMO,
+        )
+    return costo
+
+
+# --------------------
+# Cache de resultados ###############################################################################################
+# Se guarda la respuesta ya codificada de cada query (sin errores) por hash,
+# operación y variables. La clave lleva la versión de GraphQL (VersionCache,
+# compartida por los workers), que suben las señales de Compra /
+# CompraProducto / Envio / Venta / Vendedor / ClienteMovilLocal, y la del catálogo (Producto, incluidos los cambios de
+# stock en bloque), así nunca se sirve un resultado viejo. Los resolvers no
+# dependen del usuario; si alguno empieza a hacerlo, el usuario debe ir en la clave.
+def version_graphql():
+    return versiones.leer(VERSION_GRAPHQL)
+
+
+def invalidar_resultados():
+    versiones.incrementar(VERSION_GRAPHQL)
+
+
+def clave_resultado(hash_, operation_name, variables):
+    firma = json.dumps([hash_, operation_name, variables or {}], sort_keys=True, default=str)
+    return 'graphql:resultado:%s:%s:%s' % (
+        version_graphql(), version_catalogo(), hashlib.sha256(firma.encode()).hexdigest()
+    )
+
+
+# --------------------
+# Vista #############################################################################################################
+class GraphQLOptimizadoMixin:
+    """
+    GraphQLView con consultas persistidas, documentos validados en memoria,
+    límite de costo / profundidad antes de ejecutar y cache de resultados.
+    """
+    def preparar(self, request, data, show_graphiql=False):
+        """
+        (query, variables, operation_name, clave de cache o None, respuesta de error o None).
+        """
+        query, variables, operation_name, _id = self.get_graphql_params(request, data)
+        try:
+            query, request.graphql_hash = resolver_consulta(request, data, query)
+        except GraphQLError as e:
+            return None, None, None, None, (self.json_encode(request, {'errors': [e.formatted]}), 400)
+        clave = None
+        if query and not show_graphiql and settings.GRAPHQL_CACHE_RESULTADOS and not request.GET.get('pretty'):
+            clave = clave_resultado(request.graphql_hash, operation_name, variables)
+        return query, variables, operation_name, clave, None
+
+    def armar_respuesta(self, request, execution_result, show_graphiql=False):
+        if not execution_result:
+            return None, 200
+        response, status_code = {}, 200
+        if execution_result.errors:
+            response['errors'] = [self.format_error(e) for e in execution_result.errors]
+        if execution_result.errors and any(not getattr(e, 'path', None) for e in execution_result.errors):
+            status_code = 400
+        else:
+            response['data'] = execution_result.data
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    @staticmethod
+    def cacheable(request, execution_result, status_code):
+        return (
+            status_code == 200 and execution_result is not None and not execution_result.errors
+            and getattr(request, 'graphql_es_consulta', False)
+        )
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, clave, error = self.preparar(request, data, show_graphiql)
+        if error:
+            return error
+        if clave:
+            guardado = cache_graphql().get(clave)
+            if guardado is not None:
+                return guardado, 200
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        result, status_code = self.armar_respuesta(request, execution_result, show_graphiql)
+        if clave and self.cacheable(request, execution_result, status_code):
+            cache_graphql().set(clave, result)
+        return result, status_code
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+        documento, errores = documento_validado(schema, query, request.graphql_hash, self.validation_rules)
+        if errores:
+            return ExecutionResult(data=None, errors=errores)
+
+        operacion = get_operation_ast(documento, operation_name)
+        if operacion is not None and operacion.operation != OperationType.QUERY:
+            # mutaciones: validación GET / transacción de graphene-django
+            return super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+        request.graphql_es_consulta = operacion is not None
+
+        try:
+            if operacion is not None:
+                verificar_costo(schema, documento, operacion, variables)
+            return execute(
+                schema, documento,
+                root_value=self.get_root_value(request),
+                context_value=self.get_context(request),
+                variable_values=variables,
+                operation_name=operation_name,
+                middleware=self.get_middleware(request),
+                **({'execution_context_class': self.execution_context_class} if self.execution_context_class else {}),
+            )
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+class GraphQLViewOptimizada(GraphQLOptimizadoMixin, GraphQLView):
+    pass
+
@@ -0,0 +1,114 @@
+# core/exportacion.py
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Compra, Venta, VentaLocal
+
+
+# --------------------
+# Exportación del historial #########################################################################################
+# Se recorre la tabla por lotes de pk (WHERE id > ultimo ORDER BY id LIMIT n)
+# en lugar de .iterator(): mysqlclient no usa cursores del lado del servidor y
+# trae el resultado completo a memoria. Cada lote se escribe y se descarta, así
+# la memoria queda fija sin importar el tamaño de la tabla.
+EXPORTABLES = {
+    'compras': (Compra, 'fecha', (
+        'id', 'fecha', 'estado', 'id_vendedor', 'id_vendedor__nombre_vendedor', 'id_vendedor__apellido_vendedor',
+        'id_cliente_movil_local', 'id_cliente_movil_local__dni_cliente_movil_local',
+    )),
+    'ventas': (Venta, 'fecha_venta', (
+        'id', 'fecha_venta', 'id_compra', 'id_vendedor', 'monto_total',
+    )),
+    'ventas_locales': (VentaLocal, 'fecha_venta', (
+        'id', 'fecha_venta', 'id_cliente_local', 'id_cliente_local__dni', 'id_vendedor', 'monto_total',
+    )),
+}
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def filas(nombre, desde=None, hasta=None, lote=2000):
+    """
+    Tuplas de la tabla en orden de id, entre las fechas desde y hasta (inclusive).
+    """
+    model, campo_fecha, campos = EXPORTABLES[nombre]
+    queryset = model.objects.order_by('pk')
+    if desde:
+        queryset = queryset.filter(**{f'{campo_fecha}__gte': _inicio_del_dia(desde)})
+    if hasta:
+        queryset = queryset.filter(**{f'{campo_fecha}__lt': _inicio_del_dia(hasta + timedelta(days=1))})
+
+    ultimo = 0
+    while True:
+        bloque = list(queryset.filter(pk__gt=ultimo).values_list(*campos)[:lote])
+        if not bloque:
+            return
+        yield from bloque
+        ultimo = bloque[-1][0]
+
+
+def _inicio_del_dia(fecha):
+    inicio = datetime.combine(fecha, time.min)
+    return timezone.make_aware(inicio) if settings.USE_TZ else inicio
+
+
+class _Eco:
+    """Buffer de csv.writer que devuelve la línea en lugar de guardarla."""
+    def write(self, valor):
+        return valor
+
+
+def lineas(nombre, formato, desde=None, hasta=None, lote=2000):
+    """
+    Texto exportado, una línea por fila (con encabezado en CSV).
+    """
+    _, _, campos = EXPORTABLES[nombre]
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(campos)
+        for fila in filas(nombre, desde, hasta, lote):
+            yield escritor.writerow(fila)
+    else:
+        codificador = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        for fila in filas(nombre, desde, hasta, lote):
+            yield codificador.encode(dict(zip(campos, fila))) + '\n'
+
+
+def _en_bloques(lineas_texto, tamano=64 * 1024):
+    # Agrupa líneas para no escribir al socket una vez por fila
+    bloque, largo = [], 0
+    for linea in lineas_texto:
+        bloque.append(linea)
+        largo += len(linea)
+        if largo >= tamano:
+            yield ''.join(bloque).encode()
+            bloque, largo = [], 0
+    if bloque:
+        yield ''.join(bloque).encode()
+
+
+async def _iterar_async(iterador):
+    # Bajo ASGI un iterador síncrono se consumiría entero antes de enviarse;
+    # cada bloque se pide en el hilo del request.
+    fin = object()
+    siguiente = sync_to_async(lambda: next(iterador, fin))
+    while (bloque := await siguiente()) is not fin:
+        yield bloque
+
+
+def respuesta_exportacion(nombre, formato, desde=None, hasta=None):
+    contenido = _en_bloques(lineas(nombre, formato, desde, hasta))
+    if settings.SERVIDOR_ASGI:
+        contenido = _iterar_async(contenido)
+    response = StreamingHttpResponse(contenido, content_type=FORMATOS[formato])
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return response
@@ -0,0 +1,15 @@
+# core/hashers.py
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class PBKDF2IteracionesHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 con las iteraciones de PASSWORD_PBKDF2_ITERACIONES.
+    Usa el mismo algoritmo que el hasher por defecto, así los hashes existentes
+    se siguen verificando y Django los re-hashea con el nuevo valor en el
+    siguiente login correcto (must_update compara las iteraciones).
+    """
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERACIONES
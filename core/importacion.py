@@ -0,0 +1,269 @@
+# core/importacion.py
+import csv
+import io
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Producto, ProductoProveedor, Rubro
+from .catalogo import invalidar_catalogo
+from .stock import ajustar_stocks
+from . import busqueda, sincronizacion
+
+
+# --------------------
+# Importación de listas de precios ##################################################################################
+# El archivo se lee fila por fila y se procesa por lotes: cada lote trae los
+# productos existentes con una consulta (por nombre_producto), calcula las
+# diferencias y aplica altas / modificaciones con bulk_create / bulk_update en
+# una transacción. bulk_* no dispara señales, así que al final se invalida el
+# catálogo y se reindexa la búsqueda a mano. El stock de los productos
+# existentes no se pisa: la diferencia con lo leído se suma con F() (ver
+# core/stock.py), así no se pierden reservas o ventas confirmadas mientras tanto.
+COLUMNAS = ('nombre_producto', 'precio', 'stock_actual', 'rubro', 'descripcion', 'en_promocion')
+VERDADEROS = {'1', 'si', 'sí', 'true', 'x', 's', 'yes'}
+MAX_ERRORES = 200
+
+
+class ImportacionInvalida(Exception):
+    pass
+
+
+def _validar_encabezado(columnas):
+    columnas = {str(c).strip().lower() for c in columnas}
+    if 'nombre_producto' not in columnas:
+        raise ImportacionInvalida('El archivo debe tener la columna nombre_producto')
+    desconocidas = columnas - set(COLUMNAS) - {''}
+    if desconocidas:
+        raise ImportacionInvalida(f"Columnas desconocidas: {', '.join(sorted(desconocidas))}")
+
+
+def leer_csv(archivo):
+    """
+    Filas (dict) de un CSV de texto; el separador puede ser ',', ';' o tabulación.
+    """
+    muestra = archivo.read(4096)
+    archivo.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.DictReader(archivo, dialect=dialecto)
+    _validar_encabezado(lector.fieldnames or [])
+    return lector
+
+
+def leer_xlsx(archivo):
+    from openpyxl import load_workbook
+
+    hoja = load_workbook(archivo, read_only=True, data_only=True).active
+    filas = hoja.iter_rows(values_only=True)
+    encabezado = [str(c or '').strip() for c in next(filas, ())]
+    _validar_encabezado(encabezado)
+    return ({columna: valor for columna, valor in zip(encabezado, valores)} for valores in filas)
+
+
+def leer_archivo(archivo, nombre):
+    """
+    `archivo` es binario (archivo subido o abierto con 'rb').
+    """
+    if nombre.lower().endswith('.xlsx'):
+        return leer_xlsx(archivo)
+    return leer_csv(io.TextIOWrapper(archivo, encoding='utf-8-sig', newline=''))
+
+
+def _precio(valor):
+    texto = str(valor).strip().replace('$', '').replace(' ', '')
+    if ',' in texto:
+        # 1.234,56 -> 1234.56
+        texto = texto.replace('.', '').replace(',', '.')
+    precio = Decimal(texto).quantize(Decimal('0.01'))
+    if precio < 0:
+        raise InvalidOperation
+    return precio
+
+
+def _parsear(fila):
+    fila = {str(k).strip().lower(): v for k, v in fila.items() if k is not None}
+    nombre = str(fila.get('nombre_producto') or '').strip()
+    if not nombre:
+        raise ValueError('Falta nombre_producto')
+
+    datos = {}
+    if fila.get('precio') not in (None, ''):
+        try:
+            datos['precio'] = _precio(fila['precio'])
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"Precio inválido: {fila['precio']}")
+    if fila.get('stock_actual') not in (None, ''):
+        try:
+            datos['stock_actual'] = int(str(fila['stock_actual']).strip())
+        except ValueError:
+            raise ValueError(f"Stock inválido: {fila['stock_actual']}")
+    if fila.get('descripcion') not in (None, ''):
+        datos['descripcion'] = str(fila['descripcion']).strip()
+    if fila.get('en_promocion') not in (None, ''):
+        datos['en_promocion'] = str(fila['en_promocion']).strip().lower() in VERDADEROS
+    rubro = str(fila.get('rubro') or '').strip() or None
+    return nombre, rubro, datos
+
+
+def _rubros(queryset):
+    # Por nombre sin distinguir mayúsculas, como la collation de MySQL
+    return {nombre.lower(): rubro_id for nombre, rubro_id in queryset.values_list('nombre_rubro', 'id')}
+
+
+def _lotes(filas, tamano):
+    lote = []
+    for numero, fila in enumerate(filas, start=2):  # la línea 1 es el encabezado
+        lote.append((numero, fila))
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class _Lote:
+    def __init__(self, proveedor, rubros, reporte, dry_run):
+        self.proveedor = proveedor
+        self.rubros = rubros
+        self.reporte = reporte
+        self.dry_run = dry_run
+        self.reindexar = set()
+
+    def error(self, numero, mensaje):
+        self.reporte['con_error'] += 1
+        if len(self.reporte['errores']) < MAX_ERRORES:
+            self.reporte['errores'].append({'linea': numero, 'error': mensaje})
+
+    def aplicar(self, lote):
+        filas = {}
+        for numero, fila in lote:
+            try:
+                nombre, rubro, datos = _parsear(fila)
+            except ValueError as e:
+                self.error(numero, str(e))
+                continue
+            # Si el nombre se repite en el archivo gana la última fila
+            filas[nombre.lower()] = (numero, nombre, rubro, datos)
+
+        existentes = {}
+        nombres = [nombre for _, nombre, _, _ in filas.values()]
+        for producto in Producto.objects.filter(nombre_producto__in=nombres).order_by('id'):
+            existentes.setdefault(producto.nombre_producto.lower(), producto)
+
+        nuevos, modificados, campos = [], [], set()
+        stock = {}
+        rubros_nuevos = set()
+        for clave, (numero, nombre, rubro, datos) in filas.items():
+            producto = existentes.get(clave)
+            if producto is None:
+                if rubro is None or 'precio' not in datos:
+                    self.error(numero, 'Producto nuevo sin rubro o precio')
+                    continue
+                if rubro.lower() not in self.rubros:
+                    rubros_nuevos.add(rubro)
+                nuevos.append((rubro, Producto(nombre_producto=nombre, **{'stock_actual': 0, **datos})))
+                continue
+
+            if rubro is not None and rubro.lower() not in self.rubros:
+                rubros_nuevos.add(rubro)
+            cambios = {campo: valor for campo, valor in datos.items() if getattr(producto, campo) != valor}
+            if rubro is not None and self.rubros.get(rubro.lower()) != producto.id_rubro_id:
+                cambios['id_rubro'] = rubro
+            if 'stock_actual' in cambios:
+                stock[producto.id] = (numero, cambios.pop('stock_actual') - producto.stock_actual)
+            if not cambios:
+                self.reporte['actualizados' if producto.id in stock else 'sin_cambios'] += 1
+                continue
+            for campo, valor in cambios.items():
+                if campo != 'id_rubro':
+                    setattr(producto, campo, valor)
+            modificados.append((cambios.get('id_rubro'), producto))
+            campos.update(cambios)
+            if 'descripcion' in cambios:
+                self.reindexar.add(producto.id)
+
+        self.reporte['nuevos'] += len(nuevos)
+        self.reporte['actualizados'] += len(modificados)
+        rubros_nuevos = {rubro.lower(): rubro for rubro in rubros_nuevos}
+        self.reporte['rubros_nuevos'] += len(rubros_nuevos)
+        vinculados = [p.id for p in existentes.values()]
+        ya_vinculados = set(ProductoProveedor.objects.filter(
+            id_proveedor=self.proveedor, id_producto_id__in=vinculados
+        ).values_list('id_producto_id', flat=True))
+        self.reporte['vinculos_nuevos'] += len(nuevos) + len(set(vinculados) - ya_vinculados)
+        if self.dry_run:
+            # los rubros "nuevos" se cuentan una sola vez en todo el archivo
+            self.rubros.update(dict.fromkeys(rubros_nuevos))
+            return
+
+        with transaction.atomic():
+            if rubros_nuevos:
+                Rubro.objects.bulk_create(
+                    [Rubro(nombre_rubro=rubro) for rubro in rubros_nuevos.values()], ignore_conflicts=True
+                )
+                self.rubros.update(_rubros(Rubro.objects.filter(nombre_rubro__in=rubros_nuevos.values())))
+
+            for rubro, producto in nuevos:
+                producto.id_rubro_id = self.rubros[rubro.lower()]
+            Producto.objects.bulk_create([producto for _, producto in nuevos], batch_size=1000)
+
+            # bulk_update no pasa por auto_now ni por las señales: la versión y la
+            # posición para la sincronización van a mano
+            ahora = timezone.now()
+            for rubro, producto in modificados:
+                if rubro is not None:
+                    producto.id_rubro_id = self.rubros[rubro.lower()]
+                producto.actualizado_en = ahora
+                producto.posicion_sync = None
+            if modificados:
+                Producto.objects.bulk_update(
+                    [producto for _, producto in modificados],
+                    list(campos) + ['actualizado_en', 'posicion_sync'],
+                    batch_size=1000,
+                )
+            sin_stock = ajustar_stocks({producto_id: delta for producto_id, (_, delta) in stock.items()})
+            for producto_id in sin_stock:
+                self.error(stock[producto_id][0], 'Stock insuficiente: hay reservas o ventas posteriores a la lista')
+
+            # bulk_create no devuelve pk en MySQL: se releen por nombre
+            ids_nuevos = list(Producto.objects.filter(
+                nombre_producto__in=[producto.nombre_producto for _, producto in nuevos]
+            ).values_list('id', flat=True)) if nuevos else []
+            ProductoProveedor.objects.bulk_create([
+                ProductoProveedor(id_proveedor=self.proveedor, id_producto_id=producto_id)
+                for producto_id in ids_nuevos + vinculados
+            ], ignore_conflicts=True, batch_size=1000)
+            self.reindexar.update(ids_nuevos)
+
+
+def importar_lista(proveedor, filas, dry_run=False, lote=1000):
+    """
+    Importa la lista de precios de `proveedor` desde `filas` (dicts con
+    COLUMNAS; nombre_producto es la clave). Con dry_run no escribe nada y
+    solo informa lo que haría. Retorna el reporte.
+    """
+    inicio = time.perf_counter()
+    reporte = {
+        'proveedor': proveedor.id, 'dry_run': dry_run, 'leidas': 0, 'nuevos': 0, 'actualizados': 0,
+        'sin_cambios': 0, 'con_error': 0, 'rubros_nuevos': 0, 'vinculos_nuevos': 0, 'errores': [],
+    }
+    procesador = _Lote(proveedor, _rubros(Rubro.objects.all()), reporte, dry_run)
+    for parte in _lotes(filas, lote):
+        reporte['leidas'] += len(parte)
+        procesador.aplicar(parte)
+
+    if not dry_run and (reporte['nuevos'] or reporte['actualizados']):
+        invalidar_catalogo()
+        # bulk_create / bulk_update no pasan por las señales
+        sincronizacion.numerar_confirmados()
+        busqueda.indexar_ids(Producto, procesador.reindexar)
+
+    reporte['errores'].sort(key=lambda error: error['linea'])
+    reporte['segundos'] = round(time.perf_counter() - inicio, 2)
+    reporte['filas_por_segundo'] = round(reporte['leidas'] / reporte['segundos']) if reporte['segundos'] else None
+    return reporte
@@ -0,0 +1,148 @@
+# core/loaders.py
+from collections import defaultdict
+
+from core.models import CompraProducto, Envio, Venta, Vendedor, Producto, ClienteMovilLocal
+
+
+# --------------------
+# DataLoader síncrono por request ###################################################################################
+# Las claves se "anuncian" con prime() y la primera llamada a load() resuelve
+# todas las pendientes con una sola consulta IN (...). Graphene ejecuta los
+# resolvers de forma síncrona, así que se agrupa por lo que ya se conoce.
+class DataLoader:
+    def __init__(self, batch_load, default=None):
+        self.batch_load = batch_load
+        self.default = default
+        self._cache = {}
+        self._pendientes = set()
+
+    def prime(self, keys):
+        for key in keys:
+            if key is not None and key not in self._cache:
+                self._pendientes.add(key)
+
+    def load(self, key):
+        if key is None:
+            return self.default
+        if key not in self._cache:
+            self._pendientes.add(key)
+            self._resolver()
+        return self._cache.get(key, self.default)
+
+    def load_many(self, keys):
+        return [self.load(key) for key in keys]
+
+    def precargar(self, keys, resultados):
+        for key in keys:
+            self._cache[key] = resultados.get(key, self.default)
+            self._pendientes.discard(key)
+
+    def _resolver(self):
+        keys = list(self._pendientes)
+        self._pendientes.clear()
+        resultados = self.batch_load(keys)
+        for key in keys:
+            self._cache[key] = resultados.get(key, self.default)
+
+
+class Loaders:
+    """
+    Loaders de un request: Compra -> CompraProducto, Envio, Venta y Vendedor / Producto /
+    ClienteMovilLocal por id.
+    """
+    def __init__(self):
+        self.productos_por_compra = DataLoader(self._productos_por_compra, default=())
+        self.envio_por_compra = DataLoader(self._envio_por_compra)
+        self.venta_por_compra = DataLoader(self._venta_por_compra)
+        self.vendedor = DataLoader(self._vendedores)
+        self.producto = DataLoader(self._productos)
+        self.cliente_movil_local = DataLoader(self._clientes_movil_local)
+
+    def prime_compras(self, compras):
+        ids = [compra.id for compra in compras]
+        self.productos_por_compra.prime(ids)
+        self.envio_por_compra.prime(ids)
+        self.venta_por_compra.prime(ids)
+        self.vendedor.prime(compra.id_vendedor_id for compra in compras)
+        self.cliente_movil_local.prime(compra.id_cliente_movil_local_id for compra in compras)
+
+    async def aprecargar_compras(self, compras):
+        """
+        Versión async (vista GraphQL bajo ASGI): trae todas las relaciones de las
+        compras con el ORM async y deja los loaders resueltos, así los resolvers
+        síncronos solo leen de memoria dentro del event loop.
+        """
+        ids = [compra.id for compra in compras]
+        lineas = {compra_id: [] for compra_id in ids}
+        async for linea in CompraProducto.objects.filter(id_compra_id__in=ids).order_by('id'):
+            lineas[linea.id_compra_id].append(linea)
+        envios = {e.compra_id: e async for e in Envio.objects.filter(compra_id__in=ids)}
+        ventas = {v.id_compra_id: v async for v in Venta.objects.filter(id_compra_id__in=ids)}
+
+        vendedor_ids = {compra.id_vendedor_id for compra in compras}
+        cliente_ids = {compra.id_cliente_movil_local_id for compra in compras} - {None}
+        producto_ids = {linea.id_producto_id for grupo in lineas.values() for linea in grupo}
+        vendedores = {v.id: v async for v in Vendedor.objects.filter(id__in=vendedor_ids)}
+        clientes = {c.id: c async for c in ClienteMovilLocal.objects.filter(id__in=cliente_ids)}
+        productos = {p.id: p async for p in Producto.objects.filter(id__in=producto_ids)}
+
+        self.productos_por_compra.precargar(ids, lineas)
+        self.envio_por_compra.precargar(ids, envios)
+        self.venta_por_compra.precargar(ids, ventas)
+        self.vendedor.precargar(vendedor_ids, vendedores)
+        self.cliente_movil_local.precargar(cliente_ids, clientes)
+        self.producto.precargar(producto_ids, productos)
+
+    def _productos_por_compra(self, compra_ids):
+        lineas = defaultdict(list)
+        for linea in CompraProducto.objects.filter(id_compra_id__in=compra_ids).order_by('id'):
+            lineas[linea.id_compra_id].append(linea)
+        self.producto.prime(linea.id_producto_id for grupo in lineas.values() for linea in grupo)
+        return lineas
+
+    def _envio_por_compra(self, compra_ids):
+        return {envio.compra_id: envio for envio in Envio.objects.filter(compra_id__in=compra_ids)}
+
+    def _venta_por_compra(self, compra_ids):
+        return {venta.id_compra_id: venta for venta in Venta.objects.filter(id_compra_id__in=compra_ids)}
+
+    def _vendedores(self, ids):
+        return Vendedor.objects.in_bulk(ids)
+
+    def _productos(self, ids):
+        return Producto.objects.in_bulk(ids)
+
+    def _clientes_movil_local(self, ids):
+        return ClienteMovilLocal.objects.in_bulk(ids)
+
+
+def get_loaders(info):
+    """
+    Devuelve (o crea) los loaders guardados en el request de GraphQL.
+    """
+    context = info.context
+    if context is None:
+        return Loaders()
+    loaders = getattr(context, '_loaders', None)
+    if loaders is None:
+        loaders = Loaders()
+        context._loaders = loaders
+    return loaders
+
+
+def resolver_compras(info, queryset):
+    """
+    Evalúa el queryset de compras de un campo raíz y prepara los loaders.
+    Bajo la vista async devuelve una corrutina que usa el ORM async.
+    """
+    loaders = get_loaders(info)
+    if getattr(info.context, 'graphql_async', False):
+        async def resolver():
+            compras = [compra async for compra in queryset]
+            await loaders.aprecargar_compras(compras)
+            return compras
+        return resolver()
+
+    compras = list(queryset)
+    loaders.prime_compras(compras)
+    return compras
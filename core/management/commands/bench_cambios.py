@@ -0,0 +1,112 @@
+# core/management/commands/bench_cambios.py
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncRequestFactory
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import cambios, views_async
+from core.benchmarks.carga import percentil
+from core.benchmarks.datos import base_local
+from core.models import Compra, ClienteMovilLocal, Vendedor
+
+DNI = '00000002'
+ESTADOS = ['en_proceso', 'completada', 'pendiente']
+
+
+class Command(BaseCommand):
+    help = (
+        "Long-poll de /api/changes/ con miles de clientes concurrentes (vista async, en proceso) mientras un "
+        "hilo cambia el estado de una compra: cada cliente tiene que recibir todos los eventos, en orden y sin "
+        "repetidos. Informa la demora de entrega y las consultas del vigía. "
+        "Modifica una compra de prueba: usar solo con una base local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=2000)
+        parser.add_argument('--cambios', type=int, default=20)
+        parser.add_argument('--intervalo', type=float, default=0.2, help="Segundos entre cambios de estado")
+        parser.add_argument('--espera', type=int, default=10, help="wait de cada long-poll")
+
+    def escribir(self, compra, cantidad, intervalo, listo):
+        try:
+            for i in range(cantidad):
+                time.sleep(intervalo)
+                compra.estado = ESTADOS[i % len(ESTADOS)]
+                compra.save(update_fields=['estado'])
+        finally:
+            connection.close()
+            listo.set()
+
+    async def seguir(self, fabrica, since, esperados, espera, demoras, fallas):
+        recibidos = []
+        pedidos = 0
+        while len(recibidos) < esperados:
+            request = fabrica.get('/api/changes/', {'since': since, 'dni': DNI, 'wait': espera})
+            respuesta = await views_async.cambios(request)
+            pedidos += 1
+            datos = json.loads(respuesta.content)
+            if not datos['eventos'] and pedidos > esperados * 3:
+                break
+            ahora = timezone.now()
+            for evento in datos['eventos']:
+                demoras.append((ahora - parse_datetime(evento['fecha'])).total_seconds() * 1000)
+                recibidos.append(evento['seq'])
+            since = datos['ultimo']
+        if recibidos != sorted(set(recibidos)) or len(recibidos) != esperados:
+            fallas.append(recibidos)
+        return pedidos
+
+    async def correr(self, clientes, compra, options):
+        since = await sync_to_async(cambios.ultimo_visible)()
+        fabrica = AsyncRequestFactory()
+        demoras, fallas = [], []
+        listo = threading.Event()
+        consultas = cambios.vigia.consultas
+        inicio = time.perf_counter()
+        escritor = threading.Thread(
+            target=self.escribir, args=(compra, options['cambios'], options['intervalo'], listo), daemon=True
+        )
+        escritor.start()
+        pedidos = await asyncio.gather(*(
+            self.seguir(fabrica, since, options['cambios'], options['espera'], demoras, fallas)
+            for _ in range(clientes)
+        ))
+        duracion = time.perf_counter() - inicio
+        return {
+            'demoras': demoras, 'fallas': fallas, 'pedidos': sum(pedidos), 'duracion': duracion,
+            'consultas_vigia': cambios.vigia.consultas - consultas,
+        }
+
+    def handle(self, *args, **options):
+        if not base_local():
+            raise CommandError("Modifica una compra de prueba: solo con una base local (sqlite o localhost)")
+        vendedor = Vendedor.objects.first()
+        if vendedor is None:
+            raise CommandError("Hace falta al menos un vendedor (p. ej. bench_suite --sembrar 0.1)")
+        cliente, _ = ClienteMovilLocal.objects.get_or_create(
+            dni_cliente_movil_local=DNI,
+            defaults={'nombre_cliente_movil_local': 'Bench', 'apellido_cliente_movil_local': 'Cambios'},
+        )
+        compra = Compra.objects.create(id_cliente_movil_local=cliente, id_vendedor=vendedor)
+
+        r = asyncio.run(self.correr(options['clientes'], compra, options))
+        esperados = options['clientes'] * options['cambios']
+        self.stdout.write(
+            f"{options['clientes']} clientes, {options['cambios']} cambios en {r['duracion']:.1f}s: "
+            f"{len(r['demoras'])}/{esperados} eventos entregados, {r['pedidos']} requests, "
+            f"{r['consultas_vigia']} consultas del vigía"
+        )
+        self.stdout.write(
+            f"Demora de entrega: "
+            f"p50 {percentil(r['demoras'], 50):.0f}ms  p95 {percentil(r['demoras'], 95):.0f}ms  "
+            f"p99 {percentil(r['demoras'], 99):.0f}ms"
+        )
+        if r['fallas']:
+            raise CommandError(f"{len(r['fallas'])} clientes con eventos faltantes, repetidos o fuera de orden")
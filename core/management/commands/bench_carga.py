@@ -0,0 +1,30 @@
+# core/management/commands/bench_carga.py
+from django.core.management.base import BaseCommand
+
+from core.benchmarks.carga import Carga, RUTAS_PUBLICAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga concurrente sobre los endpoints públicos de lectura de uno o más "
+        "servidores levantados, p. ej. WSGI y ASGI (SERVIDOR_MODO=asgi) en puertos distintos: "
+        "bench_carga http://localhost:8000 http://localhost:8001 --dni 12345678"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('servidores', nargs='+', help='URL base de cada despliegue a comparar')
+        parser.add_argument('--rutas', nargs='*', default=list(RUTAS_PUBLICAS))
+        parser.add_argument('--concurrencia', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--dni', default='1')
+
+    def handle(self, *args, **options):
+        for servidor in options['servidores']:
+            self.stdout.write(f"{servidor} (concurrencia={options['concurrencia']})")
+            carga = Carga(servidor, concurrencia=options['concurrencia'])
+            for ruta in options['rutas']:
+                r = carga.correr(ruta, options['requests'], options['dni'])
+                self.stdout.write(
+                    f"  {r['ruta']:<36} {r['req_s']:>8} req/s  p50={r['p50']}ms p95={r['p95']}ms "
+                    f"p99={r['p99']}ms errores={r['errores']}"
+                )
@@ -0,0 +1,45 @@
+# core/management/commands/bench_conexiones.py
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia por request con conexiones nuevas en cada request (CONN_MAX_AGE=0) "
+        "y con conexiones persistentes. Con DB_PERFIL=mysql/sqlite corre contra la base local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--url', default='/api/rubros/?page_size=1')
+
+    def medir(self, conn_max_age, url, cantidad):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        client = Client()
+        client.get(url)  # calentamiento
+        tiempos = []
+        for _ in range(cantidad):
+            inicio = time.perf_counter()
+            client.get(url)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        tiempos.sort()
+        return statistics.mean(tiempos), tiempos[len(tiempos) // 2], tiempos[int(len(tiempos) * 0.95)]
+
+    def handle(self, *args, **options):
+        original = connection.settings_dict['CONN_MAX_AGE']
+        persistente = original or settings.DB_CONN_MAX_AGE or 300
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for nombre, max_age in (('sin pooling', 0), (f'persistente ({persistente}s)', persistente)):
+                    media, p50, p95 = self.medir(max_age, options['url'], options['requests'])
+                    self.stdout.write(f"{nombre:<22} media={media:.2f}ms p50={p50:.2f}ms p95={p95:.2f}ms")
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = original
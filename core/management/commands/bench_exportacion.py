@@ -0,0 +1,64 @@
+# core/management/commands/bench_exportacion.py
+import os
+import resource
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks.datos import base_local
+from core.exportacion import lineas
+from core.models import VentaLocal, Vendedor
+from core.serializer import VentaLocalSerializer
+
+
+def rss_maximo_mb():
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el pico de memoria (RSS) al exportar ventas locales en streaming y, a modo de "
+        "comparación, al serializar la tabla entera como el listado sin paginar. "
+        "Usar con DB_PERFIL=sqlite/mysql local: --generar inserta filas de prueba."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generar', type=int, default=0, help='Filas de VentaLocal a insertar antes de medir')
+        parser.add_argument('--sin-comparar', action='store_true', help='No medir el listado en memoria')
+        parser.add_argument('--forzar', action='store_true', help='Permitir --generar fuera de una base local')
+
+    def generar(self, cantidad):
+        # bulk_create no dispara señales: los resúmenes no incluyen estas filas
+        vendedor = Vendedor.objects.first()
+        lote = 10000
+        for inicio in range(0, cantidad, lote):
+            VentaLocal.objects.bulk_create([
+                VentaLocal(id_vendedor=vendedor, monto_total=Decimal('100.00'))
+                for _ in range(min(lote, cantidad - inicio))
+            ])
+
+    def handle(self, *args, **options):
+        if options['generar']:
+            if not base_local() and not options['forzar']:
+                raise CommandError("--generar solo sobre una base local (sqlite o localhost) o con --forzar")
+            self.generar(options['generar'])
+        total = VentaLocal.objects.count()
+        self.stdout.write(f"{total} ventas locales; RSS inicial {rss_maximo_mb():.1f} MB")
+
+        for formato in ('csv', 'ndjson'):
+            inicio = time.perf_counter()
+            with open(os.devnull, 'w') as salida:
+                salida.writelines(lineas('ventas_locales', formato))
+            self.stdout.write(
+                f"streaming {formato:<7} {time.perf_counter() - inicio:.2f}s  RSS pico {rss_maximo_mb():.1f} MB"
+            )
+
+        if not options['sin_comparar']:
+            # El pico de RSS solo crece, por eso esta medición va al final
+            inicio = time.perf_counter()
+            datos = VentaLocalSerializer(VentaLocal.objects.all(), many=True).data
+            self.stdout.write(
+                f"lista en memoria {time.perf_counter() - inicio:.2f}s  RSS pico {rss_maximo_mb():.1f} MB ({len(datos)} filas)"
+            )
@@ -0,0 +1,52 @@
+# core/management/commands/bench_importacion.py
+import csv
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks.datos import base_local
+from core.importacion import importar_lista, leer_archivo
+from core.models import Proveedor
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera una lista de precios sintética de N filas y mide filas/s del dry-run, de la "
+        "importación inicial (altas) y de una segunda con precios nuevos (modificaciones). "
+        "Escribe en la base: usar con DB_PERFIL=sqlite/mysql local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=100000)
+        parser.add_argument('--lote', type=int, default=1000)
+
+    def escribir(self, ruta, filas, aumento):
+        with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(['nombre_producto', 'precio', 'stock_actual', 'rubro'])
+            for i in range(filas):
+                escritor.writerow([f'bench-{i:07d}', f'{100 + i % 500 + aumento}.50', i % 40, f'bench-rubro-{i % 25}'])
+
+    def correr(self, nombre, proveedor, ruta, dry_run, lote):
+        with open(ruta, 'rb') as archivo:
+            reporte = importar_lista(proveedor, leer_archivo(archivo, ruta), dry_run=dry_run, lote=lote)
+        self.stdout.write(
+            f"{nombre:<14} {reporte['segundos']:>7}s {reporte['filas_por_segundo']:>8} filas/s  "
+            f"nuevos={reporte['nuevos']} actualizados={reporte['actualizados']} errores={reporte['con_error']}"
+        )
+
+    def handle(self, *args, **options):
+        if not base_local():
+            raise CommandError("Crea productos de prueba: solo con una base local (sqlite o localhost)")
+        proveedor, _ = Proveedor.objects.get_or_create(
+            email='bench-importacion@example.com',
+            defaults={'nombre_proveedor': 'Bench', 'telefono': '0', 'domicilio': '-'},
+        )
+        with tempfile.TemporaryDirectory() as directorio:
+            inicial, cambios = os.path.join(directorio, 'inicial.csv'), os.path.join(directorio, 'cambios.csv')
+            self.escribir(inicial, options['filas'], 0)
+            self.escribir(cambios, options['filas'], 10)
+            self.correr('dry-run', proveedor, inicial, True, options['lote'])
+            self.correr('altas', proveedor, inicial, False, options['lote'])
+            self.correr('modificaciones', proveedor, cambios, False, options['lote'])
@@ -0,0 +1,69 @@
+# core/management/commands/bench_login.py
+import time
+
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from core.benchmarks.datos import base_local
+from core.models import Usuario
+from core.serializer import EmailTokenObtainPairSerializer
+
+
+# Configuración previa: ModelBackend + EmailBackend y el hasher por defecto de Django
+BACKENDS_ANTERIORES = ['django.contrib.auth.backends.ModelBackend', 'core.backend.EmailBackend']
+HASHERS_ANTERIORES = ['django.contrib.auth.hashers.PBKDF2PasswordHasher']
+
+
+def login_anterior(email, password):
+    # authenticate() y después super().validate() autenticando de nuevo
+    authenticate(email=email, password=password)
+    serializer = TokenObtainPairSerializer(data={'email': email, 'password': password})
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def login_actual(email, password):
+    serializer = EmailTokenObtainPairSerializer(data={'email': email, 'password': password})
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide logins por segundo con el pipeline actual y con el anterior (doble autenticación). "
+        "Crea y borra usuarios de prueba: usar solo con una base local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20)
+
+    def medir(self, funcion, email, password, cantidad):
+        funcion(email, password)  # calentamiento (y re-hash si corresponde)
+        inicio = time.perf_counter()
+        for _ in range(cantidad):
+            funcion(email, password)
+        return cantidad / (time.perf_counter() - inicio)
+
+    def handle(self, *args, **options):
+        if not base_local():
+            raise CommandError("Crea y borra usuarios de prueba: solo con una base local (sqlite o localhost)")
+        password = 'bench-login-123'
+        cantidad = options['logins']
+
+        with override_settings(AUTHENTICATION_BACKENDS=BACKENDS_ANTERIORES, PASSWORD_HASHERS=HASHERS_ANTERIORES):
+            usuario = Usuario.objects.create_user('bench-login-anterior@example.com', password)
+            try:
+                anterior = self.medir(login_anterior, usuario.email, password, cantidad)
+            finally:
+                usuario.delete()
+
+        usuario = Usuario.objects.create_user('bench-login-actual@example.com', password)
+        try:
+            actual = self.medir(login_actual, usuario.email, password, cantidad)
+        finally:
+            usuario.delete()
+
+        self.stdout.write(f"anterior: {anterior:.1f} logins/s")
+        self.stdout.write(f"actual:   {actual:.1f} logins/s ({actual / anterior:.1f}x)")
@@ -0,0 +1,86 @@
+# core/management/commands/bench_paginacion_graphql.py
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from core.benchmarks.datos import base_local, _repartir_fechas
+from core.conexiones import Pagina
+from core.models import Compra, ClienteMovilLocal, Vendedor
+from core.schema import schema, ORDEN_COMPRAS
+
+DNI = '00000001'
+CONSULTA = (
+    'query($dni: String, $after: String) { compras(dni: $dni, first: 20, after: $after) '
+    '{ edges { node { id fecha productos { cantidad } } } pageInfo { endCursor hasNextPage } } }'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Latencia de una página de la conexión GraphQL `compras` (keyset) al crecer el historial de un "
+        "cliente, en la primera página y en una al 90%% del historial; y solo la consulta SQL de esa página, "
+        "por keyset y con OFFSET. "
+        "Inserta compras de prueba: usar solo con una base local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', nargs='+', type=int, default=[1000, 10000, 50000])
+        parser.add_argument('--repeticiones', type=int, default=30)
+
+    def medir(self, funcion, repeticiones):
+        funcion()  # calentamiento
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return round(statistics.median(tiempos), 2)
+
+    def consulta(self, after=None):
+        request = RequestFactory().post('/api/graphql/')
+        resultado = schema.execute(CONSULTA, variable_values={'dni': DNI, 'after': after}, context_value=request)
+        if resultado.errors:
+            raise CommandError(str(resultado.errors[0]))
+
+    def handle(self, *args, **options):
+        if not base_local():
+            raise CommandError("Inserta compras de prueba: solo con una base local (sqlite o localhost)")
+        vendedor = Vendedor.objects.first()
+        if vendedor is None:
+            raise CommandError("Hace falta al menos un vendedor (p. ej. bench_suite --sembrar 0.1)")
+        cliente, _ = ClienteMovilLocal.objects.get_or_create(
+            dni_cliente_movil_local=DNI,
+            defaults={'nombre_cliente_movil_local': 'Bench', 'apellido_cliente_movil_local': 'Historial'},
+        )
+        compras = Compra.objects.filter(id_cliente_movil_local=cliente)
+        orden = [('-' if descendente else '') + campo for campo, descendente in ORDEN_COMPRAS]
+
+        self.stdout.write(
+            f"{'compras':>8} {'GraphQL 1ra':>12} {'GraphQL 90%':>12} {'SQL keyset':>12} {'SQL offset':>12}"
+        )
+        for tamano in sorted(options['tamanos']):
+            faltan = tamano - compras.count()
+            if faltan > 0:
+                existentes = set(compras.values_list('id', flat=True))
+                Compra.objects.bulk_create(
+                    [Compra(id_cliente_movil_local=cliente, id_vendedor=vendedor) for _ in range(faltan)],
+                    batch_size=2000,
+                )
+                nuevas = [pk for pk in compras.values_list('id', flat=True) if pk not in existentes]
+                _repartir_fechas(Compra, 'fecha', nuevas, random.Random(tamano))
+
+            posicion = int(tamano * 0.9)
+            fila = compras.order_by(*orden)[posicion - 1]
+            cursor = Pagina(compras, ORDEN_COMPRAS).cursor(fila)
+            primera = self.medir(lambda: self.consulta(), options['repeticiones'])
+            profunda = self.medir(lambda: self.consulta(cursor), options['repeticiones'])
+            keyset = self.medir(
+                lambda: list(Pagina(compras, ORDEN_COMPRAS, first=20, after=cursor).queryset), options['repeticiones']
+            )
+            offset = self.medir(
+                lambda: list(compras.order_by(*orden)[posicion:posicion + 20]), options['repeticiones']
+            )
+            self.stdout.write(f"{tamano:>8} {primera:>10}ms {profunda:>10}ms {keyset:>10}ms {offset:>10}ms")
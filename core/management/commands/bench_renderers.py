@@ -0,0 +1,58 @@
+# core/management/commands/bench_renderers.py
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.optimizacion import filas_rapidas, lectura_rapida, optimizar_queryset
+from core.renderers import RendererJSONRapido
+from core.reportes import consultar_resumen
+from core.urls import router
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el tiempo de render del JSONRenderer de DRF contra RendererJSONRapido sobre los "
+        "listados de cada ViewSet y el reporte de ventas, y verifica que los bytes sean idénticos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=5000)
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def medir(self, renderer, data, repeticiones):
+        mejor = None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            contenido = renderer.render(data)
+            duracion = time.perf_counter() - inicio
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        return contenido, mejor
+
+    def comparar(self, nombre, data, repeticiones):
+        drf, t_drf = self.medir(JSONRenderer(), data, repeticiones)
+        rapido, t_rapido = self.medir(RendererJSONRapido(), data, repeticiones)
+        self.stdout.write(
+            f"{nombre:<26} {len(drf) / 1024:>8.1f} KB  drf={t_drf * 1000:>7.2f}ms  "
+            f"orjson={t_rapido * 1000:>7.2f}ms  x{t_drf / t_rapido:.1f}  "
+            + ("idéntico" if drf == rapido else self.style.ERROR("DISTINTO"))
+        )
+
+    def handle(self, *args, **options):
+        vistos = set()
+        for prefijo, viewset, _ in router.registry:
+            serializer_class = viewset.serializer_class
+            if viewset in vistos:
+                continue
+            vistos.add(viewset)
+            queryset = viewset.queryset.order_by('pk')[:options['filas']]
+            if lectura_rapida(serializer_class) is not None:
+                data = filas_rapidas(queryset, serializer_class)
+            else:
+                data = serializer_class(optimizar_queryset(queryset, serializer_class), many=True).data
+            self.comparar(prefijo, data, options['repeticiones'])
+
+        # Respuesta armada a mano con fechas (date) sin pasar por un serializer
+        hoy = datetime.date.today()
+        self.comparar('reportes/ventas', consultar_resumen('dia', hoy.replace(day=1), hoy), options['repeticiones'])
@@ -0,0 +1,55 @@
+# core/management/commands/bench_serializadores.py
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.optimizacion import ListadoRapidoMixin, filas_rapidas, lectura_rapida, optimizar_queryset
+from core.urls import router
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara filas/s del serializer de DRF contra el listado rápido por values() en cada "
+        "ViewSet con ListadoRapidoMixin, y verifica que el JSON sea idéntico byte a byte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=5000, help='Máximo de filas por ViewSet')
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def medir(self, funcion, repeticiones):
+        mejor = None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            datos = funcion()
+            duracion = time.perf_counter() - inicio
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        return datos, mejor
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        vistos = set()
+        for prefijo, viewset, _ in router.registry:
+            if not issubclass(viewset, ListadoRapidoMixin) or viewset in vistos:
+                continue
+            vistos.add(viewset)
+            serializer_class = viewset.serializer_class
+            if lectura_rapida(serializer_class) is None:
+                self.stdout.write(f"{prefijo:<26} (sin listado rápido: {serializer_class.__name__})")
+                continue
+
+            queryset = viewset.queryset.order_by('pk')[:options['filas']]
+            normal, t_normal = self.medir(
+                lambda: serializer_class(optimizar_queryset(queryset, serializer_class), many=True).data,
+                options['repeticiones'],
+            )
+            rapido, t_rapido = self.medir(lambda: filas_rapidas(queryset, serializer_class), options['repeticiones'])
+
+            filas = len(normal) or 1
+            identico = renderer.render(normal) == renderer.render(rapido)
+            self.stdout.write(
+                f"{prefijo:<26} {len(normal):>6} filas  drf={filas / t_normal:>9.0f} filas/s  "
+                f"rapido={filas / t_rapido:>9.0f} filas/s  x{t_normal / t_rapido:.1f}  "
+                + ("JSON idéntico" if identico else self.style.ERROR("JSON DISTINTO"))
+            )
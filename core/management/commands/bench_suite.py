@@ -0,0 +1,88 @@
+# core/management/commands/bench_suite.py
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.benchmarks import datos
+from core.benchmarks.suite import (
+    ESCENARIOS, Suite, ClienteEnProceso, ClienteHTTP, reporte, comparar
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Suite reproducible de carga: siembra datos (--sembrar), recorre los endpoints REST, "
+        "GraphQL y el login con N clientes concurrentes y guarda throughput, p50/p95/p99 y "
+        "consultas por request en un JSON que se puede comparar entre commits (--comparar). "
+        "Sin --url corre en proceso; con --url golpea un servidor levantado con METRICAS_CABECERAS=True."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sembrar', type=float, metavar='ESCALA', help='Cargar datos de prueba a esta escala')
+        parser.add_argument('--escala', type=float, default=1.0, help='Escala de los datos ya sembrados')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--forzar', action='store_true', help='Permitir --sembrar fuera de una base local')
+        parser.add_argument('--url', help='URL base de un servidor levantado (por defecto, en proceso)')
+        parser.add_argument('--escenarios', nargs='*', default=list(ESCENARIOS), choices=list(ESCENARIOS))
+        parser.add_argument('--concurrencia', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=200, help='Requests por escenario')
+        parser.add_argument('--salida', help='Archivo JSON del reporte')
+        parser.add_argument('--comparar', metavar='BASE.json', help='Reporte anterior contra el que comparar')
+        parser.add_argument('--umbral', type=float, default=10.0, help='Variación %% que cuenta como regresión')
+        parser.add_argument('--estricto', action='store_true', help='Terminar con error si hay regresiones')
+
+    def handle(self, *args, **options):
+        if options['sembrar'] is not None:
+            if not datos.base_local() and not options['forzar']:
+                raise CommandError("--sembrar solo sobre una base local (sqlite o localhost) o con --forzar")
+            creadas = datos.sembrar(options['sembrar'], options['semilla'])
+            self.stdout.write("Datos sembrados: " + ", ".join(f"{k}={v}" for k, v in creadas.items()))
+            options['escala'] = options['sembrar']
+
+        if options['url']:
+            cliente = ClienteHTTP(options['url'])
+            resultados = self.correr(cliente, options)
+        else:
+            hosts = list(settings.ALLOWED_HOSTS) + ['testserver']
+            with override_settings(ALLOWED_HOSTS=hosts, METRICAS_CABECERAS=True):
+                resultados = self.correr(ClienteEnProceso(), options)
+
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Reporte en {options['salida']}")
+
+        if options['comparar']:
+            with open(options['comparar']) as archivo:
+                base = json.load(archivo)
+            self.mostrar_comparacion(base, resultados, options)
+
+    def correr(self, cliente, options):
+        suite = Suite(
+            cliente, concurrencia=options['concurrencia'], requests=options['requests'],
+            semilla=options['semilla'], escala=options['escala'],
+        )
+        self.stdout.write(f"{cliente.nombre} (concurrencia={suite.concurrencia}, requests={suite.requests})")
+        resultados = {}
+        for nombre in options['escenarios']:
+            r = resultados[nombre] = suite.correr_escenario(nombre)
+            self.stdout.write(
+                f"  {nombre:<16} {r['req_s']:>8} req/s  p50={r['p50']}ms p95={r['p95']}ms p99={r['p99']}ms "
+                f"consultas={r['consultas_promedio']} errores={r['errores']}"
+            )
+        return reporte(suite, resultados, options['url'])
+
+    def mostrar_comparacion(self, base, actual, options):
+        self.stdout.write(f"Comparación contra {base['meta'].get('commit')} ({options['comparar']})")
+        regresiones = 0
+        for nombre, metrica, antes, ahora, variacion, empeoro in comparar(base, actual, options['umbral']):
+            linea = f"  {nombre:<16} {metrica:<20} {antes:>10} -> {ahora:<10} {variacion:+.1f}%"
+            if empeoro:
+                regresiones += 1
+                self.stdout.write(self.style.WARNING(linea + "  REGRESIÓN"))
+            else:
+                self.stdout.write(linea)
+        if regresiones and options['estricto']:
+            raise CommandError(f"{regresiones} regresiones sobre el {options['umbral']}%")
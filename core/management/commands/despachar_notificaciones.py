@@ -0,0 +1,36 @@
+# core/management/commands/despachar_notificaciones.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.notificaciones import despachar_lote
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Worker que envía las notificaciones pendientes del outbox en lotes, con reintentos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50)
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help="Segundos de espera cuando no hay nada para enviar")
+        parser.add_argument('--una-vez', action='store_true', help="Procesa lo pendiente y termina")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            try:
+                enviadas = despachar_lote(tamano=options['lote'])
+            except Exception:
+                # una falla de la base o de FCM no tira el worker: se reintenta después del intervalo
+                logger.exception("Fallo al despachar notificaciones")
+                enviadas = 0
+            if enviadas:
+                self.stdout.write(f"{enviadas} notificación(es) procesada(s)")
+                continue
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,90 @@
+# core/management/commands/estres_stock.py
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+
+from core.models import Producto, ReservaStock, Rubro
+from core.stock import reservar, confirmar_reserva, liberar_reserva, StockInsuficiente
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de concurrencia de reservas: muchos vendedores en paralelo contra un mismo producto. "
+        "Verifica que no haya sobreventa y mide operaciones por segundo. Usar con una base local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendedores', type=int, default=16)
+        parser.add_argument('--operaciones', type=int, default=200, help="Reservas por vendedor")
+        parser.add_argument('--stock', type=int, default=1000)
+        parser.add_argument('--cantidad', type=int, default=1)
+        parser.add_argument('--liberar-cada', type=int, default=5,
+                            help="Cada cuántas reservas se libera en lugar de confirmar (0 = nunca)")
+
+    def handle(self, *args, **options):
+        rubro, _ = Rubro.objects.get_or_create(nombre_rubro='__estres_stock__')
+        producto = Producto.objects.create(
+            id_rubro=rubro, nombre_producto='__estres_stock__', precio=1, stock_actual=options['stock']
+        )
+        contadores = {'confirmadas': 0, 'liberadas': 0, 'sin_stock': 0, 'reintentos': 0}
+        lock = threading.Lock()
+
+        def sumar(clave):
+            with lock:
+                contadores[clave] += 1
+
+        def reintentar(funcion, *args):
+            # SQLite serializa las escrituras: 'database is locked' se reintenta
+            while True:
+                try:
+                    return funcion(*args)
+                except OperationalError:
+                    sumar('reintentos')
+                    time.sleep(0.001)
+
+        def vendedor():
+            try:
+                for i in range(1, options['operaciones'] + 1):
+                    try:
+                        reserva = reintentar(reservar, producto.id, options['cantidad'])
+                    except StockInsuficiente:
+                        sumar('sin_stock')
+                        continue
+                    if options['liberar_cada'] and i % options['liberar_cada'] == 0:
+                        reintentar(liberar_reserva, reserva.id)
+                        sumar('liberadas')
+                    else:
+                        reintentar(confirmar_reserva, reserva.id)
+                        sumar('confirmadas')
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=vendedor) for _ in range(options['vendedores'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        producto.refresh_from_db()
+        esperado = options['stock'] - contadores['confirmadas'] * options['cantidad']
+        operaciones = contadores['confirmadas'] + contadores['liberadas'] + contadores['sin_stock']
+        self.stdout.write(
+            f"{options['vendedores']} vendedores, {operaciones} operaciones en {duracion:.2f}s "
+            f"({operaciones / duracion:.0f} ops/s)\n"
+            f"confirmadas={contadores['confirmadas']} liberadas={contadores['liberadas']} "
+            f"sin_stock={contadores['sin_stock']} reintentos={contadores['reintentos']}\n"
+            f"stock final={producto.stock_actual} esperado={esperado}"
+        )
+
+        ReservaStock.objects.filter(id_producto=producto).delete()
+        producto.delete()
+        if rubro.producto_set.count() == 0:
+            rubro.delete()
+
+        if producto.stock_actual != esperado or producto.stock_actual < 0:
+            raise CommandError("Sobreventa detectada: el stock final no coincide con las reservas confirmadas")
+        self.stdout.write(self.style.SUCCESS("Sin sobreventa"))
@@ -0,0 +1,80 @@
+# core/management/commands/explicar_consultas.py
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import ClienteMovilLocal, Compra, SolicitudContacto
+from core.optimizacion import optimizar_queryset
+from core.pagination import CompraCursorPagination
+from core.serializer import CompraSerializer
+
+
+def consultas_criticas(dni='00000000'):
+    """
+    Querysets de los caminos calientes, armados igual que en las vistas.
+    """
+    orden_compras = CompraCursorPagination.ordering
+    compras = optimizar_queryset(Compra.objects.all(), CompraSerializer)
+    clientes_movil = ClienteMovilLocal.objects.filter(dni_cliente_movil_local=dni)
+    return [
+        ('estado_compra (clientes)', clientes_movil),
+        ('estado_compra (compras)', compras.filter(id_cliente_movil_local__in=clientes_movil)),
+        ('CompraViewSet.por_dni', compras.filter(
+            id_cliente_movil_local__dni_cliente_movil_local=dni).order_by(*orden_compras)),
+        ('CompraViewSet.pendientes', compras.filter(estado='Pendiente').order_by(*orden_compras)),
+        ('solicitudes_pendientes', SolicitudContacto.objects.filter(
+            estado='pendiente').order_by('-fecha_creacion')),
+        ('graphql compras_por_cliente_movil_local', Compra.objects.filter(
+            id_cliente_movil_local__dni_cliente_movil_local=dni)),
+    ]
+
+
+def _tablas_mysql(nodo, encontradas):
+    if isinstance(nodo, dict):
+        if nodo.get('access_type') in ('ALL', 'index'):
+            encontradas.append(nodo.get('table_name', '?'))
+        for valor in nodo.values():
+            _tablas_mysql(valor, encontradas)
+    elif isinstance(nodo, list):
+        for valor in nodo:
+            _tablas_mysql(valor, encontradas)
+    return encontradas
+
+
+def escaneos_completos(queryset):
+    """
+    Devuelve (plan, tablas recorridas completas) según el EXPLAIN del motor.
+    """
+    if connection.vendor == 'mysql':
+        plan = queryset.explain(format='JSON')
+        return plan, _tablas_mysql(json.loads(plan), [])
+    plan = queryset.explain()
+    if connection.vendor == 'sqlite':
+        tablas = re.findall(r'\bSCAN (\w+)$', plan, flags=re.MULTILINE)
+    else:
+        tablas = re.findall(r'Seq Scan on (\w+)', plan)
+    return plan, tablas
+
+
+class Command(BaseCommand):
+    help = "Ejecuta EXPLAIN sobre las consultas de las vistas y falla si alguna recorre una tabla completa."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plan', action='store_true', help="Muestra el plan completo de cada consulta")
+
+    def handle(self, *args, **options):
+        fallas = []
+        for nombre, queryset in consultas_criticas():
+            plan, tablas = escaneos_completos(queryset)
+            if tablas:
+                fallas.append(nombre)
+                self.stdout.write(self.style.ERROR(f"{nombre}: escaneo completo de {', '.join(tablas)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{nombre}: OK"))
+            if options['verbose_plan']:
+                self.stdout.write(plan)
+
+        if fallas:
+            raise CommandError(f"{len(fallas)} consulta(s) sin índice: {', '.join(fallas)}")
@@ -0,0 +1,33 @@
+# core/management/commands/exportar_historial.py
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.exportacion import EXPORTABLES, FORMATOS, lineas
+
+
+class Command(BaseCommand):
+    help = "Exporta el historial completo de compras, ventas o ventas locales a CSV / NDJSON, por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('nombre', choices=list(EXPORTABLES))
+        parser.add_argument('--formato', choices=list(FORMATOS), default='csv')
+        parser.add_argument('--desde', help='AAAA-MM-DD')
+        parser.add_argument('--hasta', help='AAAA-MM-DD')
+        parser.add_argument('--salida', help='Archivo de salida (por defecto stdout)')
+        parser.add_argument('--lote', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            desde = parse_date(options['desde']) if options['desde'] else None
+            hasta = parse_date(options['hasta']) if options['hasta'] else None
+        except ValueError as e:
+            raise CommandError(f"Fecha inválida: {e}")
+
+        texto = lineas(options['nombre'], options['formato'], desde, hasta, lote=options['lote'])
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8', newline='') as salida:
+                salida.writelines(texto)
+        else:
+            sys.stdout.writelines(texto)
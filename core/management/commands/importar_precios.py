@@ -0,0 +1,33 @@
+# core/management/commands/importar_precios.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacion import ImportacionInvalida, importar_lista, leer_archivo
+from core.models import Proveedor
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa la lista de precios de un proveedor (CSV o XLSX con columnas nombre_producto, "
+        "precio, stock_actual, rubro, descripcion, en_promocion). --dry-run solo informa los cambios."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('proveedor_id', type=int)
+        parser.add_argument('archivo')
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--lote', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        proveedor = Proveedor.objects.filter(id=options['proveedor_id']).first()
+        if proveedor is None:
+            raise CommandError(f"No existe el proveedor {options['proveedor_id']}")
+
+        with open(options['archivo'], 'rb') as archivo:
+            try:
+                filas = leer_archivo(archivo, options['archivo'])
+                reporte = importar_lista(proveedor, filas, dry_run=options['dry_run'], lote=options['lote'])
+            except ImportacionInvalida as e:
+                raise CommandError(str(e))
+        self.stdout.write(json.dumps(reporte, indent=2, ensure_ascii=False))
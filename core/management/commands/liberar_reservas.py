@@ -0,0 +1,15 @@
+# core/management/commands/liberar_reservas.py
+from django.core.management.base import BaseCommand
+
+from core.stock import liberar_vencidas
+
+
+class Command(BaseCommand):
+    help = "Devuelve al stock las reservas vencidas (correr periódicamente, ej. cron cada minuto)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=500)
+
+    def handle(self, *args, **options):
+        liberadas = liberar_vencidas(limite=options['limite'])
+        self.stdout.write(self.style.SUCCESS(f"{liberadas} reserva(s) vencida(s) liberada(s)"))
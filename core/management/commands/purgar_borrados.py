@@ -0,0 +1,18 @@
+# core/management/commands/purgar_borrados.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sincronizacion import purgar_borrados
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina los borrados de la sincronización incremental con más de SINCRONIZACION_BORRADOS_DIAS "
+        "(correr periódicamente, ej. cron diario)."
+    )
+
+    def handle(self, *args, **options):
+        purgados = purgar_borrados()
+        self.stdout.write(self.style.SUCCESS(
+            f"{purgados} borrado(s) con más de {settings.SINCRONIZACION_BORRADOS_DIAS} días eliminado(s)"
+        ))
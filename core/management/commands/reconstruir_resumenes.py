@@ -0,0 +1,12 @@
+# core/management/commands/reconstruir_resumenes.py
+from django.core.management.base import BaseCommand
+
+from core.reportes import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde cero los resúmenes diarios/mensuales por vendedor y por rubro."
+
+    def handle(self, *args, **options):
+        ventas, rubros = reconstruir_resumenes()
+        self.stdout.write(self.style.SUCCESS(f"{ventas} resúmenes de ventas y {rubros} por rubro"))
@@ -0,0 +1,32 @@
+# core/management/commands/registrar_consultas_graphql.py
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from graphql import parse, validate, GraphQLError
+
+from core.consultas_graphql import registrar_consulta, hash_consulta
+from core.schema import schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Valida consultas GraphQL (.graphql) contra el schema y las registra como persistidas; "
+        "muestra el sha256 que debe mandar el cliente. El registro vive en el alias 'graphql' de "
+        "CACHES (usar un backend compartido); para registrarlas en cada arranque, GRAPHQL_CONSULTAS_DIR."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivos', nargs='+')
+        parser.add_argument('--solo-hash', action='store_true', help='Validar y mostrar los hash sin registrar')
+
+    def handle(self, *args, **options):
+        for nombre in options['archivos']:
+            query = Path(nombre).read_text()
+            try:
+                errores = validate(schema.graphql_schema, parse(query))
+            except GraphQLError as e:
+                errores = [e]
+            if errores:
+                raise CommandError(f"{nombre}: {errores[0].message}")
+            hash_ = hash_consulta(query) if options['solo_hash'] else registrar_consulta(query)
+            self.stdout.write(f"{hash_}  {nombre}")
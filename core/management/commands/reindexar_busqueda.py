@@ -0,0 +1,16 @@
+# core/management/commands/reindexar_busqueda.py
+from django.core.management.base import BaseCommand
+
+from core.busqueda import INDEXADOS, reindexar
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda (trigramas) de productos, clientes y clientes locales."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', action='append', choices=list(INDEXADOS))
+        parser.add_argument('--lote', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = reindexar(options['tipo'], lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"Índice reconstruido: {total} entradas"))
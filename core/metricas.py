@@ -0,0 +1,280 @@
+# core/metricas.py
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------
+# Medición por request ##############################################################################################
+# El middleware abre una Medicion en un ContextVar; el execute wrapper que se
+# instala en cada conexión (señal connection_created) suma ahí las consultas.
+# El ContextVar viaja a los hilos de sync_to_async, así que también cuenta las
+# consultas de las vistas async. Los agregados son por proceso: con varios
+# workers de gunicorn cada uno expone los suyos.
+_medicion = ContextVar('medicion_request', default=None)
+
+_LISTA_IN = re.compile(r'\((?:%s, )+%s\)')
+
+
+def forma_sql(sql):
+    # Django ya separa los parámetros (%s); solo varía el largo de los IN (...)
+    return _LISTA_IN.sub('(%s...)', sql)
+
+
+class Medicion:
+    __slots__ = ('inicio', 'consultas', 'tiempo_db', 'inicio_render', 'tiempo_render', 'formas')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.inicio_render = None
+        self.tiempo_render = 0.0
+        self.formas = Counter()
+
+    def consulta(self, sql, duracion):
+        self.consultas += 1
+        self.tiempo_db += duracion
+        self.formas[forma_sql(sql)] += 1
+
+    def repetidas(self, minimo):
+        return [(forma, veces) for forma, veces in self.formas.items() if veces >= minimo]
+
+
+def registrar_consulta(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.consulta(sql, time.perf_counter() - inicio)
+
+
+def instalar(connection):
+    if registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_consulta)
+
+
+# --------------------
+# Agregados por ruta ################################################################################################
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200)
+CUANTILES = (0.5, 0.95, 0.99)
+MUESTRAS_RECIENTES = 1024
+
+
+class Histograma:
+    __slots__ = ('limites', 'cuentas', 'suma', 'total')
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * len(limites)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        indice = bisect.bisect_left(self.limites, valor)
+        if indice < len(self.cuentas):
+            self.cuentas[indice] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self):
+        acumulado = 0
+        for limite, cuenta in zip(self.limites, self.cuentas):
+            acumulado += cuenta
+            yield limite, acumulado
+
+
+class MetricasRuta:
+    def __init__(self):
+        self.duracion = Histograma(BUCKETS_SEGUNDOS)
+        self.db = Histograma(BUCKETS_SEGUNDOS)
+        self.render = Histograma(BUCKETS_SEGUNDOS)
+        self.consultas = Histograma(BUCKETS_CONSULTAS)
+        self.recientes = deque(maxlen=MUESTRAS_RECIENTES)
+        self.n_mas_uno = 0
+        self.errores = 0
+
+
+class Registro:
+    def __init__(self):
+        self._rutas = {}
+        self._lock = threading.Lock()
+
+    def observar(self, metodo, ruta, estado, medicion, duracion, repetidas):
+        with self._lock:
+            metricas = self._rutas.get((metodo, ruta))
+            if metricas is None:
+                metricas = self._rutas[(metodo, ruta)] = MetricasRuta()
+            metricas.duracion.observar(duracion)
+            metricas.db.observar(medicion.tiempo_db)
+            metricas.render.observar(medicion.tiempo_render)
+            metricas.consultas.observar(medicion.consultas)
+            metricas.recientes.append(duracion)
+            if repetidas:
+                metricas.n_mas_uno += 1
+            if estado >= 500:
+                metricas.errores += 1
+
+    def reiniciar(self):
+        with self._lock:
+            self._rutas.clear()
+
+    def resumen(self):
+        """
+        {(metodo, ruta): {...}} con percentiles de las últimas muestras, para reportes.
+        """
+        with self._lock:
+            salida = {}
+            for clave, metricas in self._rutas.items():
+                ordenadas = sorted(metricas.recientes)
+                salida[clave] = {
+                    'requests': metricas.duracion.total,
+                    'consultas_promedio': metricas.consultas.suma / metricas.consultas.total,
+                    'db_promedio': metricas.db.suma / metricas.db.total,
+                    'render_promedio': metricas.render.suma / metricas.render.total,
+                    'n_mas_uno': metricas.n_mas_uno,
+                    'errores': metricas.errores,
+                    **{f'p{int(q * 100)}': _cuantil(ordenadas, q) for q in CUANTILES},
+                }
+            return salida
+
+    def prometheus(self):
+        lineas = []
+        with self._lock:
+            rutas = sorted(self._rutas.items())
+            for nombre, ayuda, atributo in (
+                ('moto_request_duration_seconds', 'Latencia total del request', 'duracion'),
+                ('moto_request_db_seconds', 'Tiempo en la base por request', 'db'),
+                ('moto_request_render_seconds', 'Tiempo de render (serialización) de la respuesta', 'render'),
+                ('moto_request_queries', 'Consultas SQL por request', 'consultas'),
+            ):
+                lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} histogram']
+                for (metodo, ruta), metricas in rutas:
+                    histograma = getattr(metricas, atributo)
+                    etiquetas = f'metodo="{metodo}",ruta="{_escapar(ruta)}"'
+                    for limite, acumulado in histograma.acumulados():
+                        lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+                    lineas.append(f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {histograma.total}')
+                    lineas.append(f'{nombre}_sum{{{etiquetas}}} {histograma.suma:.6f}')
+                    lineas.append(f'{nombre}_count{{{etiquetas}}} {histograma.total}')
+
+            nombre = 'moto_request_recent_duration_seconds'
+            lineas += [f'# HELP {nombre} Percentiles de los últimos {MUESTRAS_RECIENTES} requests', f'# TYPE {nombre} summary']
+            for (metodo, ruta), metricas in rutas:
+                etiquetas = f'metodo="{metodo}",ruta="{_escapar(ruta)}"'
+                ordenadas = sorted(metricas.recientes)
+                for q in CUANTILES:
+                    lineas.append(f'{nombre}{{{etiquetas},quantile="{q}"}} {_cuantil(ordenadas, q):.6f}')
+                lineas.append(f'{nombre}_sum{{{etiquetas}}} {sum(ordenadas):.6f}')
+                lineas.append(f'{nombre}_count{{{etiquetas}}} {len(ordenadas)}')
+
+            for nombre, ayuda, atributo in (
+                ('moto_n_plus_one_total', 'Requests con la misma consulta repetida (posible N+1)', 'n_mas_uno'),
+                ('moto_request_errors_total', 'Respuestas 5xx', 'errores'),
+            ):
+                lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter']
+                for (metodo, ruta), metricas in rutas:
+                    lineas.append(f'{nombre}{{metodo="{metodo}",ruta="{_escapar(ruta)}"}} {getattr(metricas, atributo)}')
+        return '\n'.join(lineas) + '\n'
+
+
+def _cuantil(ordenadas, q):
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * q))]
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registro = Registro()
+
+
+def nombre_ruta(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'sin_ruta'
+    return match.view_name or match.route or 'sin_ruta'
+
+
+# --------------------
+# Middleware ########################################################################################################
+class MetricasMiddleware:
+    """
+    Registra latencia, consultas, tiempo de base y de render por ruta
+    (settings.METRICAS_ACTIVAS) y avisa en el log cuando una misma consulta
+    se repite METRICAS_N_MAS_UNO veces o más en un request. Con
+    METRICAS_CABECERAS informa consultas y tiempo de base (ms) en la respuesta.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self._acall(request)
+        if not settings.METRICAS_ACTIVAS:
+            return self.get_response(request)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        self.registrar(request, response, medicion)
+        return response
+
+    async def _acall(self, request):
+        if not settings.METRICAS_ACTIVAS:
+            return await self.get_response(request)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        self.registrar(request, response, medicion)
+        return response
+
+    def process_template_response(self, request, response):
+        # Las Response de DRF se renderizan justo después de este hook
+        medicion = _medicion.get()
+        if medicion is not None:
+            medicion.inicio_render = time.perf_counter()
+            response.add_post_render_callback(lambda r: self._fin_render(medicion))
+        return response
+
+    @staticmethod
+    def _fin_render(medicion):
+        medicion.tiempo_render = time.perf_counter() - medicion.inicio_render
+
+    def registrar(self, request, response, medicion):
+        duracion = time.perf_counter() - medicion.inicio
+        if settings.METRICAS_CABECERAS:
+            # En respuestas streaming solo cuentan las consultas hechas antes del primer byte
+            response['X-Consultas'] = str(medicion.consultas)
+            response['X-Tiempo-DB'] = f'{medicion.tiempo_db * 1000:.2f}'
+        ruta = nombre_ruta(request)
+        repetidas = medicion.repetidas(settings.METRICAS_N_MAS_UNO)
+        for forma, veces in repetidas:
+            logger.warning("Posible N+1 en %s %s: %d veces %s", request.method, ruta, veces, forma)
+        registro.observar(request.method, ruta, response.status_code, medicion, duracion, repetidas)
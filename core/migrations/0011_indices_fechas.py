@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_marca'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='compra',
+            name='fecha',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='ventalocal',
+            name='fecha_venta',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
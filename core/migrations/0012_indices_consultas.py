@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_indices_fechas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='clientemovillocal',
+            name='dni_cliente_movil_local',
+            field=models.CharField(db_index=True, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['estado', 'fecha'], name='compra_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudcontacto',
+            index=models.Index(fields=['estado', 'fecha_creacion'], name='solicitud_estado_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:07
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_notificacionpendiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenRubro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('dia', 'Día'), ('mes', 'Mes')], max_length=3)),
+                ('fecha', models.DateField()),
+                ('unidades', models.IntegerField(default=0)),
+                ('monto_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('id_rubro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.rubro')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'fecha', 'id_rubro'), name='resumen_rubro_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('dia', 'Día'), ('mes', 'Mes')], max_length=3)),
+                ('fecha', models.DateField()),
+                ('origen', models.CharField(choices=[('venta', 'Venta'), ('venta_local', 'Venta local')], max_length=20)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('monto_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('id_vendedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.vendedor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(models.F('periodo'), models.F('fecha'), models.F('origen'), django.db.models.functions.comparison.Coalesce('id_vendedor', models.Value(0)), name='resumen_ventas_unico')],
+            },
+        ),
+    ]
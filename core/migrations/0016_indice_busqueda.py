@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_resumenes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('producto', 'Producto'), ('cliente', 'Cliente'), ('cliente_local', 'Cliente local')], max_length=20)),
+                ('objeto_id', models.IntegerField()),
+                ('texto', models.TextField()),
+                ('cantidad_trigramas', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='indice_busqueda_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrigramaBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3)),
+                ('tipo', models.CharField(choices=[('producto', 'Producto'), ('cliente', 'Cliente'), ('cliente_local', 'Cliente local')], max_length=20)),
+                ('entrada', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='core.indicebusqueda')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigrama', 'tipo', 'entrada'], name='trigrama_tipo_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_indice_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['id_cliente_movil_local', 'fecha'], name='compra_cliente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_venta'], name='venta_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['id_vendedor', 'fecha_venta'], name='venta_vendedor_fecha_idx'),
+        ),
+    ]
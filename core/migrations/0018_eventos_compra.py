@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_indices_conexiones_graphql'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Secuencia',
+            fields=[
+                ('nombre', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EventoCompra',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('posicion', models.BigIntegerField(blank=True, null=True, unique=True)),
+                ('compra_id', models.IntegerField()),
+                ('id_cliente_movil_local', models.IntegerField(blank=True, null=True)),
+                ('tipo', models.CharField(choices=[('compra_creada', 'Compra creada'), ('compra_estado', 'Cambio de estado de la compra'), ('compra_borrada', 'Compra borrada'), ('envio_creado', 'Envío creado'), ('envio_actualizado', 'Envío actualizado'), ('envio_recibido', 'Envío recibido'), ('venta_creada', 'Venta registrada'), ('venta_borrada', 'Venta borrada')], max_length=20)),
+                ('estado_anterior', models.CharField(blank=True, max_length=20, null=True)),
+                ('estado_nuevo', models.CharField(blank=True, max_length=20, null=True)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['compra_id', 'posicion'], name='evento_compra_pos_idx'), models.Index(fields=['id_cliente_movil_local', 'posicion'], name='evento_cliente_pos_idx')],
+            },
+        ),
+    ]
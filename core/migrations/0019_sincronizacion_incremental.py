@@ -0,0 +1,95 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:51
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+
+def posiciones_existentes(apps, schema_editor):
+    # las filas anteriores a la sincronización se numeran por pk (los rubros
+    # antes que sus productos); desde acá cada escritura se numera al confirmar
+    posicion = 0
+    for nombre in ('Rubro', 'Producto', 'ClienteLocal', 'ClienteMovilLocal'):
+        model = apps.get_model('core', nombre)
+        ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+        for inicio in range(0, len(ids), 1000):
+            lote = ids[inicio:inicio + 1000]
+            model.objects.filter(pk__in=lote).update(posicion_sync=Case(
+                *[When(pk=pk, then=Value(posicion + i)) for i, pk in enumerate(lote, start=1)]
+            ))
+            posicion += len(lote)
+    apps.get_model('core', 'Secuencia').objects.create(nombre='sincronizacion', valor=posicion)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_eventos_compra'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Borrado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=30)),
+                ('objeto_id', models.IntegerField()),
+                ('borrado_en', models.DateTimeField(auto_now_add=True)),
+                ('posicion_sync', models.BigIntegerField(blank=True, null=True, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='clientelocal',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='clientelocal',
+            name='uuid_sync',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='clientemovillocal',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='rubro',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='ventalocal',
+            name='uuid_sync',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='clientelocal',
+            name='posicion_sync',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='clientemovillocal',
+            name='posicion_sync',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='posicion_sync',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='rubro',
+            name='posicion_sync',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(posiciones_existentes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='borrado',
+            index=models.Index(fields=['borrado_en', 'id'], name='borrado_fecha_idx'),
+        ),
+    ]
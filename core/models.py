@@ -1,6 +1,7 @@
 # core/models.py
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.hashers import make_password
 from django.utils import timezone
 
@@ -60,6 +61,9 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
 # 1. Rubro ______________________________________________________________________________________________________
 class Rubro(models.Model):
     nombre_rubro = models.CharField(max_length=100, unique=True)
+    # versión de la fila y posición para la sincronización incremental (core/sincronizacion.py)
+    actualizado_en = models.DateTimeField(auto_now=True)
+    posicion_sync = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
 
     def __str__(self):
         return self.nombre_rubro
@@ -73,6 +77,10 @@ class Producto(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     stock_actual = models.IntegerField()
     en_promocion = models.BooleanField(default=False)
+    # las actualizaciones con update() / bulk_update los tienen que poner a mano
+    # (actualizado_en=ahora, posicion_sync=None)
+    actualizado_en = models.DateTimeField(auto_now=True)
+    posicion_sync = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
 
     def __str__(self):
         return self.nombre_producto
@@ -135,8 +143,10 @@ class ClienteMovilLocal(models.Model):
     telefono_cliente_movil_local = models.CharField(max_length=20, blank=True, null=True)
     email_cliente_movil_local = models.EmailField(max_length=150, blank=True, null=True)
     direccion_cliente_movil_local = models.CharField(max_length=150, blank=True, null=True)
-    dni_cliente_movil_local = models.CharField(max_length=20)  # puede repetirse
+    dni_cliente_movil_local = models.CharField(max_length=20, db_index=True)  # puede repetirse
     observaciones_cliente_movil_local = models.TextField(blank=True, null=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+    posicion_sync = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
 
     class Meta:
         db_table = 'core_cliente_movil_local'
@@ -166,9 +176,16 @@ class Compra(models.Model):
         blank=True
     )
     id_vendedor = models.ForeignKey(Vendedor, on_delete=models.CASCADE)
-    fecha = models.DateTimeField(auto_now_add=True)
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
     estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'fecha'], name='compra_estado_fecha_idx'),
+            # compras de un cliente por fecha (conexión GraphQL `compras`)
+            models.Index(fields=['id_cliente_movil_local', 'fecha'], name='compra_cliente_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Compra {self.id} - {self.estado}"
 
@@ -191,6 +208,12 @@ class Venta(models.Model):
     monto_total = models.DecimalField(max_digits=10, decimal_places=2)
     fecha_venta = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_venta'], name='venta_fecha_idx'),
+            models.Index(fields=['id_vendedor', 'fecha_venta'], name='venta_vendedor_fecha_idx'),
+        ]
+
 # 11. Factura _______________________________________________________________________________________________
 class Factura(models.Model):
     ESTADOS = [
@@ -219,6 +242,10 @@ class ClienteLocal(models.Model):
     direccion = models.CharField(max_length=150, blank=True, null=True)
     dni = models.CharField(max_length=20, blank=True, null=True)
     observaciones = models.TextField(blank=True, null=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+    posicion_sync = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
+    # generado por el cliente de escritorio al crearlo sin conexión: subirlo dos veces no lo duplica
+    uuid_sync = models.UUIDField(unique=True, blank=True, null=True)
 
     class Meta:
         db_table='core_cliente_local'
@@ -234,7 +261,8 @@ class VentaLocal(models.Model):
     id_cliente_local = models.ForeignKey('core.ClienteLocal', on_delete=models.SET_NULL, null=True, blank=True)
     id_vendedor = models.ForeignKey('core.Vendedor', on_delete=models.SET_NULL, null=True, blank=True)
     monto_total = models.DecimalField(max_digits=10, decimal_places=2)
-    fecha_venta = models.DateTimeField(auto_now_add=True)
+    fecha_venta = models.DateTimeField(auto_now_add=True, db_index=True)
+    uuid_sync = models.UUIDField(unique=True, blank=True, null=True)
 
     class Meta:
         db_table = 'core_venta_local'
@@ -269,9 +297,230 @@ class SolicitudContacto(models.Model):
         blank=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion'], name='solicitud_estado_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"{self.usuario.email} - {self.estado}"
 
 class Marca(models.Model):
     nombre = models.CharField(max_length=100)
 
+
+# 16. ReservaStock _____________________________________________________________________________________________
+# El stock se descuenta al reservar; confirmar lo consume y liberar / vencer lo devuelve.
+class ReservaStock(models.Model):
+    ESTADOS = [
+        ('activa', 'Activa'),
+        ('confirmada', 'Confirmada'),
+        ('liberada', 'Liberada'),
+        ('vencida', 'Vencida'),
+    ]
+
+    id_producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
+    id_vendedor = models.ForeignKey(Vendedor, on_delete=models.SET_NULL, null=True, blank=True)
+    cantidad = models.IntegerField()
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='activa')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    expira = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'expira'], name='reserva_estado_expira_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reserva {self.id} - {self.id_producto_id} x{self.cantidad} ({self.estado})"
+
+
+# 17. NotificacionPendiente (outbox) ___________________________________________________________________________
+# Se guarda en la misma transacción que el cambio y la envía el worker
+# `despachar_notificaciones`, fuera del request.
+class NotificacionPendiente(models.Model):
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('enviando', 'Enviando'),
+        ('enviada', 'Enviada'),
+        ('fallida', 'Fallida'),
+    ]
+
+    id_usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
+    mensaje = models.CharField(max_length=255)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    intentos = models.IntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    lote = models.CharField(max_length=32, blank=True, null=True)
+    ultimo_error = models.TextField(blank=True, null=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento'], name='notif_estado_proximo_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notificación {self.id} a {self.id_usuario_id} ({self.estado})"
+
+
+# 18. Resúmenes de ventas (agregados materializados) ______________________________________________________________
+# Los mantiene core/reportes.py a partir de Venta, VentaLocal y CompraProducto.
+# `fecha` es el primer día del período ('dia' o 'mes').
+PERIODOS_RESUMEN = [
+    ('dia', 'Día'),
+    ('mes', 'Mes'),
+]
+
+
+class ResumenVentas(models.Model):
+    ORIGENES = [
+        ('venta', 'Venta'),
+        ('venta_local', 'Venta local'),
+    ]
+
+    periodo = models.CharField(max_length=3, choices=PERIODOS_RESUMEN)
+    fecha = models.DateField()
+    origen = models.CharField(max_length=20, choices=ORIGENES)
+    id_vendedor = models.ForeignKey(Vendedor, on_delete=models.SET_NULL, null=True, blank=True)
+    cantidad = models.IntegerField(default=0)
+    monto_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # Coalesce: las ventas sin vendedor (NULL) también tienen un solo bucket;
+            # en un índice único común dos NULL no chocan y el bucket se duplicaría
+            models.UniqueConstraint(
+                'periodo', 'fecha', 'origen', Coalesce('id_vendedor', models.Value(0)), name='resumen_ventas_unico',
+            ),
+        ]
+
+
+class ResumenRubro(models.Model):
+    periodo = models.CharField(max_length=3, choices=PERIODOS_RESUMEN)
+    fecha = models.DateField()
+    id_rubro = models.ForeignKey(Rubro, on_delete=models.CASCADE)
+    unidades = models.IntegerField(default=0)
+    monto_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'fecha', 'id_rubro'], name='resumen_rubro_unico'),
+        ]
+
+
+# 19. Índice de búsqueda (trigramas) ______________________________________________________________________________
+# Lo mantiene core/busqueda.py desde las señales de Producto, Cliente y
+# ClienteLocal. Cada entrada guarda el texto normalizado de un objeto y sus
+# trigramas; buscar es contar trigramas en común con la consulta.
+TIPOS_BUSQUEDA = [
+    ('producto', 'Producto'),
+    ('cliente', 'Cliente'),
+    ('cliente_local', 'Cliente local'),
+]
+
+
+class IndiceBusqueda(models.Model):
+    tipo = models.CharField(max_length=20, choices=TIPOS_BUSQUEDA)
+    objeto_id = models.IntegerField()
+    texto = models.TextField()
+    cantidad_trigramas = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='indice_busqueda_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.objeto_id}"
+
+
+class TrigramaBusqueda(models.Model):
+    trigrama = models.CharField(max_length=3)
+    tipo = models.CharField(max_length=20, choices=TIPOS_BUSQUEDA)
+    entrada = models.ForeignKey(IndiceBusqueda, on_delete=models.CASCADE, related_name='trigramas')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['trigrama', 'tipo', 'entrada'], name='trigrama_tipo_idx'),
+        ]
+
+
+# 20. Eventos de compra (solo se agregan filas) __________________________________________________________________
+# Cada alta / cambio de estado de Compra, Envio y Venta queda como una fila. Las
+# guardan las señales en la misma transacción que el cambio; la posición en el
+# feed (posicion) se asigna recién al confirmar, en orden de confirmación (ver
+# core/posiciones.py), y /api/changes/?since=<posicion> devuelve solo lo nuevo.
+# compra_id no es FK: el evento queda aunque se borre la compra.
+TIPOS_EVENTO = [
+    ('compra_creada', 'Compra creada'),
+    ('compra_estado', 'Cambio de estado de la compra'),
+    ('compra_borrada', 'Compra borrada'),
+    ('envio_creado', 'Envío creado'),
+    ('envio_actualizado', 'Envío actualizado'),
+    ('envio_recibido', 'Envío recibido'),
+    ('venta_creada', 'Venta registrada'),
+    ('venta_borrada', 'Venta borrada'),
+]
+
+
+class EventoCompra(models.Model):
+    seq = models.BigAutoField(primary_key=True)
+    posicion = models.BigIntegerField(null=True, blank=True, unique=True)
+    compra_id = models.IntegerField()
+    id_cliente_movil_local = models.IntegerField(null=True, blank=True)
+    tipo = models.CharField(max_length=20, choices=TIPOS_EVENTO)
+    estado_anterior = models.CharField(max_length=20, blank=True, null=True)
+    estado_nuevo = models.CharField(max_length=20, blank=True, null=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['compra_id', 'posicion'], name='evento_compra_pos_idx'),
+            models.Index(fields=['id_cliente_movil_local', 'posicion'], name='evento_cliente_pos_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.seq} {self.tipo} compra {self.compra_id}"
+
+
+# 21. Borrados (para la sincronización incremental) _______________________________________________________________
+# Una fila por cada Producto, Rubro, ClienteLocal o ClienteMovilLocal borrado,
+# para que los clientes sin conexión los quiten de su copia.
+class Borrado(models.Model):
+    modelo = models.CharField(max_length=30)
+    objeto_id = models.IntegerField()
+    borrado_en = models.DateTimeField(auto_now_add=True)
+    posicion_sync = models.BigIntegerField(null=True, blank=True, unique=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['borrado_en', 'id'], name='borrado_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id}"
+
+
+# 22. Versiones de cache __________________________________________________________________________________________
+# Versión de cada cache versionada (catálogo, resultados GraphQL). Vive en la
+# base para que todos los workers la compartan: invalidar es incrementarla.
+class VersionCache(models.Model):
+    nombre = models.CharField(max_length=30, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.nombre} {self.version}"
+
+
+
+# 23. Secuencias ___________________________________________________________________________________________________
+# Último número entregado de cada secuencia de posiciones (feed de cambios,
+# sincronización). La fila se bloquea al numerar: las posiciones salen en el
+# orden en que confirmaron las transacciones, no en el de los INSERT.
+class Secuencia(models.Model):
+    nombre = models.CharField(max_length=30, primary_key=True)
+    valor = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.nombre} {self.valor}"
@@ -0,0 +1,188 @@
+# core/notificaciones.py
+import logging
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import NotificacionPendiente
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------
+# Outbox de notificaciones push #####################################################################################
+def encolar_notificacion(usuario_id, mensaje):
+    """
+    Registra la notificación; usar dentro de la transacción del cambio que la origina.
+    Al confirmar despierta al despachador del proceso (NOTIFICACIONES_EN_WEB).
+    """
+    notificacion = NotificacionPendiente.objects.create(id_usuario_id=usuario_id, mensaje=mensaje)
+    transaction.on_commit(despachador.despertar)
+    return notificacion
+
+
+def obtener_emisor():
+    return import_string(settings.NOTIFICACIONES_EMISOR)
+
+
+# Un emisor es un callable (usuario_id, mensaje) que lanza una excepción si
+# falla. Si además tiene enviar_lote(pares) -> [None | excepción, ...] (una
+# entrada por par, como messaging.send_each de Firebase), el lote se manda en
+# una sola llamada.
+class EmisorMemoria:
+    """
+    Emisor falso para pruebas y desarrollo: guarda lo enviado en memoria.
+    NOTIFICACIONES_EMISOR = 'core.notificaciones.emisor_memoria'
+    """
+    def __init__(self):
+        self.enviados = []
+        self.lotes = 0
+
+    def __call__(self, usuario_id, mensaje):
+        self.enviados.append((usuario_id, mensaje))
+
+    def enviar_lote(self, pares):
+        self.lotes += 1
+        self.enviados.extend(pares)
+        return [None] * len(pares)
+
+
+emisor_memoria = EmisorMemoria()
+
+
+def _espera(intentos):
+    base = settings.NOTIFICACIONES_BACKOFF_SEGUNDOS
+    return timedelta(seconds=min(base * 2 ** (intentos - 1), 3600))
+
+
+def reclamar_lote(tamano):
+    """
+    Marca hasta `tamano` notificaciones vencidas como 'enviando' para este
+    worker. El proximo_intento funciona como lease: si el worker muere, otro
+    las retoma cuando vence.
+    """
+    ahora = timezone.now()
+    disponibles = NotificacionPendiente.objects.filter(
+        estado__in=('pendiente', 'enviando'), proximo_intento__lte=ahora
+    )
+    ids = list(disponibles.order_by('proximo_intento').values_list('id', flat=True)[:tamano])
+    if not ids:
+        return []
+
+    lote = uuid.uuid4().hex
+    disponibles.filter(id__in=ids).update(
+        estado='enviando',
+        lote=lote,
+        proximo_intento=ahora + timedelta(seconds=settings.NOTIFICACIONES_LEASE_SEGUNDOS),
+    )
+    return list(NotificacionPendiente.objects.filter(lote=lote, estado='enviando'))
+
+
+def despachar_lote(emisor=None, tamano=50):
+    """
+    Envía un lote de notificaciones (en una llamada si el emisor tiene
+    enviar_lote, si no una por notificación) y guarda los resultados con un
+    bulk_update. Retorna cuántas se procesaron.
+    """
+    emisor = emisor or obtener_emisor()
+    notificaciones = reclamar_lote(tamano)
+    if not notificaciones:
+        return 0
+    errores = _enviar(emisor, [(n.id_usuario_id, n.mensaje) for n in notificaciones])
+    ahora = timezone.now()
+
+    for notificacion, e in zip(notificaciones, errores):
+        notificacion.intentos += 1
+        if e is not None:
+            logger.warning("Fallo al enviar la notificación %s: %s", notificacion.id, e)
+            notificacion.ultimo_error = str(e)
+            if notificacion.intentos >= settings.NOTIFICACIONES_MAX_INTENTOS:
+                notificacion.estado = 'fallida'
+            else:
+                notificacion.estado = 'pendiente'
+                notificacion.proximo_intento = ahora + _espera(notificacion.intentos)
+        else:
+            notificacion.estado = 'enviada'
+            notificacion.ultimo_error = None
+
+    NotificacionPendiente.objects.bulk_update(
+        notificaciones, ['estado', 'intentos', 'proximo_intento', 'ultimo_error']
+    )
+    return len(notificaciones)
+
+
+def _enviar(emisor, pares):
+    enviar_lote = getattr(emisor, 'enviar_lote', None)
+    if enviar_lote is not None:
+        try:
+            return enviar_lote(pares)
+        except Exception as e:
+            # falló el lote entero: cuenta como un intento para todas
+            return [e] * len(pares)
+    errores = []
+    for usuario_id, mensaje in pares:
+        try:
+            emisor(usuario_id, mensaje)
+        except Exception as e:
+            errores.append(e)
+        else:
+            errores.append(None)
+    return errores
+
+
+# --------------------
+# Despachador en el proceso web #####################################################################################
+# Con NOTIFICACIONES_EN_WEB cada proceso web vacía el outbox en un hilo propio:
+# lo despierta encolar_notificacion al confirmar y además revisa cada
+# NOTIFICACIONES_INTERVALO_SEGUNDOS (reintentos y leases vencidos). Varios
+# procesos pueden hacerlo a la vez, reclamar_lote reparte con el lease. Con un
+# worker aparte (despachar_notificaciones) se apaga con NOTIFICACIONES_EN_WEB=False.
+class Despachador:
+    def __init__(self):
+        self._evento = threading.Event()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._detener = False
+
+    def despertar(self):
+        if not settings.NOTIFICACIONES_EN_WEB:
+            return
+        self.arrancar()
+        self._evento.set()
+
+    def arrancar(self):
+        with self._lock:
+            if self._hilo is None:
+                self._detener = False
+                self._hilo = threading.Thread(target=self._vaciar, name='despachador-notificaciones', daemon=True)
+                self._hilo.start()
+
+    def detener(self):
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+            self._detener = True
+        self._evento.set()
+        if hilo is not None:
+            hilo.join()
+
+    def _vaciar(self):
+        try:
+            while not self._detener:
+                self._evento.clear()
+                try:
+                    while despachar_lote() and not self._detener:
+                        pass
+                except Exception:
+                    logger.exception("Fallo al despachar notificaciones")
+                connection.close()
+                self._evento.wait(settings.NOTIFICACIONES_INTERVALO_SEGUNDOS)
+        finally:
+            connection.close()
+
+
+despachador = Despachador()
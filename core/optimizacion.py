@@ -0,0 +1,184 @@
+# core/optimizacion.py
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+
+
+# --------------------
+# select_related / prefetch_related a partir del serializer ##########################################################
+def _relaciones(serializer, model, prefijo, en_prefetch, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or not field.source_attrs:
+            continue
+
+        nombre = field.source_attrs[0]
+        try:
+            model_field = model._meta.get_field(nombre)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        ruta = prefijo + nombre
+        muchos = model_field.many_to_many or model_field.one_to_many
+
+        if isinstance(field, serializers.ListSerializer):
+            prefetch.add(ruta)
+            _relaciones(field.child, model_field.related_model, ruta + '__', True, select, prefetch)
+        elif isinstance(field, serializers.BaseSerializer):
+            (prefetch if en_prefetch or muchos else select).add(ruta)
+            _relaciones(field, model_field.related_model, ruta + '__', en_prefetch or muchos, select, prefetch)
+        elif isinstance(field, ManyRelatedField):
+            prefetch.add(ruta)
+        elif isinstance(field, PrimaryKeyRelatedField):
+            # DRF lee la FK directamente (pk only), no hace falta JOIN
+            continue
+        elif isinstance(field, RelatedField):
+            (prefetch if en_prefetch or muchos else select).add(ruta)
+
+
+@lru_cache(maxsize=None)
+def relaciones_serializer(serializer_class):
+    """
+    Devuelve (select_related, prefetch_related) que necesita el serializer para
+    no hacer una consulta por fila con sus campos anidados.
+    """
+    select, prefetch = set(), set()
+    model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    if model is not None:
+        _relaciones(serializer_class(), model, '', False, select, prefetch)
+    return tuple(sorted(select)), tuple(sorted(prefetch))
+
+
+def optimizar_queryset(queryset, serializer_class):
+    select, prefetch = relaciones_serializer(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class QuerysetOptimizadoMixin:
+    """
+    Aplica los JOIN / prefetch que pide el serializer del ViewSet en get_queryset.
+    """
+    def get_queryset(self):
+        return optimizar_queryset(super().get_queryset(), self.get_serializer_class())
+
+
+# --------------------
+# Listados rápidos con values() #####################################################################################
+# Para los list de solo lectura: en lugar de instanciar el modelo y recorrer
+# el serializer por fila, se consulta con .values() las columnas que el
+# serializer lee (incluidas las de sus serializers anidados, por JOIN) y cada
+# fila se convierte con el to_representation de los mismos campos de DRF, así
+# el JSON es idéntico. Solo se compilan serializers con campos simples, FK como
+# pk y serializers anidados por FK; cualquier otro caso usa el camino normal.
+def _plan_lectura(serializer, model, prefijo, columnas):
+    # un to_representation propio puede cambiar la salida campo por campo
+    if type(serializer).to_representation is not serializers.Serializer.to_representation:
+        return None
+    plan = []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or len(field.source_attrs) != 1 or isinstance(field, serializers.FileField):
+            return None
+        try:
+            model_field = model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+
+        ruta = prefijo + model_field.name
+        columnas.add(ruta)
+        if not model_field.is_relation:
+            plan.append((field.field_name, ruta, field.to_representation, None))
+        elif isinstance(field, PrimaryKeyRelatedField):
+            convertir = field.pk_field.to_representation if field.pk_field is not None else None
+            plan.append((field.field_name, ruta, convertir, None))
+        elif isinstance(field, serializers.Serializer):
+            anidado = _plan_lectura(field, model_field.related_model, ruta + '__', columnas)
+            if anidado is None:
+                return None
+            plan.append((field.field_name, ruta, None, anidado))
+        else:
+            return None
+    return plan
+
+
+def _convertidor(plan):
+    pasos = [
+        (nombre, ruta, convertir, _convertidor(anidado) if anidado is not None else None)
+        for nombre, ruta, convertir, anidado in plan
+    ]
+
+    def convertir_fila(fila):
+        resultado = {}
+        for nombre, ruta, convertir, anidado in pasos:
+            valor = fila[ruta]
+            if valor is None:
+                resultado[nombre] = None
+            elif anidado is not None:
+                resultado[nombre] = anidado(fila)
+            elif convertir is not None:
+                resultado[nombre] = convertir(valor)
+            else:
+                resultado[nombre] = valor
+        return resultado
+    return convertir_fila
+
+
+@lru_cache(maxsize=None)
+def lectura_rapida(serializer_class):
+    """
+    Devuelve (columnas, convertir_fila) para leer con .values(), o None si el
+    serializer tiene campos que no se pueden resolver así.
+    """
+    model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    if model is None:
+        return None
+    columnas = set()
+    plan = _plan_lectura(serializer_class(), model, '', columnas)
+    if plan is None:
+        return None
+    return tuple(sorted(columnas)), _convertidor(plan)
+
+
+def filas_rapidas(queryset, serializer_class):
+    """
+    Lista de dicts equivalente a serializer_class(queryset, many=True).data.
+    """
+    columnas, convertir_fila = lectura_rapida(serializer_class)
+    return [convertir_fila(fila) for fila in queryset.prefetch_related(None).values(*columnas)]
+
+
+class ListadoRapidoMixin:
+    """
+    list() por .values() cuando el serializer lo permite (ver lectura_rapida).
+    Compatible con la paginación por cursor: las filas son dicts con las
+    columnas del ordering.
+    """
+    listado_rapido = True
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if not self.listado_rapido or lectura_rapida(serializer_class) is None:
+            return super().list(request, *args, **kwargs)
+
+        columnas, convertir_fila = lectura_rapida(serializer_class)
+        # el cursor lee su posición de las columnas del ordering
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        columnas = set(columnas) | {campo.lstrip('-') for campo in ordering}
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).values(*columnas)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([convertir_fila(fila) for fila in page])
+        return Response([convertir_fila(fila) for fila in queryset])
@@ -0,0 +1,42 @@
+# core/pagination.py
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+# --------------------
+# Paginación por cursor (keyset) ####################################################################################
+# El cursor guarda la posición de la última fila, así que cada página es un
+# WHERE <columna> < valor ... LIMIT n sobre una columna indexada, sin OFFSET
+# que crezca con la profundidad. DRF filtra solo por la primera columna del
+# ordering: el pk que sigue fija el orden entre filas con la misma fecha, y
+# esas filas empatadas se saltean con un offset dentro del mismo valor (el
+# offset no crece con la profundidad, solo con los empates).
+# Es opcional: sin ?cursor ni ?page_size el listado sigue siendo el array
+# completo que esperan los clientes existentes (la app de escritorio,
+# /api/ventas_locales/); con cualquiera de los dos responde
+# {next, previous, results}.
+class IdCursorPagination(CursorPagination):
+    ordering = '-pk'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not {self.cursor_query_param, self.page_size_query_param} & set(request.query_params):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class CompraCursorPagination(IdCursorPagination):
+    ordering = ('-fecha', '-id')
+
+
+class VentaCursorPagination(IdCursorPagination):
+    ordering = ('-fecha_venta', '-id')
+
+
+# --------------------
+# Paginación por página #############################################################################################
+# Para resultados ordenados por relevancia, donde no hay columna para el cursor.
+class BusquedaPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,80 @@
+# core/perfiles.py
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Cliente, Vendedor
+
+
+# --------------------
+# Cache de usuarios y perfiles (Cliente / Vendedor) #################################################################
+# TTL corto (USUARIOS_CACHE_SEGUNDOS) y se invalida desde core/signals.py al
+# guardar o borrar Usuario, Cliente o Vendedor. Un perfil invalidado queda
+# marcado (INVALIDADO) en lugar de borrarse: perfil_request distingue así
+# "cambió, ir a la base" de "no está en cache", donde puede usar el claim.
+INVALIDADO = 'invalidado'
+def _clave_usuario(usuario_id):
+    return f'usuario:{usuario_id}'
+
+
+def _clave_perfil(usuario_id):
+    return f'perfil:{usuario_id}'
+
+
+def usuario_en_cache(usuario_id):
+    return cache.get(_clave_usuario(usuario_id))
+
+
+def guardar_usuario(usuario):
+    cache.set(_clave_usuario(usuario.pk), usuario, settings.USUARIOS_CACHE_SEGUNDOS)
+
+
+def invalidar_usuario(usuario_id):
+    cache.delete(_clave_usuario(usuario_id))
+    invalidar_perfil(usuario_id)
+
+
+def invalidar_perfil(usuario_id):
+    cache.set(_clave_perfil(usuario_id), INVALIDADO, settings.USUARIOS_CACHE_SEGUNDOS)
+
+
+def _buscar_perfil(usuario):
+    rol = (usuario.rol or '').lower()
+    perfil = {'id': None, 'nombre': "", 'apellido': "", 'dni': ""}
+    if rol == 'cliente':
+        cliente = Cliente.objects.filter(id_usuario=usuario).first()
+        if cliente:
+            perfil = {'id': cliente.id, 'nombre': cliente.nombre_cliente,
+                      'apellido': cliente.apellido_cliente, 'dni': cliente.dni_cliente}
+    elif rol == 'vendedor':
+        vendedor = Vendedor.objects.filter(id_usuario=usuario).first()
+        if vendedor:
+            perfil = {'id': vendedor.id, 'nombre': vendedor.nombre_vendedor,
+                      'apellido': vendedor.apellido_vendedor, 'dni': vendedor.dni_vendedor}
+    return perfil
+
+
+def perfil_usuario(usuario):
+    """
+    Datos del Cliente o Vendedor asociado al usuario: {'id', 'nombre', 'apellido', 'dni'}.
+    'id' es None si el usuario no tiene perfil.
+    """
+    perfil = cache.get(_clave_perfil(usuario.pk))
+    if perfil is None or perfil == INVALIDADO:
+        perfil = _buscar_perfil(usuario)
+        cache.set(_clave_perfil(usuario.pk), perfil, settings.USUARIOS_CACHE_SEGUNDOS)
+    return perfil
+
+
+def perfil_request(request):
+    """
+    Perfil del usuario autenticado: primero la cache; el claim del token solo
+    si el perfil no está en cache ni fue invalidado, y si no, la base.
+    """
+    perfil = cache.get(_clave_perfil(request.user.pk))
+    if perfil == INVALIDADO:
+        return perfil_usuario(request.user)
+    if perfil is not None:
+        return perfil
+    token = getattr(request, 'auth', None)
+    perfil = token.get('perfil') if token is not None and hasattr(token, 'get') else None
+    return perfil if perfil is not None else perfil_usuario(request.user)
@@ -0,0 +1,63 @@
+# core/posiciones.py
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Max, Value, When
+
+from .models import Secuencia
+
+
+# --------------------
+# Posiciones en orden de confirmación ###############################################################################
+# Un autoincremental o un auto_now se asignan al escribir la fila: si la
+# transacción confirma después que otra posterior, su fila aparece "detrás" de
+# un cursor que un cliente ya avanzó y se la saltea para siempre. Por eso las
+# filas nacen sin posición (NULL, no se entregan) y numerar() les asigna la
+# siguiente bajo el lock de la fila de Secuencia: solo ve filas confirmadas, y
+# lo que confirme después recibe un número mayor que todo lo ya entregado.
+LOTE = 1000
+
+
+def _bloquear(nombre):
+    secuencia = Secuencia.objects.select_for_update().filter(nombre=nombre).first()
+    if secuencia is None:
+        try:
+            with transaction.atomic():
+                Secuencia.objects.create(nombre=nombre)
+        except IntegrityError:
+            pass
+        secuencia = Secuencia.objects.select_for_update().get(nombre=nombre)
+    return secuencia
+
+
+def numerar(nombre, modelos, campo='posicion'):
+    """
+    Asigna posiciones de la secuencia `nombre` a las filas confirmadas de
+    `modelos` que todavía no tienen (orden por pk dentro de cada modelo).
+    Retorna la última posición entregada, o None si no había nada que numerar.
+    """
+    nulos = {f'{campo}__isnull': True}
+    if not any(model.objects.filter(**nulos).exists() for model in modelos):
+        return None
+    with transaction.atomic():
+        secuencia = _bloquear(nombre)
+        for model in modelos:
+            while True:
+                # consulta después del lock: ve todo lo confirmado hasta ahora
+                ids = list(model.objects.filter(**nulos).order_by('pk').values_list('pk', flat=True)[:LOTE])
+                if not ids:
+                    break
+                posiciones = Case(
+                    *[When(pk=pk, then=Value(secuencia.valor + i)) for i, pk in enumerate(ids, start=1)]
+                )
+                model.objects.filter(pk__in=ids, **nulos).update(**{campo: posiciones})
+                secuencia.valor += len(ids)
+        secuencia.save(update_fields=['valor'])
+    return secuencia.valor
+
+
+def ultima(model, campo='posicion'):
+    return model.objects.aggregate(ultima=Max(campo))['ultima'] or 0
+
+
+def valor(nombre):
+    """Último número entregado de la secuencia `nombre` (0 si todavía no se usó)."""
+    return Secuencia.objects.filter(nombre=nombre).values_list('valor', flat=True).first() or 0
@@ -0,0 +1,52 @@
+# core/recursos.py
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+# --------------------
+# Recursos compartidos del proceso ##################################################################################
+# Piezas en memoria que usan varios módulos (catálogo, GraphQL, feed de
+# cambios, avisos SSE): un LRU acotado y el cupo de hilos bajo WSGI.
+class Recientes:
+    """LRU en memoria del proceso; las claves llevan la versión, nunca quedan viejas."""
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+
+# Bajo WSGI cada conexión larga (stream SSE, long-poll) ocupa un hilo del
+# worker mientras dura: el cupo admite hasta getattr(settings, ajuste) por
+# proceso, para que no dejen sin hilos al resto de la API.
+class CupoHilos:
+    def __init__(self, ajuste):
+        self.ajuste = ajuste
+        self._lock = threading.Lock()
+        self.ocupados = 0
+
+    def tomar(self):
+        with self._lock:
+            if self.ocupados >= getattr(settings, self.ajuste):
+                return False
+            self.ocupados += 1
+            return True
+
+    def liberar(self):
+        with self._lock:
+            self.ocupados -= 1
@@ -0,0 +1,97 @@
+# core/renderers.py
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+
+# --------------------
+# Renderer JSON con orjson ##########################################################################################
+# Misma salida que el JSONRenderer de DRF (compacto, UTF-8, fechas y Decimal
+# como los codifica su JSONEncoder) pero codificado con orjson. Las fechas y
+# los tipos que orjson no conoce pasan por el encoder de DRF, así el formato
+# no cambia. Con indentación (API navegable, ?indent) o ante algo que orjson
+# no pueda codificar se usa el renderer de DRF.
+class FragmentoJSON:
+    """
+    JSON ya codificado (bytes) que se inserta tal cual en la respuesta, p. ej.
+    una página del catálogo guardada en cache.
+    """
+    __slots__ = ('contenido',)
+
+    def __init__(self, contenido):
+        self.contenido = contenido
+
+    def __reduce__(self):
+        return (FragmentoJSON, (self.contenido,))
+
+
+class EncoderFragmentos(encoders.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, FragmentoJSON):
+            return orjson.loads(obj.contenido)
+        return super().default(obj)
+
+
+_encoder = EncoderFragmentos()
+
+
+def _default(obj):
+    if isinstance(obj, FragmentoJSON):
+        return orjson.Fragment(obj.contenido)
+    return _encoder.default(obj)
+
+
+def _escapar_separadores(contenido):
+    # DRF escapa U+2028 / U+2029 (válidos en JSON, no en JavaScript)
+    if b'\xe2\x80' in contenido:
+        contenido = contenido.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+    return contenido
+
+
+def codificar(data):
+    """
+    Bytes JSON de `data`, iguales a los del JSONRenderer de DRF en modo compacto.
+    """
+    if isinstance(data, FragmentoJSON):
+        return data.contenido
+    return _escapar_separadores(orjson.dumps(
+        data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    ))
+
+
+class RendererJSONRapido(JSONRenderer):
+    encoder_class = EncoderFragmentos
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is None and self.compact and not self.ensure_ascii:
+            try:
+                return codificar(data)
+            except (orjson.JSONEncodeError, TypeError):
+                pass
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+# --------------------
+# Server-Sent Events ################################################################################################
+def evento_sse(evento, data):
+    """
+    Bytes de un evento SSE con `data` en JSON (una sola línea, sin saltos).
+    """
+    return b'event: ' + evento.encode() + b'\ndata: ' + codificar(data) + b'\n\n'
+
+
+class RendererEventos(BaseRenderer):
+    """
+    Acepta text/event-stream en la negociación de DRF (la vista devuelve un
+    StreamingHttpResponse); las respuestas de error (401 / 403) salen como un
+    evento `error`.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return evento_sse('error', data)
@@ -0,0 +1,198 @@
+# core/reportes.py
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, DecimalField, ExpressionWrapper, F, Subquery, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import (
+    Compra, CompraProducto, Producto, ResumenRubro, ResumenVentas, Venta, VentaLocal
+)
+
+
+ORIGENES = {
+    'venta': Venta,
+    'venta_local': VentaLocal,
+}
+
+
+# --------------------
+# Mantenimiento incremental ##########################################################################################
+# Cada alta / baja / modificación suma o resta su aporte a los buckets del día
+# y del mes con UPDATE ... SET x = x + delta; el bucket se crea la primera vez.
+def _periodos(fecha_hora):
+    if timezone.is_aware(fecha_hora):
+        fecha_hora = timezone.localtime(fecha_hora)
+    dia = fecha_hora.date()
+    return (('dia', dia), ('mes', dia.replace(day=1)))
+
+
+def _sumar_existente(model, claves, deltas):
+    incrementos = {campo: F(campo) + valor for campo, valor in deltas.items()}
+    return model.objects.filter(**claves).update(**incrementos)
+
+
+def _acumular(model, claves, deltas):
+    if _sumar_existente(model, claves, deltas):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**claves, **deltas)
+    except IntegrityError:
+        # otro proceso creó el bucket entre el UPDATE y el INSERT
+        _sumar_existente(model, claves, deltas)
+
+
+def sumar_venta(origen, vendedor_id, fecha_venta, monto_total, signo=1):
+    for periodo, fecha in _periodos(fecha_venta):
+        claves = {'periodo': periodo, 'fecha': fecha, 'origen': origen, 'id_vendedor_id': vendedor_id}
+        deltas = {'cantidad': signo, 'monto_total': signo * monto_total}
+        if signo < 0 and vendedor_id is not None:
+            if _sumar_existente(ResumenVentas, claves, deltas):
+                continue
+            # una resta sin bucket del vendedor: se borra el vendedor y sus
+            # buckets ya pasaron al de sin vendedor (fusionar_vendedor); las
+            # ventas que caen en cascada restan de ahí
+            claves['id_vendedor_id'] = None
+        _acumular(ResumenVentas, claves, deltas)
+
+
+def fusionar_vendedor(vendedor_id):
+    """
+    Antes de borrar un vendedor: sus buckets pasan a los de "sin vendedor"
+    (SET_NULL en bloque chocaría con el bucket NULL ya existente).
+    """
+    filas = ResumenVentas.objects.filter(id_vendedor_id=vendedor_id)
+    for fila in filas.values('periodo', 'fecha', 'origen', 'cantidad', 'monto_total'):
+        _acumular(
+            ResumenVentas,
+            {'periodo': fila['periodo'], 'fecha': fila['fecha'], 'origen': fila['origen'], 'id_vendedor_id': None},
+            {'cantidad': fila['cantidad'], 'monto_total': fila['monto_total']},
+        )
+    filas.delete()
+
+
+def sumar_rubro(rubro_id, fecha_compra, unidades, monto_total, signo=1):
+    for periodo, fecha in _periodos(fecha_compra):
+        _acumular(
+            ResumenRubro,
+            {'periodo': periodo, 'fecha': fecha, 'id_rubro_id': rubro_id},
+            {'unidades': signo * unidades, 'monto_total': signo * monto_total},
+        )
+
+
+def datos_venta(venta):
+    return {
+        'vendedor_id': venta.id_vendedor_id,
+        'fecha_venta': venta.fecha_venta,
+        'monto_total': Decimal(venta.monto_total),
+    }
+
+
+def datos_linea(linea):
+    """
+    Aporte de una línea de compra al resumen por rubro (None si ya no se puede calcular).
+    Usa el producto y la compra ya cargados en la línea; lo que falte sale de
+    una sola consulta.
+    """
+    producto = linea.id_producto if CompraProducto.id_producto.is_cached(linea) else None
+    compra = linea.id_compra if CompraProducto.id_compra.is_cached(linea) else None
+    if producto is not None and compra is not None:
+        rubro_id, fecha = producto.id_rubro_id, compra.fecha
+    else:
+        fila = Producto.objects.filter(id=linea.id_producto_id).values_list(
+            'id_rubro_id', Subquery(Compra.objects.filter(id=linea.id_compra_id).values('fecha')[:1]),
+        ).first()
+        rubro_id, fecha = fila or (None, None)
+    if rubro_id is None or fecha is None:
+        return None
+    return {
+        'rubro_id': rubro_id,
+        'fecha_compra': fecha,
+        'unidades': linea.cantidad,
+        'monto_total': linea.cantidad * Decimal(linea.precio_unitario),
+    }
+
+
+def sumar_lineas_compra(compra, lineas):
+    """
+    Para altas en bloque (bulk_create no dispara señales): suma las líneas de una compra.
+    """
+    rubros = dict(Producto.objects.filter(
+        id__in=[linea.id_producto_id for linea in lineas]
+    ).values_list('id', 'id_rubro_id'))
+    totales = {}
+    for linea in lineas:
+        unidades, monto = totales.get(rubros[linea.id_producto_id], (0, Decimal('0')))
+        totales[rubros[linea.id_producto_id]] = (
+            unidades + linea.cantidad, monto + linea.cantidad * Decimal(linea.precio_unitario)
+        )
+    for rubro_id, (unidades, monto) in totales.items():
+        sumar_rubro(rubro_id, compra.fecha, unidades, monto)
+
+
+# --------------------
+# Reconstrucción completa (backfill) ###############################################################################
+def reconstruir_resumenes():
+    monto_linea = ExpressionWrapper(
+        F('cantidad') * F('precio_unitario'), output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+    truncados = (
+        ('dia', lambda campo: TruncDate(campo)),
+        ('mes', lambda campo: TruncMonth(campo, output_field=DateField())),
+    )
+
+    with transaction.atomic():
+        ResumenVentas.objects.all().delete()
+        ResumenRubro.objects.all().delete()
+
+        for periodo, truncar in truncados:
+            for origen, model in ORIGENES.items():
+                filas = model.objects.annotate(bucket=truncar('fecha_venta')).values(
+                    'bucket', 'id_vendedor'
+                ).annotate(cantidad=Count('id'), total=Sum('monto_total')).order_by()
+                ResumenVentas.objects.bulk_create([
+                    ResumenVentas(periodo=periodo, fecha=fila['bucket'], origen=origen,
+                                  id_vendedor_id=fila['id_vendedor'], cantidad=fila['cantidad'],
+                                  monto_total=fila['total'])
+                    for fila in filas
+                ], batch_size=1000)
+
+            filas = CompraProducto.objects.annotate(bucket=truncar('id_compra__fecha')).values(
+                'bucket', 'id_producto__id_rubro'
+            ).annotate(unidades=Sum('cantidad'), total=Sum(monto_linea)).order_by()
+            ResumenRubro.objects.bulk_create([
+                ResumenRubro(periodo=periodo, fecha=fila['bucket'], id_rubro_id=fila['id_producto__id_rubro'],
+                             unidades=fila['unidades'], monto_total=fila['total'])
+                for fila in filas
+            ], batch_size=1000)
+
+    return ResumenVentas.objects.count(), ResumenRubro.objects.count()
+
+
+# --------------------
+# Consultas ##########################################################################################################
+def consultar_resumen(periodo, desde, hasta, agrupar='vendedor', origen=None):
+    """
+    Totales por fecha y vendedor (o rubro) entre desde y hasta (inclusive).
+    """
+    if periodo == 'mes':
+        desde = desde.replace(day=1)
+    if agrupar == 'rubro':
+        filas = ResumenRubro.objects.filter(periodo=periodo, fecha__range=(desde, hasta)).values(
+            'fecha', 'id_rubro'
+        ).annotate(unidades=Sum('unidades'), total=Sum('monto_total')).order_by('fecha', 'id_rubro')
+    else:
+        filas = ResumenVentas.objects.filter(periodo=periodo, fecha__range=(desde, hasta))
+        if origen:
+            filas = filas.filter(origen=origen)
+        filas = filas.values('fecha', 'id_vendedor').annotate(
+            cantidad=Sum('cantidad'), total=Sum('monto_total')
+        ).order_by('fecha', 'id_vendedor')
+
+    resultado = []
+    for fila in filas:
+        fila['monto_total'] = '{:.2f}'.format(fila.pop('total') or 0)
+        resultado.append(fila)
+    return resultado
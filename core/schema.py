@@ -1,10 +1,18 @@
 # core/schema.py
+from datetime import datetime, time, timedelta
+
 import graphene
+from django.db.models import Subquery
+from django.utils import timezone
+from graphene import relay
 from graphene_django import DjangoObjectType
+from graphql import GraphQLError
 
 from core.models import (
     ClienteMovilLocal, Compra, Vendedor, CompraProducto, Producto, Envio, Venta
 )
+from core.loaders import get_loaders, resolver_compras
+from core.conexiones import Pagina, resolver_conexion
 
 # Type (Modelos _ Graphql)
 
@@ -22,7 +30,10 @@ class CompraProductoType(DjangoObjectType):
     producto = graphene.Field(ProductoType)
 
     def resolve_producto(self, info):
-        return self.id_producto
+        return get_loaders(info).producto.load(self.id_producto_id)
+
+    def resolve_id_producto(self, info):
+        return get_loaders(info).producto.load(self.id_producto_id)
 
 
 class VendedorType(DjangoObjectType):
@@ -53,23 +64,24 @@ class CompraType(DjangoObjectType):
     envio = graphene.Field(EnvioType)
     venta = graphene.Field(VentaType)
 
+    # Todos los resolvers pasan por los loaders del request (una consulta por relación)
     def resolve_vendedor(self, info):
-        return self.id_vendedor
+        return get_loaders(info).vendedor.load(self.id_vendedor_id)
+
+    def resolve_id_vendedor(self, info):
+        return get_loaders(info).vendedor.load(self.id_vendedor_id)
+
+    def resolve_id_cliente_movil_local(self, info):
+        return get_loaders(info).cliente_movil_local.load(self.id_cliente_movil_local_id)
 
     def resolve_productos(self, info):
-        return CompraProducto.objects.filter(id_compra=self.id)
+        return get_loaders(info).productos_por_compra.load(self.id)
 
     def resolve_envio(self, info):
-        try:
-            return Envio.objects.get(compra=self)
-        except Envio.DoesNotExist:
-            return None
+        return get_loaders(info).envio_por_compra.load(self.id)
 
     def resolve_venta(self, info):
-        try:
-            return Venta.objects.get(id_compra=self)
-        except Venta.DoesNotExist:
-            return None
+        return get_loaders(info).venta_por_compra.load(self.id)
 
 
 class ClienteMovilLocalType(DjangoObjectType):
@@ -80,39 +92,162 @@ class ClienteMovilLocalType(DjangoObjectType):
                   "apellido_cliente_movil_local",
                   "telefono_cliente_movil_local",
                   "email_cliente_movil_local")
+
+
+# Conexiones (Relay, paginadas por keyset: ver core.conexiones)
+class CompraConnection(relay.Connection):
+    class Meta:
+        node = CompraType
+
+
+class ProductoConnection(relay.Connection):
+    class Meta:
+        node = ProductoType
+
+
+class VentaConnection(relay.Connection):
+    class Meta:
+        node = VentaType
+
+
+class VendedorConnection(relay.Connection):
+    class Meta:
+        node = VendedorType
+
+
+ORDEN_COMPRAS = (('fecha', True), ('id', True))
+ORDEN_VENTAS = (('fecha_venta', True), ('id', True))
+ORDEN_POR_ID = (('id', False),)
+ESTADOS_COMPRA = {estado for estado, _ in Compra.ESTADOS}
+
+
+def _rango_fechas(campo, desde, hasta):
+    # Rango sobre la columna (no __date) para que use el índice
+    filtros = {}
+    if desde:
+        filtros[f'{campo}__gte'] = timezone.make_aware(datetime.combine(desde, time.min))
+    if hasta:
+        filtros[f'{campo}__lt'] = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return filtros
+
+
+def _pagina(queryset, orden, kwargs):
+    return Pagina(
+        queryset, orden,
+        first=kwargs.get('first'), after=kwargs.get('after'), last=kwargs.get('last'), before=kwargs.get('before'),
+    )
+
         
 # Query compleja
 class Query(graphene.ObjectType):
 
     compras_por_cliente_movil_local = graphene.List(
         CompraType,
-        dni=graphene.Int(required=True)
+        dni=graphene.Int(required=True),
+        deprecation_reason="Usar compras(dni: String), paginado",
     )
 
     compras_por_cliente_movil_local2 = graphene.List(
         CompraType,
         dni=graphene.Int(required=False),
-        cliente_id=graphene.Int(required=False)
+        cliente_id=graphene.Int(required=False),
+        deprecation_reason="Usar compras(dni: String / clienteId), paginado",
     )
 
+    compras = relay.ConnectionField(
+        CompraConnection,
+        dni=graphene.String(),
+        cliente_id=graphene.Int(),
+        estado=graphene.String(),
+        desde=graphene.Date(),
+        hasta=graphene.Date(),
+        description="Compras de la más reciente a la más vieja; dni como texto (respeta ceros a la izquierda)",
+    )
+
+    productos = relay.ConnectionField(
+        ProductoConnection,
+        rubro_id=graphene.Int(),
+        en_promocion=graphene.Boolean(),
+        con_stock=graphene.Boolean(),
+    )
+
+    ventas = relay.ConnectionField(
+        VentaConnection,
+        vendedor_id=graphene.Int(),
+        desde=graphene.Date(),
+        hasta=graphene.Date(),
+        description="Ventas de la más reciente a la más vieja",
+    )
+
+    vendedores = relay.ConnectionField(VendedorConnection, zona=graphene.String())
+
 
     def resolve_compras_por_cliente_movil_local(root, info, dni):
-        return Compra.objects.filter(
-        id_cliente_movil_local__dni_cliente_movil_local=dni
-       )
+        return resolver_compras(info, Compra.objects.filter(
+            id_cliente_movil_local__dni_cliente_movil_local=dni
+        ))
 
     def resolve_compras_por_cliente_movil_local2(self, info, dni=None, cliente_id=None):
         if dni:
-            cliente = ClienteMovilLocal.objects.filter(dni_cliente_movil_local=dni).first()
-            if not cliente:
-                return []
-            return Compra.objects.filter(id_cliente_movil_local=cliente.id)
-        
+            # Compras del primer cliente móvil con ese DNI (subconsulta, sin ida y vuelta extra)
+            cliente_id = Subquery(ClienteMovilLocal.objects.filter(
+                dni_cliente_movil_local=dni
+            ).order_by('pk').values('pk')[:1])
+
         if cliente_id:
-            return Compra.objects.filter(id_cliente_movil_local=cliente_id)
+            return resolver_compras(info, Compra.objects.filter(id_cliente_movil_local=cliente_id))
 
         return []
 
-    
+    def resolve_compras(root, info, dni=None, cliente_id=None, estado=None, desde=None, hasta=None, **kwargs):
+        compras = Compra.objects.filter(**_rango_fechas('fecha', desde, hasta))
+        if cliente_id is not None:
+            compras = compras.filter(id_cliente_movil_local_id=cliente_id)
+        if estado is not None:
+            if estado not in ESTADOS_COMPRA:
+                raise GraphQLError(f"estado debe ser uno de: {', '.join(sorted(ESTADOS_COMPRA))}")
+            compras = compras.filter(estado=estado)
+
+        def conexion(clientes=None):
+            if clientes is not None:
+                compras_dni = (compras.filter(id_cliente_movil_local_id=clientes[0]) if len(clientes) == 1
+                               else compras.filter(id_cliente_movil_local_id__in=clientes))
+            else:
+                compras_dni = compras
+            return resolver_conexion(info, CompraConnection, _pagina(compras_dni, ORDEN_COMPRAS, kwargs), resolver_compras)
+
+        if dni is None:
+            return conexion()
+        # Primero los clientes con ese DNI: con uno solo (lo normal) la página sale
+        # en orden del índice (cliente, fecha) sin ordenar todo su historial
+        clientes = ClienteMovilLocal.objects.filter(dni_cliente_movil_local=dni).values_list('pk', flat=True)
+        if getattr(info.context, 'graphql_async', False):
+            async def resolver():
+                return await conexion([pk async for pk in clientes])
+            return resolver()
+        return conexion(list(clientes))
+
+    def resolve_productos(root, info, rubro_id=None, en_promocion=None, con_stock=None, **kwargs):
+        productos = Producto.objects.all()
+        if rubro_id is not None:
+            productos = productos.filter(id_rubro_id=rubro_id)
+        if en_promocion is not None:
+            productos = productos.filter(en_promocion=en_promocion)
+        if con_stock is not None:
+            productos = productos.filter(stock_actual__gt=0) if con_stock else productos.filter(stock_actual__lte=0)
+        return resolver_conexion(info, ProductoConnection, _pagina(productos, ORDEN_POR_ID, kwargs))
+
+    def resolve_ventas(root, info, vendedor_id=None, desde=None, hasta=None, **kwargs):
+        ventas = Venta.objects.filter(**_rango_fechas('fecha_venta', desde, hasta))
+        if vendedor_id is not None:
+            ventas = ventas.filter(id_vendedor_id=vendedor_id)
+        return resolver_conexion(info, VentaConnection, _pagina(ventas, ORDEN_VENTAS, kwargs))
+
+    def resolve_vendedores(root, info, zona=None, **kwargs):
+        vendedores = Vendedor.objects.all()
+        if zona is not None:
+            vendedores = vendedores.filter(zona=zona)
+        return resolver_conexion(info, VendedorConnection, _pagina(vendedores, ORDEN_POR_ID, kwargs))
+
 
 schema = graphene.Schema(query=Query)
\ No newline at end of file
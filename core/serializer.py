@@ -1,9 +1,17 @@
 # core/serializers.py
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import update_last_login
+from django.db import transaction
 
-from .models import Usuario, Rubro, Producto, Proveedor, ProductoProveedor, Cliente, Vendedor, Compra, CompraProducto, Venta, Factura, Envio, ClienteLocal, VentaLocal, ClienteMovilLocal, SolicitudContacto
+from .stock import descontar_stock, reservar, StockInsuficiente
+from .reportes import sumar_lineas_compra
+from .perfiles import guardar_usuario, perfil_usuario
+from .models import Usuario, Rubro, Producto, Proveedor, ProductoProveedor, Cliente, Vendedor, Compra, CompraProducto, Venta, Factura, Envio, ClienteLocal, VentaLocal, ClienteMovilLocal, SolicitudContacto, ReservaStock
 
 
 # JWT con email
@@ -17,7 +25,7 @@ class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
         if not email or not password:
             raise serializers.ValidationError('Debe ingresar email y contraseña.')
 
-        user = authenticate(email=email, password=password)
+        user = authenticate(self.context.get('request'), email=email, password=password)
 
         if user is None:
             raise serializers.ValidationError('Credenciales inválidas.')
@@ -25,9 +33,41 @@ class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
         if not user.is_active:
             raise serializers.ValidationError('El usuario está inactivo.')
 
-        attrs['username'] = email
-        data = super().validate(attrs)
-        return data
+        # Los tokens se arman acá: super().validate() volvería a autenticar
+        self.user = user
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        refresh = self.get_token(user)
+        guardar_usuario(user)
+
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        if settings.JWT_PERFIL_EN_TOKEN:
+            # usuario_actual y las vistas de solicitudes lo leen sin ir a la base
+            token['rol'] = user.rol
+            token['perfil'] = perfil_usuario(user)
+        return token
+
+
+# Refresh que vuelve a armar rol y perfil: simplejwt copia al access token los
+# claims del refresh, que pueden tener días
+class RefreshConPerfil(RefreshToken):
+    @property
+    def access_token(self):
+        access = super().access_token
+        if settings.JWT_PERFIL_EN_TOKEN and 'perfil' in self.payload:
+            usuario = Usuario.objects.filter(pk=self.payload.get(api_settings.USER_ID_CLAIM)).first()
+            if usuario is not None:
+                access['rol'] = usuario.rol
+                access['perfil'] = perfil_usuario(usuario)
+        return access
+
+
+class TokenRefreshConPerfilSerializer(TokenRefreshSerializer):
+    token_class = RefreshConPerfil
 
 
 # Registro de usuario con creación de Cliente o Vendedor
@@ -85,11 +125,32 @@ class ProductoSerializer(serializers.ModelSerializer):
     id_rubro_id = serializers.PrimaryKeyRelatedField(
         queryset=Rubro.objects.all(), source='id_rubro', write_only=True
     )
+    # stock inicial al dar de alta (por defecto 0)
+    stock_actual = serializers.IntegerField(min_value=0, required=False)
 
     class Meta:
         model = Producto
         fields = ['id', 'id_rubro', 'id_rubro_id', 'nombre_producto', 'descripcion', 'precio', 'stock_actual', 'en_promocion']
 
+    def validate_stock_actual(self, valor):
+        # después del alta el stock solo cambia con ajustar_stock o las reservas (core/stock.py):
+        # un PUT / PATCH con el valor leído antes pisaría lo reservado o vendido mientras tanto.
+        # Reenviar el valor actual (PUT con el objeto completo) no es un cambio.
+        if self.instance is not None and valor != self.instance.stock_actual:
+            raise serializers.ValidationError(
+                f"El stock no se modifica con PUT / PATCH: usar POST /api/productos/{self.instance.pk}/ajustar_stock/ "
+                "con {\"delta\": n}."
+            )
+        return valor
+
+    def create(self, validated_data):
+        validated_data.setdefault('stock_actual', 0)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        validated_data.pop('stock_actual', None)
+        return super().update(instance, validated_data)
+
 
 class ProveedorSerializer(serializers.ModelSerializer):
     class Meta:
@@ -148,7 +209,7 @@ class EnvioSerializer(serializers.ModelSerializer):
 class ClienteLocalSerializer(serializers.ModelSerializer):
     class Meta:
         model = ClienteLocal
-        fields = '__all__'
+        exclude = ['posicion_sync']
 
 
 class VentaLocalSerializer(serializers.ModelSerializer):
@@ -176,8 +237,110 @@ class CompraSerializer(serializers.ModelSerializer):
         fields = ['id', 'fecha', 'estado', 'id_vendedor', 'id_cliente_movil_local']
 
 
+# Compra completa (compra + líneas + venta/envío opcionales) en un solo POST
+class CompraLineaSerializer(serializers.ModelSerializer):
+    # Se valida contra la base en bloque desde CompraCompletaSerializer
+    id_producto = serializers.IntegerField(source='id_producto_id')
+    cantidad = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = CompraProducto
+        fields = ['id', 'id_producto', 'cantidad', 'precio_unitario']
+
+
+class VentaAnidadaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Venta
+        fields = ['id', 'id_vendedor', 'monto_total', 'fecha_venta']
+        extra_kwargs = {'id_vendedor': {'required': False}, 'monto_total': {'required': False}}
+
+
+class EnvioAnidadoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Envio
+        fields = ['empresa_flete', 'fecha_envio', 'fecha_recepcion']
+
+
+class CompraCompletaSerializer(serializers.ModelSerializer):
+    lineas = CompraLineaSerializer(many=True, source='compraproducto_set')
+    venta = VentaAnidadaSerializer(required=False)
+    envio = EnvioAnidadoSerializer(required=False)
+
+    class Meta:
+        model = Compra
+        fields = ['id', 'fecha', 'estado', 'id_vendedor', 'id_cliente_movil_local', 'lineas', 'venta', 'envio']
+
+    def validate_lineas(self, lineas):
+        if not lineas:
+            raise serializers.ValidationError('La compra debe tener al menos una línea.')
+
+        ids = [linea['id_producto_id'] for linea in lineas]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError('Hay productos repetidos en las líneas.')
+
+        existentes = set(Producto.objects.filter(id__in=ids).values_list('id', flat=True))
+        faltantes = sorted(set(ids) - existentes)
+        if faltantes:
+            raise serializers.ValidationError(f'Productos inexistentes: {faltantes}')
+        return lineas
+
+    def create(self, validated_data):
+        lineas = validated_data.pop('compraproducto_set')
+        venta = validated_data.pop('venta', None)
+        envio = validated_data.pop('envio', None)
+
+        with transaction.atomic():
+            compra = Compra.objects.create(**validated_data)
+            creadas = CompraProducto.objects.bulk_create([
+                CompraProducto(id_compra=compra, **linea) for linea in lineas
+            ])
+            sumar_lineas_compra(compra, creadas)
+            try:
+                descontar_stock({linea['id_producto_id']: linea['cantidad'] for linea in lineas})
+            except StockInsuficiente as e:
+                raise serializers.ValidationError({'lineas': str(e)})
+
+            if venta is not None:
+                venta.setdefault('id_vendedor', compra.id_vendedor)
+                venta.setdefault('monto_total', sum(l['cantidad'] * l['precio_unitario'] for l in lineas))
+                venta = Venta.objects.create(id_compra=compra, **venta)
+            if envio is not None:
+                envio = Envio.objects.create(compra=compra, **envio)
+
+        # la respuesta se arma con lo recién creado, sin volver a leer la compra;
+        # bulk_create no devuelve pk en MySQL: ahí se releen solo las líneas
+        if any(linea.pk is None for linea in creadas):
+            creadas = list(compra.compraproducto_set.order_by('pk'))
+        compra._prefetched_objects_cache = {'compraproducto_set': creadas}
+        Compra.venta.related.set_cached_value(compra, venta)
+        Compra.envio.related.set_cached_value(compra, envio)
+        return compra
+
+
 class SolicitudContactoSerializer(serializers.ModelSerializer):
     class Meta:
         model = SolicitudContacto
         fields = "__all__"
         read_only_fields = ("usuario", "fecha_creacion", "estado")
+
+
+class ReservaStockSerializer(serializers.ModelSerializer):
+    cantidad = serializers.IntegerField(min_value=1)
+    minutos = serializers.IntegerField(min_value=1, required=False, write_only=True)
+
+    class Meta:
+        model = ReservaStock
+        fields = ['id', 'id_producto', 'id_vendedor', 'cantidad', 'estado', 'fecha_creacion', 'expira', 'minutos']
+        read_only_fields = ('estado', 'fecha_creacion', 'expira')
+
+    def create(self, validated_data):
+        vendedor = validated_data.get('id_vendedor')
+        try:
+            return reservar(
+                validated_data['id_producto'].id,
+                validated_data['cantidad'],
+                vendedor_id=vendedor.id if vendedor else None,
+                minutos=validated_data.get('minutos'),
+            )
+        except StockInsuficiente as e:
+            raise serializers.ValidationError({'cantidad': str(e)})
@@ -0,0 +1,252 @@
+# core/signals.py
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    Producto, Rubro, Venta, VentaLocal, CompraProducto, Usuario, Cliente, Vendedor, ClienteLocal,
+    Compra, Envio, ClienteMovilLocal, SolicitudContacto
+)
+from .catalogo import invalidar_catalogo
+from .consultas_graphql import invalidar_resultados
+from .perfiles import invalidar_usuario, invalidar_perfil
+from . import reportes, busqueda, metricas, cambios, avisos, sincronizacion
+
+
+# --------------------
+# Catálogo ##########################################################################################################
+# Se invalida al confirmar la transacción, así ningún request cachea datos
+# viejos con la versión nueva.
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Rubro)
+@receiver(post_delete, sender=Rubro)
+def catalogo_modificado(sender, **kwargs):
+    transaction.on_commit(invalidar_catalogo)
+
+
+# --------------------
+# Resultados GraphQL ################################################################################################
+# Los cambios de Producto ya llegan por la versión del catálogo.
+@receiver(post_save, sender=Compra)
+@receiver(post_delete, sender=Compra)
+@receiver(post_save, sender=CompraProducto)
+@receiver(post_delete, sender=CompraProducto)
+@receiver(post_save, sender=Envio)
+@receiver(post_delete, sender=Envio)
+@receiver(post_save, sender=Venta)
+@receiver(post_delete, sender=Venta)
+@receiver(post_save, sender=Vendedor)
+@receiver(post_delete, sender=Vendedor)
+@receiver(post_save, sender=ClienteMovilLocal)
+@receiver(post_delete, sender=ClienteMovilLocal)
+def graphql_modificado(sender, **kwargs):
+    transaction.on_commit(invalidar_resultados)
+
+
+# --------------------
+# Resúmenes de ventas ###############################################################################################
+# pre_save guarda el aporte anterior de la fila para restarlo si se modifica.
+ORIGEN_VENTA = {Venta: 'venta', VentaLocal: 'venta_local'}
+
+
+@receiver(pre_save, sender=Venta)
+@receiver(pre_save, sender=VentaLocal)
+def venta_antes_de_guardar(sender, instance, **kwargs):
+    anterior = None
+    if instance.pk:
+        anterior = sender.objects.filter(pk=instance.pk).first()
+    instance._resumen_anterior = reportes.datos_venta(anterior) if anterior else None
+
+
+@receiver(post_save, sender=Venta)
+@receiver(post_save, sender=VentaLocal)
+def venta_guardada(sender, instance, **kwargs):
+    origen = ORIGEN_VENTA[sender]
+    anterior = getattr(instance, '_resumen_anterior', None)
+    if anterior:
+        reportes.sumar_venta(origen, signo=-1, **anterior)
+    reportes.sumar_venta(origen, **reportes.datos_venta(instance))
+
+
+@receiver(post_delete, sender=Venta)
+@receiver(post_delete, sender=VentaLocal)
+def venta_borrada(sender, instance, **kwargs):
+    reportes.sumar_venta(ORIGEN_VENTA[sender], signo=-1, **reportes.datos_venta(instance))
+
+
+@receiver(pre_delete, sender=Vendedor)
+def vendedor_antes_de_borrar(sender, instance, **kwargs):
+    reportes.fusionar_vendedor(instance.pk)
+
+
+@receiver(pre_save, sender=CompraProducto)
+def linea_antes_de_guardar(sender, instance, **kwargs):
+    anterior = None
+    if instance.pk:
+        anterior = sender.objects.select_related('id_producto', 'id_compra').filter(pk=instance.pk).first()
+    instance._resumen_anterior = reportes.datos_linea(anterior) if anterior else None
+
+
+@receiver(post_save, sender=CompraProducto)
+def linea_guardada(sender, instance, **kwargs):
+    anterior = getattr(instance, '_resumen_anterior', None)
+    if anterior:
+        reportes.sumar_rubro(signo=-1, **anterior)
+    actual = reportes.datos_linea(instance)
+    if actual:
+        reportes.sumar_rubro(**actual)
+
+
+@receiver(post_delete, sender=CompraProducto)
+def linea_borrada(sender, instance, **kwargs):
+    actual = reportes.datos_linea(instance)
+    if actual:
+        reportes.sumar_rubro(signo=-1, **actual)
+
+
+# --------------------
+# Eventos de compra #################################################################################################
+# Van en la misma transacción que el cambio (ver core/cambios.py). pre_save
+# guarda el estado anterior para registrar solo los cambios de estado.
+@receiver(pre_save, sender=Compra)
+def compra_antes_de_guardar(sender, instance, **kwargs):
+    instance._estado_anterior = None
+    if instance.pk:
+        instance._estado_anterior = sender.objects.filter(pk=instance.pk).values_list('estado', flat=True).first()
+
+
+@receiver(post_save, sender=Compra)
+def compra_guardada(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_estado_anterior', None)
+    if created:
+        cambios.registrar('compra_creada', instance.pk, instance.id_cliente_movil_local_id, nuevo=instance.estado)
+    elif anterior != instance.estado:
+        cambios.registrar(
+            'compra_estado', instance.pk, instance.id_cliente_movil_local_id, anterior=anterior, nuevo=instance.estado
+        )
+
+
+@receiver(post_delete, sender=Compra)
+def compra_borrada(sender, instance, **kwargs):
+    cambios.registrar('compra_borrada', instance.pk, instance.id_cliente_movil_local_id, anterior=instance.estado)
+
+
+def _cliente_de_compra(compra_id):
+    return Compra.objects.filter(pk=compra_id).values_list('id_cliente_movil_local', flat=True).first()
+
+
+@receiver(pre_save, sender=Envio)
+def envio_antes_de_guardar(sender, instance, **kwargs):
+    instance._recibido_antes = sender.objects.filter(
+        pk=instance.pk, fecha_recepcion__isnull=False
+    ).exists() if instance.pk else False
+
+
+@receiver(post_save, sender=Envio)
+def envio_guardado(sender, instance, created, **kwargs):
+    if created:
+        tipo, nuevo = 'envio_creado', 'enviado'
+    elif instance.fecha_recepcion and not getattr(instance, '_recibido_antes', False):
+        tipo, nuevo = 'envio_recibido', 'recibido'
+    else:
+        tipo, nuevo = 'envio_actualizado', 'recibido' if instance.fecha_recepcion else 'enviado'
+    cambios.registrar(tipo, instance.pk, _cliente_de_compra(instance.pk), nuevo=nuevo)
+
+
+@receiver(post_save, sender=Venta)
+def venta_registrada(sender, instance, created, **kwargs):
+    if created:
+        cambios.registrar('venta_creada', instance.id_compra_id, _cliente_de_compra(instance.id_compra_id))
+
+
+@receiver(post_delete, sender=Venta)
+def venta_eliminada(sender, instance, **kwargs):
+    cambios.registrar('venta_borrada', instance.id_compra_id, _cliente_de_compra(instance.id_compra_id))
+
+
+# --------------------
+# Avisos de solicitudes de contacto #################################################################################
+# Al aceptar, la solicitud se marca 'aceptada' y después se borra: el borrado
+# solo avisa si estaba pendiente (cancelada por el cliente).
+@receiver(post_save, sender=SolicitudContacto)
+def solicitud_guardada(sender, instance, created, **kwargs):
+    if created:
+        avisos.publicar('creada', instance)
+    elif instance.estado in ('aceptada', 'cancelada'):
+        avisos.publicar(instance.estado, instance)
+
+
+@receiver(post_delete, sender=SolicitudContacto)
+def solicitud_borrada(sender, instance, **kwargs):
+    if instance.estado == 'pendiente':
+        avisos.publicar('cancelada', instance)
+
+
+# --------------------
+# Cache de usuarios / perfiles ######################################################################################
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def usuario_modificado(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_save, sender=Vendedor)
+@receiver(post_delete, sender=Vendedor)
+def perfil_modificado(sender, instance, **kwargs):
+    if instance.id_usuario_id:
+        invalidar_perfil(instance.id_usuario_id)
+
+
+# --------------------
+# Índice de búsqueda ################################################################################################
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=ClienteLocal)
+def busqueda_guardado(sender, instance, **kwargs):
+    busqueda.indexar(instance)
+
+
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=ClienteLocal)
+def busqueda_borrado(sender, instance, **kwargs):
+    busqueda.desindexar(sender, instance.pk)
+
+
+# --------------------
+# Sincronización incremental ########################################################################################
+# Como auto_now con actualizado_en: cada save() deja la fila sin posición y
+# core/sincronizacion.py la numera cuando ya está confirmada.
+@receiver(pre_save, sender=Producto)
+@receiver(pre_save, sender=Rubro)
+@receiver(pre_save, sender=ClienteLocal)
+@receiver(pre_save, sender=ClienteMovilLocal)
+def sincronizado_modificado(sender, instance, **kwargs):
+    instance.posicion_sync = None
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Rubro)
+@receiver(post_save, sender=ClienteLocal)
+@receiver(post_save, sender=ClienteMovilLocal)
+def sincronizado_guardado(sender, instance, **kwargs):
+    sincronizacion.numerar_al_confirmar()
+
+
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=Rubro)
+@receiver(post_delete, sender=ClienteLocal)
+@receiver(post_delete, sender=ClienteMovilLocal)
+def sincronizado_borrado(sender, instance, **kwargs):
+    sincronizacion.registrar_borrado(sender, instance.pk)
+
+
+# --------------------
+# Métricas de consultas #############################################################################################
+@receiver(connection_created)
+def conexion_creada(sender, connection, **kwargs):
+    metricas.instalar(connection)
@@ -0,0 +1,289 @@
+# core/sincronizacion.py
+import base64
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Producto, Rubro, ClienteLocal, ClienteMovilLocal, VentaLocal, Borrado, Secuencia
+from .posiciones import numerar, valor
+from .serializer import ClienteLocalSerializer, VentaLocalSerializer
+
+
+# --------------------
+# Sincronización incremental (clientes sin conexión) ################################################################
+# Cada fila lleva su versión en actualizado_en (para detectar conflictos al
+# subir) y su posición en posicion_sync. La posición se asigna en orden de
+# confirmación (core/posiciones.py): cada escritura la deja en NULL y la
+# numera al confirmar (numerar_al_confirmar), así una transacción que confirma
+# tarde queda después de todo lo ya entregado y la lectura no toma el lock de
+# la secuencia. Si un proceso cae entre el COMMIT y la numeración, lo pendiente
+# lo numera la próxima escritura o purgar_borrados. El token que recibe el
+# cliente guarda, por modelo, la última posición que ya tiene y la del último
+# borrado; la próxima vez solo viaja lo que tiene una posición mayor.
+SECUENCIA = 'sincronizacion'
+# posición del último borrado purgado: un token anterior perdió borrados
+PURGADOS = 'sincronizacion_purgados'
+SINCRONIZADOS = {
+    'rubros': (Rubro, ('id', 'nombre_rubro', 'actualizado_en')),
+    'productos': (Producto, (
+        'id', 'id_rubro', 'nombre_producto', 'descripcion', 'precio', 'stock_actual', 'en_promocion', 'actualizado_en',
+    )),
+    'clientes_locales': (ClienteLocal, (
+        'id', 'uuid_sync', 'nombre_cliente', 'apellido_cliente', 'telefono_cliente', 'email_cliente', 'direccion',
+        'dni', 'observaciones', 'actualizado_en',
+    )),
+    'clientes_moviles_locales': (ClienteMovilLocal, (
+        'id', 'nombre_cliente_movil_local', 'apellido_cliente_movil_local', 'telefono_cliente_movil_local',
+        'email_cliente_movil_local', 'direccion_cliente_movil_local', 'dni_cliente_movil_local',
+        'observaciones_cliente_movil_local', 'actualizado_en',
+    )),
+}
+# nombre con el que se guardan los borrados de cada modelo
+NOMBRES = {model: nombre for nombre, (model, _) in SINCRONIZADOS.items()}
+NUMERADOS = [model for model, _ in SINCRONIZADOS.values()] + [Borrado]
+
+
+class TokenInvalido(ValueError):
+    pass
+
+
+class TokenVencido(Exception):
+    """
+    El token es anterior a los borrados que se conservan (o de la versión
+    anterior, por fecha): sincronizar desde cero.
+    """
+
+
+def codificar_token(posiciones):
+    posiciones = {nombre: posicion for nombre, posicion in posiciones.items() if posicion is not None}
+    return base64.urlsafe_b64encode(json.dumps(posiciones, separators=(',', ':')).encode()).decode()
+
+
+def _es_posicion(valor):
+    return isinstance(valor, int) and not isinstance(valor, bool) and valor >= 0
+
+
+def decodificar_token(token):
+    try:
+        posiciones = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise TokenInvalido('Token inválido')
+    if not isinstance(posiciones, dict):
+        raise TokenInvalido('Token inválido')
+    if all(_es_posicion(posicion) for posicion in posiciones.values()):
+        return posiciones
+    if all(
+        isinstance(posicion, list) and len(posicion) == 2 and parse_datetime(str(posicion[0]))
+        for posicion in posiciones.values()
+    ):
+        # token por (actualizado_en, id): puede haber salteado filas confirmadas tarde
+        raise TokenVencido()
+    raise TokenInvalido('Token inválido')
+
+
+def numerar_confirmados():
+    return numerar(SECUENCIA, NUMERADOS, campo='posicion_sync')
+
+
+def numerar_al_confirmar():
+    """
+    Numera lo que deja sin posición la transacción actual cuando confirme (en
+    autocommit, en el momento). La llaman las señales y los update() / bulk_*
+    sobre modelos sincronizados.
+    """
+    # robust: el cambio ya confirmó, si numerar falla lo retoma la próxima escritura
+    transaction.on_commit(numerar_confirmados, robust=True)
+
+
+def _pagina(queryset, posicion, campos, limite):
+    if posicion is not None:
+        queryset = queryset.filter(posicion_sync__gt=posicion)
+    else:
+        queryset = queryset.filter(posicion_sync__isnull=False)
+    filas = list(queryset.order_by('posicion_sync').values('posicion_sync', *campos)[:limite + 1])
+    return filas[:limite], len(filas) > limite
+
+
+def cambios_desde(token=None, limite=None):
+    """
+    {'cambios': {modelo: [filas]}, 'borrados': {modelo: [ids]}, 'token', 'hay_mas'}.
+    Sin token devuelve todo (por páginas de `limite` filas por modelo); con
+    hay_mas el cliente vuelve a pedir con el token nuevo.
+    """
+    limite = min(limite or settings.SINCRONIZACION_LIMITE, settings.SINCRONIZACION_LIMITE)
+    posiciones = decodificar_token(token) if token else {}
+    resultado = {'cambios': {}, 'borrados': {nombre: [] for nombre in SINCRONIZADOS}, 'hay_mas': False}
+
+    for nombre, (model, campos) in SINCRONIZADOS.items():
+        filas, hay_mas = _pagina(model.objects.all(), posiciones.get(nombre), campos, limite)
+        if filas:
+            posiciones[nombre] = filas[-1]['posicion_sync']
+        for fila in filas:
+            del fila['posicion_sync']
+        resultado['cambios'][nombre] = filas
+        resultado['hay_mas'] |= hay_mas
+
+    # sin token el cliente no tiene nada que borrar: se sigue desde lo ya numerado
+    posicion = posiciones.get('borrados') if token else valor(SECUENCIA)
+    if posicion is not None and posicion < valor(PURGADOS):
+        raise TokenVencido()
+    borrados, hay_mas = _pagina(Borrado.objects.all(), posicion, ('modelo', 'objeto_id'), limite)
+    for borrado in borrados:
+        if borrado['modelo'] in resultado['borrados']:
+            resultado['borrados'][borrado['modelo']].append(borrado['objeto_id'])
+    resultado['hay_mas'] |= hay_mas
+    posiciones['borrados'] = borrados[-1]['posicion_sync'] if borrados else posicion
+
+    resultado['token'] = codificar_token(posiciones)
+    return resultado
+
+
+def registrar_borrado(model, objeto_id):
+    Borrado.objects.create(modelo=NOMBRES[model], objeto_id=objeto_id)
+    numerar_al_confirmar()
+
+
+def purgar_borrados():
+    numerar_confirmados()
+    limite = timezone.now() - timedelta(days=settings.SINCRONIZACION_BORRADOS_DIAS)
+    viejos = Borrado.objects.filter(borrado_en__lt=limite)
+    with transaction.atomic():
+        purgada = viejos.aggregate(ultima=Max('posicion_sync'))['ultima'] or 0
+        if purgada > valor(PURGADOS):
+            Secuencia.objects.update_or_create(nombre=PURGADOS, defaults={'valor': purgada})
+        return viejos.delete()[0]
+
+
+# --------------------
+# Subida de lo creado sin conexión ##################################################################################
+# Cada ClienteLocal / VentaLocal nuevo trae un uuid_sync generado en el
+# cliente: si la subida se corta y se repite, lo ya creado se informa como
+# 'existente' en lugar de duplicarse. Las modificaciones de un ClienteLocal
+# traen la versión (actualizado_en) sobre la que se hicieron; si en el
+# servidor cambió desde entonces no se aplican y se devuelve 'conflicto' con la
+# fila actual para que el usuario decida. Cada elemento va en su propia
+# transacción: uno inválido no frena al resto.
+def _actual(instancia):
+    _, campos = SINCRONIZADOS['clientes_locales']
+    return ClienteLocal.objects.filter(pk=instancia.pk).values(*campos).first()
+
+
+def _uuid(valor):
+    try:
+        return uuid.UUID(str(valor)) if valor else None
+    except ValueError:
+        return None
+
+
+def _errores(errores):
+    return {'estado': 'error', 'errores': errores}
+
+
+def _crear(serializer, model, uuid_sync):
+    """
+    (instancia, creada) a partir del serializer; si otra subida con el mismo
+    uuid_sync se adelantó, la instancia existente.
+    """
+    if serializer.is_valid():
+        try:
+            with transaction.atomic():
+                return serializer.save(), True
+        except IntegrityError:
+            pass
+    elif 'uuid_sync' not in serializer.errors:
+        return None, False
+    return model.objects.filter(uuid_sync=uuid_sync).first(), False
+
+
+def subir_cliente(datos):
+    if datos.get('id') is not None:
+        if not isinstance(datos['id'], int):
+            return _errores({'id': ['Debe ser un número']})
+        version = parse_datetime(str(datos.get('actualizado_en') or ''))
+        if version is None:
+            return _errores({'actualizado_en': ['Se requiere la versión sobre la que se modificó']})
+        with transaction.atomic():
+            cliente = ClienteLocal.objects.select_for_update().filter(pk=datos['id']).first()
+            if cliente is None:
+                return {'estado': 'borrado', 'id': datos['id']}
+            if cliente.actualizado_en != version:
+                return {'estado': 'conflicto', 'id': cliente.pk, 'actual': _actual(cliente)}
+            serializer = ClienteLocalSerializer(cliente, data=datos, partial=True)
+            if not serializer.is_valid():
+                return _errores(serializer.errors)
+            cliente = serializer.save()
+        return {'estado': 'actualizado', 'id': cliente.pk, 'actualizado_en': cliente.actualizado_en}
+
+    uuid_sync = _uuid(datos.get('uuid_sync'))
+    if uuid_sync is None:
+        return _errores({'uuid_sync': ['Se requiere un UUID para crear']})
+    cliente = ClienteLocal.objects.filter(uuid_sync=uuid_sync).first()
+    if cliente is not None:
+        return {'estado': 'existente', 'id': cliente.pk, 'actualizado_en': cliente.actualizado_en}
+    serializer = ClienteLocalSerializer(data=datos)
+    cliente, creado = _crear(serializer, ClienteLocal, uuid_sync)
+    if cliente is None:
+        return _errores(serializer.errors or {'detail': ['No se pudo guardar']})
+    return {
+        'estado': 'creado' if creado else 'existente', 'id': cliente.pk, 'actualizado_en': cliente.actualizado_en,
+    }
+
+
+def subir_venta(datos, vendedor_id=None, clientes_subidos=None):
+    uuid_sync = _uuid(datos.get('uuid_sync'))
+    if uuid_sync is None:
+        return _errores({'uuid_sync': ['Se requiere un UUID']})
+    existente = VentaLocal.objects.filter(uuid_sync=uuid_sync).values_list('pk', flat=True).first()
+    if existente is not None:
+        return {'estado': 'existente', 'id': existente}
+
+    if vendedor_id is not None:
+        # un vendedor solo sube ventas propias: el id_vendedor del payload no cuenta
+        datos = {**datos, 'id_vendedor': vendedor_id}
+    else:
+        datos = dict(datos)
+    cliente_uuid = _uuid(datos.pop('cliente_uuid', None))
+    if cliente_uuid is not None:
+        # cliente creado sin conexión: en este mismo lote o en una subida anterior
+        cliente_id = (clientes_subidos or {}).get(cliente_uuid) or ClienteLocal.objects.filter(
+            uuid_sync=cliente_uuid
+        ).values_list('pk', flat=True).first()
+        if cliente_id is None:
+            return _errores({'cliente_uuid': ['Cliente no encontrado']})
+        datos['id_cliente_local'] = cliente_id
+    serializer = VentaLocalSerializer(data=datos)
+    venta, creada = _crear(serializer, VentaLocal, uuid_sync)
+    if venta is None:
+        return _errores(serializer.errors or {'detail': ['No se pudo guardar']})
+    return {'estado': 'creado' if creada else 'existente', 'id': venta.pk}
+
+
+def subir(datos, vendedor_id=None):
+    """
+    {'clientes_locales': [...], 'ventas_locales': [...]} con el resultado de
+    cada elemento, en el mismo orden. Los clientes van primero: una venta
+    puede referirse a un cliente del mismo lote por cliente_uuid.
+    """
+    clientes = datos.get('clientes_locales') or []
+    ventas = datos.get('ventas_locales') or []
+    if not isinstance(clientes, list) or not isinstance(ventas, list) or not all(
+        isinstance(elemento, dict) for elemento in clientes + ventas
+    ):
+        raise ValueError('clientes_locales y ventas_locales deben ser listas de objetos')
+    if len(clientes) + len(ventas) > settings.SINCRONIZACION_LOTE_MAXIMO:
+        raise ValueError(f'Como máximo {settings.SINCRONIZACION_LOTE_MAXIMO} elementos por subida')
+
+    resultado = {'clientes_locales': [subir_cliente(cliente) for cliente in clientes]}
+    subidos = {
+        _uuid(cliente.get('uuid_sync')): estado['id']
+        for cliente, estado in zip(clientes, resultado['clientes_locales'])
+        if estado['estado'] in ('creado', 'existente')
+    }
+    resultado['ventas_locales'] = [subir_venta(venta, vendedor_id, subidos) for venta in ventas]
+    return resultado
@@ -0,0 +1,165 @@
+# core/stock.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .models import Producto, ReservaStock
+from .catalogo import invalidar_catalogo
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, productos):
+        self.productos = sorted(productos)
+        super().__init__(f"Stock insuficiente para los productos {self.productos}")
+
+
+class ReservaNoActiva(Exception):
+    pass
+
+
+def _condicion(cantidades):
+    condicion = Q()
+    for producto_id, cantidad in cantidades.items():
+        condicion |= Q(id=producto_id, stock_actual__gte=cantidad)
+    return condicion
+
+
+def _productos_modificados():
+    # update() no dispara señales: el catálogo y la posición de sincronización
+    # se actualizan a mano al confirmar (sincronizacion importa serializer, que
+    # importa este módulo: se importa acá)
+    from .sincronizacion import numerar_al_confirmar
+    transaction.on_commit(invalidar_catalogo)
+    numerar_al_confirmar()
+
+
+def descontar_stock(cantidades):
+    """
+    Descuenta {producto_id: cantidad} con un único UPDATE condicional
+    (stock_actual >= cantidad). Si algún producto no alcanza no se descuenta
+    nada y se lanza StockInsuficiente.
+    """
+    if not cantidades:
+        return
+    condicion = _condicion(cantidades)
+    descuento = Case(
+        *[When(id=producto_id, then=Value(cantidad)) for producto_id, cantidad in cantidades.items()],
+        output_field=IntegerField(),
+    )
+    try:
+        with transaction.atomic():
+            # update() no pasa por auto_now ni por las señales: la versión y la posición
+            # para la sincronización van a mano
+            actualizados = Producto.objects.filter(condicion).update(
+                stock_actual=F('stock_actual') - descuento, actualizado_en=timezone.now(), posicion_sync=None
+            )
+            if actualizados != len(cantidades):
+                raise StockInsuficiente([])
+    except StockInsuficiente:
+        con_stock = set(Producto.objects.filter(condicion).values_list('id', flat=True))
+        raise StockInsuficiente(set(cantidades) - con_stock)
+
+    _productos_modificados()
+
+
+def ajustar_stock(producto_id, delta):
+    """
+    Suma (o resta) delta al stock sin leerlo antes; nunca lo deja negativo.
+    """
+    productos = Producto.objects.filter(id=producto_id)
+    if delta < 0:
+        productos = productos.filter(stock_actual__gte=-delta)
+    actualizados = productos.update(
+        stock_actual=F('stock_actual') + delta, actualizado_en=timezone.now(), posicion_sync=None
+    )
+    if not actualizados:
+        raise StockInsuficiente([producto_id])
+    _productos_modificados()
+
+
+def ajustar_stocks(deltas):
+    """
+    Como ajustar_stock para {producto_id: delta} con un único UPDATE (F() +
+    CASE). Los productos a los que una resta dejaría en negativo no se tocan:
+    retorna sus ids.
+    """
+    deltas = {producto_id: delta for producto_id, delta in deltas.items() if delta}
+    if not deltas:
+        return set()
+    restas = {producto_id: -delta for producto_id, delta in deltas.items() if delta < 0}
+    with transaction.atomic():
+        # solo las restas dependen del stock actual: se bloquean esas filas
+        # hasta el UPDATE para que la condición siga valiendo
+        alcanzan = set(Producto.objects.select_for_update().filter(
+            _condicion(restas)
+        ).values_list('id', flat=True)) if restas else set()
+        sin_stock = set(restas) - alcanzan
+        aplicar = {producto_id: delta for producto_id, delta in deltas.items() if producto_id not in sin_stock}
+        if aplicar:
+            suma = Case(
+                *[When(id=producto_id, then=Value(delta)) for producto_id, delta in aplicar.items()],
+                output_field=IntegerField(),
+            )
+            Producto.objects.filter(id__in=aplicar).update(
+                stock_actual=F('stock_actual') + suma, actualizado_en=timezone.now(), posicion_sync=None
+            )
+            _productos_modificados()
+    return sin_stock
+
+
+# --------------------
+# Reservas ##########################################################################################################
+# Cada paso es un UPDATE condicional sobre la fila (F() + filtro de estado),
+# así no se mantienen locks entre requests y dos vendedores nunca pueden
+# llevarse la misma unidad ni liberar dos veces la misma reserva.
+def reservar(producto_id, cantidad, vendedor_id=None, minutos=None):
+    if minutos is None:
+        minutos = settings.STOCK_RESERVA_MINUTOS
+    with transaction.atomic():
+        ajustar_stock(producto_id, -cantidad)
+        return ReservaStock.objects.create(
+            id_producto_id=producto_id,
+            id_vendedor_id=vendedor_id,
+            cantidad=cantidad,
+            expira=timezone.now() + timedelta(minutes=minutos),
+        )
+
+
+def confirmar_reserva(reserva_id):
+    actualizadas = ReservaStock.objects.filter(
+        id=reserva_id, estado='activa', expira__gt=timezone.now()
+    ).update(estado='confirmada')
+    if not actualizadas:
+        raise ReservaNoActiva(f"La reserva {reserva_id} no está activa")
+
+
+def liberar_reserva(reserva_id, estado='liberada'):
+    reserva = ReservaStock.objects.filter(id=reserva_id).values('id_producto_id', 'cantidad').first()
+    if reserva is None:
+        raise ReservaNoActiva(f"La reserva {reserva_id} no existe")
+    with transaction.atomic():
+        # Solo quien logra pasarla de 'activa' devuelve el stock
+        if not ReservaStock.objects.filter(id=reserva_id, estado='activa').update(estado=estado):
+            raise ReservaNoActiva(f"La reserva {reserva_id} no está activa")
+        ajustar_stock(reserva['id_producto_id'], reserva['cantidad'])
+
+
+def liberar_vencidas(limite=500):
+    """
+    Devuelve al stock las reservas activas vencidas. Retorna cuántas liberó.
+    """
+    vencidas = ReservaStock.objects.filter(
+        estado='activa', expira__lte=timezone.now()
+    ).values_list('id', flat=True)[:limite]
+    liberadas = 0
+    for reserva_id in list(vencidas):
+        try:
+            liberar_reserva(reserva_id, estado='vencida')
+            liberadas += 1
+        except ReservaNoActiva:
+            # la confirmaron o liberaron mientras tanto
+            pass
+    return liberadas
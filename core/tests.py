@@ -0,0 +1,1533 @@
+# core/tests.py
+# Correr con una base local: SECRET_KEY=x DB_PERFIL=sqlite python manage.py test core
+import asyncio
+import io
+import os
+import runpy
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import avisos, cambios, catalogo, importacion, reportes, sincronizacion
+from .benchmarks.carga import CONSULTA_GRAPHQL
+from .benchmarks.suite import CONSULTA_GRAPHQL_PAGINADA
+from .catalogo import cache_catalogo, invalidar_catalogo, version_catalogo
+from .exportacion import lineas
+from .hashers import PBKDF2IteracionesHasher
+from .importacion import importar_lista, leer_csv
+from .loaders import Loaders
+from .metricas import registro as registro_metricas
+from .reportes import sumar_venta
+from .sincronizacion import codificar_token, purgar_borrados
+from .notificaciones import EmisorMemoria, despachador, despachar_lote, emisor_memoria, encolar_notificacion, reclamar_lote
+from .models import (
+    Rubro, Producto, VersionCache, Usuario, Vendedor, ClienteMovilLocal, Compra, CompraProducto, Envio, Venta,
+    SolicitudContacto, ReservaStock, ResumenRubro, ResumenVentas, EventoCompra, NotificacionPendiente, Borrado, Proveedor, ProductoProveedor, Cliente, Factura, ClienteLocal, VentaLocal,
+)
+from .optimizacion import ListadoRapidoMixin, lectura_rapida
+from .recursos import Recientes
+from .renderers import FragmentoJSON, RendererJSONRapido
+from .serializer import CompraCompletaSerializer, ProductoSerializer, RubroSerializer
+from .stock import ReservaNoActiva, StockInsuficiente, ajustar_stock, confirmar_reserva, liberar_reserva, reservar
+from .urls import router
+from moto_api.asgi import EstaticosASGI
+from moto_api.firebase.firebase import EmisorFirebase
+
+
+# --------------------
+# Datos de prueba ###################################################################################################
+def crear_compras(cantidad, dni='30123456', productos_por_compra=2):
+    """
+    `cantidad` compras de un mismo cliente móvil, cada una con sus productos, envío
+    y venta. Se puede llamar varias veces: reutiliza vendedor, cliente y productos.
+    """
+    vendedor = Vendedor.objects.filter(email_vendedor='vendedor@test.com').first()
+    if vendedor is None:
+        usuario = Usuario.objects.create_user('vendedor@test.com', 'clave', rol='vendedor')
+        vendedor = Vendedor.objects.create(
+            id_usuario=usuario, nombre_vendedor='Ana', apellido_vendedor='Paz', email_vendedor='vendedor@test.com',
+            zona='Centro',
+        )
+    cliente, _ = ClienteMovilLocal.objects.get_or_create(dni_cliente_movil_local=dni, defaults={
+        'nombre_cliente_movil_local': 'Juan', 'apellido_cliente_movil_local': 'Gómez',
+    })
+    rubro, _ = Rubro.objects.get_or_create(nombre_rubro='Repuestos')
+    productos = [
+        Producto.objects.get_or_create(
+            id_rubro=rubro, nombre_producto=f'Producto {i}', defaults={'precio': 10, 'stock_actual': 100},
+        )[0]
+        for i in range(productos_por_compra)
+    ]
+    compras = []
+    for _ in range(cantidad):
+        compra = Compra.objects.create(id_cliente_movil_local=cliente, id_vendedor=vendedor)
+        for producto in productos:
+            CompraProducto.objects.create(id_compra=compra, id_producto=producto, cantidad=1, precio_unitario=10)
+        Envio.objects.create(compra=compra, empresa_flete='Andreani', fecha_envio=date.today())
+        Venta.objects.create(id_compra=compra, id_vendedor=vendedor, monto_total=10 * productos_por_compra)
+        compras.append(compra)
+    return vendedor, cliente, compras
+
+
+# --------------------
+# Stock #############################################################################################################
+class StockProductoTests(TestCase):
+    def setUp(self):
+        self.cliente = APIClient()
+        self.rubro = Rubro.objects.create(nombre_rubro='Cascos')
+        self.producto = Producto.objects.create(id_rubro=self.rubro, nombre_producto='Casco', precio=10, stock_actual=5)
+
+    def test_put_y_patch_no_pisan_el_stock(self):
+        respuesta = self.cliente.patch(f'/api/productos/{self.producto.id}/', {'stock_actual': 99}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn(f'/api/productos/{self.producto.id}/ajustar_stock/', respuesta.json()['stock_actual'][0])
+        datos = {'id_rubro_id': self.rubro.id, 'nombre_producto': 'Casco', 'precio': '12.00', 'stock_actual': 99}
+        self.assertEqual(self.cliente.put(f'/api/productos/{self.producto.id}/', datos, format='json').status_code, 400)
+        # el objeto completo con el stock tal como está se acepta
+        datos['stock_actual'] = 5
+        self.assertEqual(self.cliente.put(f'/api/productos/{self.producto.id}/', datos, format='json').status_code, 200)
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.stock_actual, self.producto.precio), (5, 12))
+
+    def test_alta_con_stock_inicial_y_ajuste(self):
+        datos = {'id_rubro_id': self.rubro.id, 'nombre_producto': 'Guantes', 'precio': '3.00'}
+        respuesta = self.cliente.post('/api/productos/', datos, format='json')
+        self.assertEqual((respuesta.status_code, respuesta.json()['stock_actual']), (201, 0))
+        respuesta = self.cliente.post('/api/productos/', {**datos, 'stock_actual': 50}, format='json')
+        self.assertEqual((respuesta.status_code, respuesta.json()['stock_actual']), (201, 50))
+        self.assertEqual(self.cliente.post('/api/productos/', {**datos, 'stock_actual': -1}, format='json').status_code, 400)
+        respuesta = self.cliente.post(
+            f"/api/productos/{respuesta.json()['id']}/ajustar_stock/", {'delta': 4}, format='json'
+        )
+        self.assertEqual(respuesta.json()['stock_actual'], 54)
+
+    def test_transicion_de_reserva_inexistente_o_invalida(self):
+        reserva = reservar(self.producto.id, 2)
+        self.assertEqual(self.cliente.post('/api/reservas_stock/abc/confirmar/').status_code, 404)
+        self.assertEqual(self.cliente.post(f'/api/reservas_stock/{reserva.id + 1}/liberar/').status_code, 404)
+        self.assertEqual(self.cliente.post(f'/api/reservas_stock/{reserva.id}/confirmar/').json()['estado'], 'confirmada')
+        self.assertEqual(self.cliente.post(f'/api/reservas_stock/{reserva.id}/liberar/').status_code, 409)
+
+
+class ReservasConcurrentesTests(TransactionTestCase):
+    """
+    Muchos hilos reservando, confirmando y liberando el mismo producto a la vez:
+    el stock nunca queda negativo ni se pierde o duplica una unidad.
+    """
+    STOCK = 20
+    HILOS = 8
+    PEDIDOS = 60
+
+    def setUp(self):
+        self.producto = Producto.objects.create(
+            id_rubro=Rubro.objects.create(nombre_rubro='Cascos'), nombre_producto='Casco', precio=10,
+            stock_actual=self.STOCK,
+        )
+        self.negativo = threading.Event()
+
+    def pedido(self, i):
+        try:
+            try:
+                reserva = reservar(self.producto.id, 1 + i % 3)
+            except StockInsuficiente:
+                return
+            if Producto.objects.filter(pk=self.producto.pk, stock_actual__lt=0).exists():
+                self.negativo.set()
+            for transicion in ((confirmar_reserva, liberar_reserva) if i % 2 else (liberar_reserva, liberar_reserva)):
+                try:
+                    transicion(reserva.id)
+                except ReservaNoActiva:
+                    pass
+        except OperationalError:
+            pass  # sqlite: la base está bloqueada por otro hilo, el pedido no se hizo
+        finally:
+            connection.close()
+
+    def test_stock_nunca_negativo(self):
+        with ThreadPoolExecutor(self.HILOS) as hilos:
+            list(hilos.map(self.pedido, range(self.PEDIDOS)))
+        self.producto.refresh_from_db()
+        self.assertFalse(self.negativo.is_set())
+        self.assertGreaterEqual(self.producto.stock_actual, 0)
+        # lo que falta del stock es exactamente lo confirmado (lo liberado volvió)
+        confirmado = sum(ReservaStock.objects.filter(estado__in=('activa', 'confirmada')).values_list('cantidad', flat=True))
+        self.assertEqual(self.producto.stock_actual + confirmado, self.STOCK)
+        self.assertGreater(ReservaStock.objects.count(), 0)
+
+
+# --------------------
+# Compra completa ###################################################################################################
+class CompraCompletaTests(TestCase):
+    def setUp(self):
+        self.vendedor, self.cliente_movil, _ = crear_compras(0)
+        self.casco, self.guantes = Producto.objects.order_by('id')
+        self.datos = {
+            'id_vendedor': self.vendedor.id, 'id_cliente_movil_local': self.cliente_movil.id,
+            'lineas': [
+                {'id_producto': self.casco.id, 'cantidad': 2, 'precio_unitario': '10.00'},
+                {'id_producto': self.guantes.id, 'cantidad': 3, 'precio_unitario': '5.00'},
+            ],
+            'venta': {},
+            'envio': {'empresa_flete': 'Andreani', 'fecha_envio': str(date.today())},
+        }
+
+    def test_alta_con_lineas_venta_y_envio(self):
+        respuesta = APIClient().post('/api/compras/completa/', self.datos, format='json')
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        datos = respuesta.json()
+        compra = Compra.objects.get()
+        self.assertEqual(
+            (datos['id'], datos['id_vendedor'], datos['id_cliente_movil_local'], datos['estado']),
+            (compra.id, self.vendedor.id, self.cliente_movil.id, compra.estado),
+        )
+        self.assertEqual(
+            [(l['id'], l['id_producto'], l['cantidad']) for l in datos['lineas']],
+            list(compra.compraproducto_set.order_by('id').values_list('id', 'id_producto_id', 'cantidad')),
+        )
+        self.assertEqual((datos['venta']['id'], datos['venta']['monto_total']), (compra.venta.id, '35.00'))
+        self.assertEqual(datos['envio']['empresa_flete'], 'Andreani')
+        self.casco.refresh_from_db()
+        self.guantes.refresh_from_db()
+        self.assertEqual((self.casco.stock_actual, self.guantes.stock_actual), (98, 97))
+
+    def test_respuesta_sin_volver_a_leer(self):
+        del self.datos['venta']
+        serializer = CompraCompletaSerializer(data=self.datos)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        with self.assertNumQueries(0):
+            datos = serializer.data
+        self.assertEqual((len(datos['lineas']), datos['venta']), (2, None))
+
+    def test_stock_insuficiente_no_deja_nada(self):
+        self.datos['lineas'][1]['cantidad'] = 101
+        respuesta = APIClient().post('/api/compras/completa/', self.datos, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn(str(self.guantes.id), str(respuesta.json()['lineas']))
+        self.assertEqual((Compra.objects.count(), CompraProducto.objects.count(), Venta.objects.count()), (0, 0, 0))
+        self.assertEqual(Envio.objects.count(), 0)
+        self.casco.refresh_from_db()
+        self.assertEqual(self.casco.stock_actual, 100)
+
+
+# --------------------
+# Cache del catálogo ################################################################################################
+@override_settings(CACHE_VERSION_SEGUNDOS=0)
+class VersionCatalogoTests(TestCase):
+    def setUp(self):
+        self.cliente = APIClient()
+        Producto.objects.create(
+            id_rubro=Rubro.objects.create(nombre_rubro='Cascos'), nombre_producto='Casco', precio=10, stock_actual=1,
+        )
+
+    def test_invalidacion_de_otro_worker_cambia_el_etag(self):
+        etag = self.cliente.get('/api/productos/')['ETag']
+        self.assertEqual(self.cliente.get('/api/productos/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # otro proceso invalida: solo comparte la base
+        version = version_catalogo()
+        VersionCache.objects.filter(nombre='catalogo').update(version=F('version') + 1)
+        self.assertEqual(version_catalogo(), version + 1)
+        respuesta = self.cliente.get('/api/productos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+
+# --------------------
+# Renderer JSON #####################################################################################################
+# RendererJSONRapido tiene que dar los mismos bytes que el JSONRenderer de DRF.
+class RendererJSONTests(TestCase):
+    def assertIgualQueDRF(self, data, esperado=None):
+        self.assertEqual(RendererJSONRapido().render(data), JSONRenderer().render(data if esperado is None else esperado))
+
+    def test_tipos_que_codifica_el_encoder_de_drf(self):
+        ahora = timezone.now().replace(microsecond=123456)
+        self.assertIgualQueDRF({
+            'decimal': Decimal('10.50'), 'decimal_largo': Decimal('12345678901234567890.000001'),
+            'fecha_hora': ahora, 'fecha_hora_sin_zona': datetime(2026, 1, 2, 3, 4, 5, 6),
+            'fecha_hora_utc': datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+            'fecha': date(2026, 1, 2), 'hora': dt_time(3, 4, 5, 600), 'duracion': timedelta(days=1, seconds=5),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'texto': 'línea\u2028párrafo\u2029fin "comillas" \\ ñ', 'lista': [1, 2.5, None, True, 'á'],
+            1: 'clave numérica',
+        })
+
+    def test_fragmento_embebido(self):
+        contenido = {'precio': Decimal('3.10'), 'nombre': 'Casco\u2028XL', 'fecha': date(2026, 1, 2)}
+        fragmento = FragmentoJSON(JSONRenderer().render(contenido))
+        self.assertIgualQueDRF({'resultados': fragmento, 'total': 1}, {'resultados': contenido, 'total': 1})
+        self.assertIgualQueDRF(fragmento, contenido)
+
+    def test_catalogo_con_y_sin_cache(self):
+        rubro = Rubro.objects.create(nombre_rubro='Cascos\u2029')
+        for i in range(3):
+            Producto.objects.create(
+                id_rubro=rubro, nombre_producto=f'Casco\u2028{i}', precio=Decimal('10.05') * (i + 1), stock_actual=i,
+            )
+        esperado = JSONRenderer().render(ProductoSerializer(Producto.objects.order_by('pk'), many=True).data)
+        invalidar_catalogo()
+        cliente = APIClient()
+        sin_cache = cliente.get('/api/productos/').content
+        en_memoria = cliente.get('/api/productos/').content
+        # sin el LRU del proceso: sale del backend de cache
+        with mock.patch.object(catalogo, 'recientes', Recientes(1)):
+            en_backend = cliente.get('/api/productos/').content
+        self.assertEqual([sin_cache, en_memoria, en_backend], [esperado] * 3)
+
+
+# --------------------
+# GraphQL ###########################################################################################################
+# Las consultas que usan hoy las apps tienen que entrar con los límites por defecto.
+CONSULTA_MOVIL = (
+    'query($dni: Int!) { comprasPorClienteMovilLocal(dni: $dni) { id vendedor { id } idVendedor { id } '
+    'idClienteMovilLocal { id } productos { cantidad producto { id nombreProducto } idProducto { id } } '
+    'envio { empresaFlete fechaEnvio fechaRecepcion } venta { id montoTotal } } }'
+)
+CONSULTA_MOVIL_2 = (
+    'query($dni: Int) { comprasPorClienteMovilLocal2(dni: $dni) { id estado vendedor { id nombreVendedor } '
+    'productos { cantidad precioUnitario producto { id nombreProducto precio } } envio { empresaFlete } } }'
+)
+
+
+class ConsultasGraphQLTests(TestCase):
+    def setUp(self):
+        self.cliente = APIClient()
+        crear_compras(3)
+
+    def consultar(self, query, variables):
+        return self.cliente.post('/api/graphql/', {'query': query, 'variables': variables}, format='json')
+
+    def test_consultas_de_las_apps_entran_en_los_limites_por_defecto(self):
+        for query, variables in (
+            (CONSULTA_MOVIL, {'dni': 30123456}),
+            (CONSULTA_MOVIL_2, {'dni': 30123456}),
+            (CONSULTA_GRAPHQL, {'dni': 30123456}),
+            (CONSULTA_GRAPHQL_PAGINADA, {'dni': '30123456'}),
+        ):
+            with self.subTest(query=query):
+                respuesta = self.consultar(query, variables)
+                self.assertEqual(respuesta.status_code, 200, respuesta.content)
+                self.assertNotIn('errors', respuesta.json())
+                self.assertTrue(str(respuesta.json()['data']).count("'id'") >= 3)
+
+    @override_settings(GRAPHQL_CACHE_RESULTADOS=False)
+    def test_consultas_a_la_base_no_crecen_con_las_compras(self):
+        # una consulta por relación pedida, con 1 o con 10 compras
+        for query, variables, consultas in (
+            # compras, vendedores, clientes, renglones, productos, envíos y ventas
+            (CONSULTA_MOVIL, {'dni': 30123456}, 7),
+            # clientes con el dni, página de compras, vendedores, renglones y productos
+            (CONSULTA_GRAPHQL_PAGINADA, {'dni': '30123456'}, 5),
+        ):
+            for cantidad in (1, 10):
+                Compra.objects.all().delete()
+                crear_compras(cantidad)
+                with self.subTest(query=query, compras=cantidad), self.assertNumQueries(consultas):
+                    respuesta = self.consultar(query, variables)
+                self.assertEqual(str(respuesta.json()).count("'cantidad'"), 2 * cantidad)
+
+    def test_loaders_una_consulta_por_relacion(self):
+        _, _, compras = crear_compras(4)
+        compras = list(Compra.objects.filter(id__in=[compra.id for compra in compras]))
+        loaders = Loaders()
+        loaders.prime_compras(compras)
+        # la primera compra resuelve las cuatro; los renglones anuncian sus productos
+        with self.assertNumQueries(3):
+            for compra in compras:
+                lineas = loaders.productos_por_compra.load(compra.id)
+                self.assertEqual(len(loaders.producto.load_many([linea.id_producto_id for linea in lineas])), 2)
+                self.assertEqual(loaders.vendedor.load(compra.id_vendedor_id).id, compra.id_vendedor_id)
+        # compra sin renglones: tupla vacía (inmutable, compartida sin riesgo)
+        self.assertEqual(loaders.productos_por_compra.load(0), ())
+        self.assertIsNone(loaders.venta_por_compra.load(None))
+
+    def test_lista_sin_paginar_demasiado_cara(self):
+        query = (
+            '{ comprasPorClienteMovilLocal(dni: 30123456) { productos { producto { id } idProducto { id } } '
+            'vendedor { id } } compras(first: 100) { edges { node { productos { producto { id } idProducto { id } } '
+            'vendedor { id } idVendedor { id } } } } }'
+        )
+        respuesta = self.consultar(query, {})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['errors'][0]['extensions']['code'], 'COSTO_EXCEDIDO')
+
+
+# --------------------
+# Login #############################################################################################################
+# EmailBackend es el único backend: el token entra por email y el admin por
+# `username` (que es el email). Iteraciones bajas para que las pruebas no tarden.
+@override_settings(PASSWORD_PBKDF2_ITERACIONES=1000)
+class LoginTests(TestCase):
+    def setUp(self):
+        self.cliente = APIClient()
+        self.usuario = Usuario.objects.create_user('admin@test.com', 'clave', rol='administrador', is_staff=True)
+
+    def pedir_token(self, email, password):
+        return self.cliente.post('/api/token/', {'email': email, 'password': password}, format='json')
+
+    def test_token_por_email(self):
+        respuesta = self.pedir_token('admin@test.com', 'clave')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(set(respuesta.json()), {'access', 'refresh'})
+        self.assertEqual(self.pedir_token('admin@test.com', 'otra').status_code, 400)
+        self.assertEqual(self.pedir_token('nadie@test.com', 'clave').status_code, 400)
+
+    def test_usuario_inactivo(self):
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.pedir_token('admin@test.com', 'clave').status_code, 400)
+
+    def test_admin_por_username(self):
+        self.assertEqual(authenticate(None, username='admin@test.com', password='clave'), self.usuario)
+        self.assertIsNone(authenticate(None, username='admin@test.com', password='otra'))
+        respuesta = self.client.post('/admin/login/', {'username': 'admin@test.com', 'password': 'clave'})
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self.client.get('/admin/').status_code, 200)
+
+    def test_un_solo_hash_por_login(self):
+        # verify() de los dos hashers pbkdf2_sha256 termina en este encode
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode', wraps=PBKDF2IteracionesHasher().encode) as encode:
+            self.assertEqual(self.pedir_token('admin@test.com', 'clave').status_code, 200)
+            self.assertEqual(encode.call_count, 1)
+            # email inexistente: se hashea igual, para no distinguirlo por tiempo
+            self.assertEqual(self.pedir_token('nadie@test.com', 'clave').status_code, 400)
+            self.assertEqual(encode.call_count, 2)
+
+    def test_rehash_al_subir_las_iteraciones(self):
+        self.assertEqual(self.usuario.password.split('$')[:2], ['pbkdf2_sha256', '1000'])
+        with override_settings(PASSWORD_PBKDF2_ITERACIONES=2000):
+            self.assertEqual(self.pedir_token('admin@test.com', 'clave').status_code, 200)
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.password.split('$')[:2], ['pbkdf2_sha256', '2000'])
+        self.assertTrue(self.usuario.check_password('clave'))
+
+    def test_rehash_de_otro_algoritmo(self):
+        self.usuario.password = make_password('clave', hasher='pbkdf2_sha1')
+        self.usuario.save()
+        self.assertEqual(self.pedir_token('admin@test.com', 'clave').status_code, 200)
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.password.split('$')[:2], ['pbkdf2_sha256', '1000'])
+
+
+# --------------------
+# Perfil en el token ################################################################################################
+@override_settings(JWT_PERFIL_EN_TOKEN=True)
+class PerfilEnTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cliente = APIClient()
+        self.vendedor, _, _ = crear_compras(0)
+        tokens = self.cliente.post(
+            '/api/token/', {'email': 'vendedor@test.com', 'password': 'clave'}, format='json'
+        ).json()
+        self.refresh = tokens['refresh']
+        self.cliente.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+    def test_cambio_de_perfil_se_ve_con_el_token_viejo(self):
+        self.assertEqual(self.cliente.get('/api/usuario_actual/').json()['nombre'], 'Ana')
+        self.vendedor.nombre_vendedor = 'Ana María'
+        self.vendedor.save()
+        self.assertEqual(self.cliente.get('/api/usuario_actual/').json()['nombre'], 'Ana María')
+
+    def test_refresh_arma_el_perfil_de_nuevo(self):
+        self.vendedor.nombre_vendedor = 'Ana María'
+        self.vendedor.save()
+        cache.clear()  # otro worker: sin el perfil en su cache
+        access = self.cliente.post('/api/token/refresh/', {'refresh': self.refresh}, format='json').json()['access']
+        self.cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        cache.clear()
+        self.assertEqual(self.cliente.get('/api/usuario_actual/').json()['nombre'], 'Ana María')
+
+
+# --------------------
+# Avisos de solicitudes (SSE) #######################################################################################
+@override_settings(SOLICITUDES_BROKER='core.avisos.BrokerLocal', SOLICITUDES_SSE_LATIDO=1)
+class AvisosSolicitudesTests(TestCase):
+    def setUp(self):
+        avisos.broker.cache_clear()
+        self.cliente_usuario = Usuario.objects.create_user('cliente@test.com', 'clave', rol='cliente')
+
+    def tearDown(self):
+        avisos.broker.cache_clear()
+
+    def test_publicar_y_consumir(self):
+        suscripcion = avisos.broker().suscribir()
+        with self.captureOnCommitCallbacks(execute=True):
+            solicitud = SolicitudContacto.objects.create(usuario=self.cliente_usuario)
+        evento = suscripcion.siguiente(1)
+        self.assertEqual(evento['tipo'], 'creada')
+        self.assertEqual(evento['solicitud']['id'], solicitud.id)
+        suscripcion.cerrar()
+        self.assertEqual(avisos.broker().conectados(), 0)
+
+    def test_stream_del_vendedor(self):
+        crear_compras(0)
+        cliente = APIClient()
+        access = cliente.post(
+            '/api/token/', {'email': 'vendedor@test.com', 'password': 'clave'}, format='json'
+        ).json()['access']
+        cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        respuesta = cliente.get('/api/solicitudes/stream/', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream; charset=utf-8')
+        flujo = iter(respuesta.streaming_content)
+        self.assertIn(b'event: pendientes', next(flujo))
+        with self.captureOnCommitCallbacks(execute=True):
+            SolicitudContacto.objects.create(usuario=self.cliente_usuario)
+        self.assertIn(b'event: creada', next(flujo))
+        respuesta.close()
+
+    @override_settings(SOLICITUDES_SSE_MAX_WSGI=1, SOLICITUDES_SSE_SONDEO_MS=10000)
+    def test_sin_cupo_bajo_wsgi_pasa_a_sondeo(self):
+        cliente = APIClient()
+        cliente.force_authenticate(self.cliente_usuario)
+        abierta = cliente.get('/api/solicitudes/stream/', HTTP_ACCEPT='text/event-stream')
+        next(iter(abierta.streaming_content))
+        solicitud = SolicitudContacto.objects.create(usuario=self.cliente_usuario)
+        # sin cupo: respuesta completa con el listado y un retry largo, sin tomar un hilo
+        sondeo = cliente.get('/api/solicitudes/stream/', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual((sondeo.status_code, sondeo['Content-Type']), (200, 'text/event-stream; charset=utf-8'))
+        self.assertFalse(sondeo.streaming)
+        self.assertTrue(sondeo.content.startswith(b'retry: 10000\n\nevent: pendientes\n'))
+        self.assertIn(f'"id":{solicitud.id}'.encode(), sondeo.content)
+        self.assertEqual(avisos.hilos_sse.ocupados, 1)
+        abierta.close()
+        self.assertEqual(avisos.hilos_sse.ocupados, 0)
+        otra = cliente.get('/api/solicitudes/stream/', HTTP_ACCEPT='text/event-stream')
+        self.assertTrue(otra.streaming)
+        self.assertIn(b'retry: 3000', next(iter(otra.streaming_content)))
+        otra.close()
+
+    def test_varios_workers_con_broker_local(self):
+        ruta = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '5'}):
+            os.environ.pop('SOLICITUDES_BROKER', None)
+            self.assertEqual(runpy.run_path(ruta)['workers'], 5)
+        with mock.patch.dict(os.environ):
+            os.environ.pop('WEB_CONCURRENCY', None)
+            workers = runpy.run_path(ruta)['workers']
+            self.assertEqual(os.environ['WEB_CONCURRENCY'], str(workers))
+
+    @override_settings(SOLICITUDES_SSE_SONDEO=True)
+    def test_sondeo_ve_lo_publicado_en_otro_worker(self):
+        crear_compras(0)
+        cliente = APIClient()
+        cliente.force_authenticate(Usuario.objects.get(email='vendedor@test.com'))
+        respuesta = cliente.get('/api/solicitudes/stream/', HTTP_ACCEPT='text/event-stream')
+        flujo = iter(respuesta.streaming_content)
+        self.assertIn(b'event: pendientes', next(flujo))
+        self.assertEqual(next(flujo), b': latido\n\n')
+        # otro worker: el aviso no llega a este proceso, solo la fila
+        with mock.patch.object(avisos, 'publicar'):
+            solicitud = SolicitudContacto.objects.create(usuario=self.cliente_usuario)
+        sondeo = next(flujo)
+        self.assertIn(b'event: pendientes', sondeo)
+        self.assertIn(f'"id":{solicitud.id}'.encode(), sondeo)
+        self.assertEqual(next(flujo), b': latido\n\n')
+        respuesta.close()
+
+
+# --------------------
+# Métricas ##########################################################################################################
+@override_settings(METRICAS_ACTIVAS=True)
+class MetricasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registro_metricas.reiniciar()
+        self.cliente = APIClient()
+        Rubro.objects.create(nombre_rubro='Cascos')
+
+    def tearDown(self):
+        registro_metricas.reiniciar()
+
+    def test_cuenta_requests_por_ruta(self):
+        for _ in range(3):
+            invalidar_catalogo()
+            self.assertEqual(self.cliente.get('/api/rubros/').status_code, 200)
+        self.cliente.get('/api/rubros/999/')
+        resumen = registro_metricas.resumen()
+        self.assertEqual(resumen[('GET', 'rubro-list')]['requests'], 3)
+        self.assertGreaterEqual(resumen[('GET', 'rubro-list')]['consultas_promedio'], 1)
+        self.assertEqual(resumen[('GET', 'rubro-detail')]['requests'], 1)
+        self.assertEqual(resumen[('GET', 'rubro-list')]['n_mas_uno'], 0)
+
+    @override_settings(METRICAS_ACTIVAS=False)
+    def test_desactivadas(self):
+        self.cliente.get('/api/rubros/')
+        self.assertEqual(registro_metricas.resumen(), {})
+
+    @override_settings(METRICAS_CABECERAS=True, METRICAS_N_MAS_UNO=1)
+    def test_cabeceras_y_aviso_de_n_mas_uno(self):
+        invalidar_catalogo()
+        with self.assertLogs('core.metricas', 'WARNING') as log:
+            respuesta = self.cliente.get('/api/rubros/')
+        self.assertGreaterEqual(int(respuesta['X-Consultas']), 1)
+        self.assertIn('X-Tiempo-DB', respuesta)
+        self.assertIn('Posible N+1 en GET rubro-list', log.output[0])
+        self.assertEqual(registro_metricas.resumen()[('GET', 'rubro-list')]['n_mas_uno'], 1)
+
+    def test_vista_solo_para_staff(self):
+        self.cliente.get('/api/rubros/')
+        self.assertEqual(self.cliente.get('/api/metricas/').status_code, 401)
+        self.cliente.force_authenticate(Usuario.objects.create_user('cliente@test.com', 'clave', rol='cliente'))
+        self.assertEqual(self.cliente.get('/api/metricas/').status_code, 403)
+        self.cliente.force_authenticate(
+            Usuario.objects.create_user('admin@test.com', 'clave', rol='administrador', is_staff=True)
+        )
+        respuesta = self.cliente.get('/api/metricas/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('moto_request_duration_seconds_count{metodo="GET",ruta="rubro-list"} 1', respuesta.content.decode())
+        datos = self.cliente.get('/api/metricas/', {'formato': 'json'}).json()
+        self.assertIn({'metodo': 'GET', 'ruta': 'rubro-list'}, [{'metodo': d['metodo'], 'ruta': d['ruta']} for d in datos])
+
+
+# --------------------
+# Servidor ASGI #####################################################################################################
+# Bajo SERVIDOR_MODO=asgi la cadena de middleware tiene que quedar async de
+# punta a punta: con DEBUG Django avisa en django.request cada middleware que
+# adapta.
+class ServidorASGITests(TestCase):
+    def cadena(self, middleware):
+        handler = ASGIHandler.__new__(ASGIHandler)
+        with override_settings(MIDDLEWARE=middleware, DEBUG=True):
+            handler.load_middleware(is_async=True)
+        return handler._middleware_chain
+
+    def test_cadena_asgi_sin_adaptar(self):
+        asgi = [middleware for middleware in settings.MIDDLEWARE if middleware not in settings.MIDDLEWARE_SOLO_WSGI]
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            cadena = self.cadena(asgi)
+        self.assertTrue(iscoroutinefunction(cadena))
+        # con WhiteNoise en la cadena sí se adapta
+        with self.assertLogs('django.request', 'DEBUG') as registro:
+            self.cadena(asgi + settings.MIDDLEWARE_SOLO_WSGI)
+        self.assertIn('WhiteNoiseMiddleware', ' '.join(registro.output))
+
+    def test_estaticos_sin_whitenoise(self):
+        with tempfile.TemporaryDirectory() as directorio, override_settings(STATIC_ROOT=directorio):
+            with open(os.path.join(directorio, 'app.css'), 'w') as archivo:
+                archivo.write('body {}')
+            aplicacion = EstaticosASGI(ASGIHandler())
+            estado, cuerpo = async_to_sync(self.pedir)(aplicacion, '/static/app.css')
+            self.assertEqual((estado, cuerpo), (200, b'body {}'))
+            estado, _ = async_to_sync(self.pedir)(aplicacion, '/static/falta.css')
+            self.assertEqual(estado, 404)
+
+    @staticmethod
+    async def pedir(aplicacion, ruta):
+        comunicador = ApplicationCommunicator(aplicacion, {
+            'type': 'http', 'method': 'GET', 'path': ruta, 'query_string': b'', 'headers': [],
+        })
+        await comunicador.send_input({'type': 'http.request'})
+        inicio = await comunicador.receive_output(5)
+        cuerpo = b''
+        while True:
+            mensaje = await comunicador.receive_output(5)
+            cuerpo += mensaje.get('body', b'')
+            if not mensaje.get('more_body'):
+                break
+        await comunicador.wait(5)
+        return inicio['status'], cuerpo
+
+
+# --------------------
+# Listados del router ###############################################################################################
+# Los listados del catálogo (rubros, productos) se miden sin acierto de cache y
+# con la versión del catálogo ya leída, como en un worker en régimen.
+@override_settings(CACHE_VERSION_SEGUNDOS=60)
+class ListadosRouterTests(TestCase):
+    def setUp(self):
+        self.cliente = APIClient()
+        cache_catalogo().clear()
+        version_catalogo()
+        vendedor, _, compras = crear_compras(5)
+        proveedor = Proveedor.objects.create(
+            nombre_proveedor='Moto Sur', telefono='1', domicilio='Calle 1', email='sur@test.com'
+        )
+        for i in range(3):
+            usuario = Usuario.objects.create_user(f'cliente{i}@test.com', 'clave', rol='cliente')
+            Cliente.objects.create(
+                id_usuario=usuario, nombre_cliente='Luis', apellido_cliente='Sosa', dni_cliente=f'2000000{i}',
+                email_cliente=f'cliente{i}@test.com',
+            )
+            cliente_local = ClienteLocal.objects.create(nombre_cliente='Eva', apellido_cliente='Ruiz', dni=f'3000000{i}')
+            VentaLocal.objects.create(id_cliente_local=cliente_local, id_vendedor=vendedor, monto_total=5)
+        for producto in Producto.objects.all():
+            ProductoProveedor.objects.create(id_proveedor=proveedor, id_producto=producto)
+            reservar(producto.id, 1, vendedor.id)
+        for venta in Venta.objects.all():
+            Factura.objects.create(id_venta=venta, fecha=date.today(), estado='Activo')
+
+    def test_una_consulta_por_listado(self):
+        for prefijo, _, _ in router.registry:
+            with self.subTest(prefijo=prefijo), self.assertNumQueries(1):
+                respuesta = self.cliente.get(f'/api/{prefijo}/', {'page_size': 100})
+            self.assertEqual(respuesta.status_code, 200, prefijo)
+            self.assertTrue(respuesta.json()['results'], prefijo)
+
+    def test_sin_parametros_devuelve_el_array(self):
+        # los clientes existentes (escritorio) leen un array; el cursor es a pedido
+        rutas = (
+            ('/api/ventas_locales/', {}), ('/api/compras/', {}), ('/api/compras/por_dni/', {'dni': '30123456'}),
+            ('/api/rubros/', {}),
+        )
+        for ruta, parametros in rutas:
+            with self.subTest(ruta=ruta):
+                completo = self.cliente.get(ruta, parametros).json()
+                self.assertIsInstance(completo, list)
+                self.assertTrue(completo)
+                vistos, pagina = [], self.cliente.get(ruta, {**parametros, 'page_size': 2}).json()
+                while True:
+                    self.assertLessEqual(len(pagina['results']), 2)
+                    vistos += pagina['results']
+                    if not pagina['next']:
+                        break
+                    pagina = self.cliente.get(pagina['next']).json()
+                self.assertEqual(sorted(fila['id'] for fila in vistos), sorted(fila['id'] for fila in completo))
+
+    def test_listado_rapido_igual_al_serializer(self):
+        usados = 0
+        for prefijo, viewset, _ in router.registry:
+            if not issubclass(viewset, ListadoRapidoMixin):
+                continue
+            with self.subTest(prefijo=prefijo):
+                usados += lectura_rapida(viewset.serializer_class) is not None
+                cuerpos = []
+                for rapido in (True, False):
+                    # sin la cache del catálogo: cada pedido arma su respuesta
+                    invalidar_catalogo()
+                    with mock.patch.object(viewset, 'listado_rapido', rapido):
+                        respuesta = self.cliente.get(f'/api/{prefijo}/')
+                    self.assertEqual(respuesta.status_code, 200)
+                    cuerpos.append(respuesta.content)
+                self.assertEqual(cuerpos[0], cuerpos[1])
+        self.assertGreater(usados, 0)
+
+    def test_to_representation_propio_usa_el_serializer(self):
+        class RubroEnMayusculas(RubroSerializer):
+            def to_representation(self, instance):
+                datos = super().to_representation(instance)
+                datos['nombre_rubro'] = datos['nombre_rubro'].upper()
+                return datos
+
+        class ProductoConRubroEnMayusculas(ProductoSerializer):
+            id_rubro = RubroEnMayusculas(read_only=True)
+
+        self.assertIsNotNone(lectura_rapida(RubroSerializer))
+        self.assertIsNone(lectura_rapida(RubroEnMayusculas))
+        self.assertIsNone(lectura_rapida(ProductoConRubroEnMayusculas))
+
+
+# --------------------
+# Búsqueda ##########################################################################################################
+# El índice de trigramas son tablas comunes (sin FULLTEXT ni pg_trgm): el mismo
+# código corre en MySQL y en el SQLite de las pruebas.
+class BusquedaTests(TestCase):
+    def setUp(self):
+        self.cliente = APIClient()
+        rubro = Rubro.objects.create(nombre_rubro='Cascos')
+        self.casco = Producto.objects.create(id_rubro=rubro, nombre_producto='Casco', precio=10, stock_actual=1)
+        self.integral = Producto.objects.create(
+            id_rubro=rubro, nombre_producto='Casco integral', descripcion='Con visera antiempañante', precio=20,
+            stock_actual=1,
+        )
+        self.camion = Producto.objects.create(id_rubro=rubro, nombre_producto='Cubierta camión', precio=5, stock_actual=1)
+        self.eva = ClienteLocal.objects.create(nombre_cliente='Eva', apellido_cliente='Ruiz', dni='30111222')
+
+    def buscar(self, q, estado=200, **parametros):
+        respuesta = self.cliente.get('/api/search/', {'q': q, **parametros})
+        self.assertEqual(respuesta.status_code, estado, respuesta.content)
+        return respuesta.json()
+
+    def ids(self, q, **parametros):
+        return [(fila['tipo'], fila['id']) for fila in self.buscar(q, **parametros)['results']]
+
+    def test_coincidencias_con_prefijo_errores_y_acentos(self):
+        self.assertEqual(self.ids('visera'), [('producto', self.integral.id)])
+        self.assertEqual(self.ids('casc'), [('producto', self.casco.id), ('producto', self.integral.id)])
+        self.assertEqual(self.ids('cazco'), [('producto', self.casco.id), ('producto', self.integral.id)])
+        self.assertEqual(self.ids('CAMION'), [('producto', self.camion.id)])
+        self.assertEqual(self.ids('heladera'), [])
+
+    def test_orden_por_relevancia(self):
+        datos = self.buscar('casco int')['results']
+        self.assertEqual([fila['id'] for fila in datos], [self.integral.id, self.casco.id])
+        self.assertEqual([fila['puntaje'] for fila in datos], [0.9, 0.6])
+        self.assertEqual(datos[0]['objeto']['nombre_producto'], 'Casco integral')
+        # mismo puntaje: primero el texto más corto
+        self.assertEqual(self.ids('casco')[0], ('producto', self.casco.id))
+
+    def test_consulta_vacia_o_corta(self):
+        for q in ('', '   ', '¡!'):
+            with self.subTest(q=q):
+                self.assertIn('error', self.buscar(q, estado=400))
+        # una sola letra ya tiene trigramas ("  c", " c "): coincide con lo que empieza con ella
+        self.assertEqual(
+            self.ids('c'), [('producto', self.casco.id), ('producto', self.camion.id), ('producto', self.integral.id)]
+        )
+
+    def test_tipos_segun_sesion(self):
+        self.buscar('eva', estado=400, tipo='cliente_local')
+        self.cliente.force_authenticate(Usuario.objects.create_user('admin@test.com', 'clave', rol='administrador'))
+        self.assertEqual(self.ids('eva ruiz', tipo='cliente_local'), [('cliente_local', self.eva.id)])
+        self.assertEqual(self.ids('30111222'), [('cliente_local', self.eva.id)])
+
+    def test_indice_sigue_los_cambios(self):
+        self.camion.nombre_producto = 'Cubierta moto'
+        self.camion.save()
+        self.assertEqual(self.ids('camion'), [])
+        self.assertEqual(self.ids('cubierta moto'), [('producto', self.camion.id)])
+        self.casco.delete()
+        self.assertEqual(self.ids('casco'), [('producto', self.integral.id)])
+
+    def test_admin_usa_el_indice(self):
+        modelo_admin = admin.site._registry[ClienteLocal]
+        ClienteLocal.objects.create(nombre_cliente='Luis', apellido_cliente='Sosa')
+        queryset = ClienteLocal.objects.all()
+        encontrados, _ = modelo_admin.get_search_results(None, queryset, 'ruis')
+        self.assertEqual(list(encontrados), [self.eva])
+        # sin trigramas (vacío o solo signos) no filtra
+        todos, _ = modelo_admin.get_search_results(None, queryset, '  ')
+        self.assertEqual(todos.count(), 2)
+
+
+# --------------------
+# EXPLAIN de las consultas críticas #################################################################################
+class ExplicarConsultasTests(TestCase):
+    def test_consultas_criticas_con_indice(self):
+        salida = io.StringIO()
+        call_command('explicar_consultas', '--verbose-plan', stdout=salida)
+        lineas = salida.getvalue()
+        self.assertIn('CompraViewSet.pendientes: OK', lineas)
+        self.assertNotIn('escaneo completo', lineas)
+
+    def test_falla_con_un_escaneo_completo(self):
+        consultas = [('todas las compras', Compra.objects.all())]
+        salida = io.StringIO()
+        with mock.patch('core.management.commands.explicar_consultas.consultas_criticas', return_value=consultas):
+            with self.assertRaisesMessage(CommandError, '1 consulta(s) sin índice: todas las compras'):
+                call_command('explicar_consultas', stdout=salida)
+        self.assertIn('todas las compras: escaneo completo de core_compra', salida.getvalue())
+
+
+# --------------------
+# Exportación #######################################################################################################
+# Memoria del proceso Python (tracemalloc) y no RSS: el pico de RSS nunca baja y
+# arrastra lo de los tests anteriores. Con lotes de pk, exportar 4 veces más
+# filas no puede pedir más memoria (bench_exportacion mide el RSS con millones).
+class ExportacionTests(TestCase):
+    def pico_exportando(self, formato):
+        tracemalloc.start()
+        try:
+            cantidad = sum(1 for _ in lineas('ventas_locales', formato, lote=500))
+            return cantidad, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def generar(self, cantidad, vendedor):
+        VentaLocal.objects.bulk_create([
+            VentaLocal(id_vendedor=vendedor, monto_total=100) for _ in range(cantidad)
+        ], batch_size=2000)
+
+    def test_memoria_no_crece_con_la_tabla(self):
+        vendedor, _, _ = crear_compras(0)
+        for formato in ('csv', 'ndjson'):
+            with self.subTest(formato=formato):
+                VentaLocal.objects.all().delete()
+                self.generar(1500, vendedor)
+                filas_chico, pico_chico = self.pico_exportando(formato)
+                self.generar(4500, vendedor)
+                filas_grande, pico_grande = self.pico_exportando(formato)
+                self.assertGreaterEqual(filas_grande - filas_chico, 4500)
+                self.assertLess(pico_grande, pico_chico * 1.5 + 256 * 1024)
+
+
+# --------------------
+# Importación de listas de precios ##################################################################################
+LISTA_PRECIOS = """nombre_producto;precio;stock_actual;rubro
+Casco;12,50;;Cascos
+Guantes;3.000,00;4;Accesorios
+;5;1;Cascos
+Visor;;;Cascos
+Botas;abc;1;Calzado
+"""
+
+
+class ImportacionTests(TestCase):
+    def setUp(self):
+        self.proveedor = Proveedor.objects.create(
+            nombre_proveedor='Moto Sur', telefono='1', domicilio='Calle 1', email='sur@test.com'
+        )
+        self.casco = Producto.objects.create(
+            id_rubro=Rubro.objects.create(nombre_rubro='Cascos'), nombre_producto='Casco', precio=10, stock_actual=5,
+        )
+
+    def importar(self, dry_run=False):
+        return importar_lista(self.proveedor, leer_csv(io.StringIO(LISTA_PRECIOS)), dry_run=dry_run)
+
+    def test_dry_run_cuenta_sin_escribir(self):
+        reporte = self.importar(dry_run=True)
+        self.assertEqual(
+            {clave: reporte[clave] for clave in ('leidas', 'nuevos', 'actualizados', 'con_error', 'rubros_nuevos')},
+            {'leidas': 5, 'nuevos': 1, 'actualizados': 1, 'con_error': 3, 'rubros_nuevos': 1},
+        )
+        self.assertEqual([error['linea'] for error in reporte['errores']], [4, 5, 6])
+        self.assertEqual(Producto.objects.count(), 1)
+        self.assertFalse(Rubro.objects.filter(nombre_rubro='Accesorios').exists())
+        self.casco.refresh_from_db()
+        self.assertEqual(self.casco.precio, 10)
+
+    def test_altas_modificaciones_y_reimportacion(self):
+        reporte = self.importar()
+        self.assertEqual((reporte['nuevos'], reporte['actualizados'], reporte['con_error']), (1, 1, 3))
+        self.casco.refresh_from_db()
+        self.assertEqual((self.casco.precio, self.casco.stock_actual), (Decimal('12.50'), 5))
+        guantes = Producto.objects.get(nombre_producto='Guantes')
+        self.assertEqual((guantes.precio, guantes.stock_actual, guantes.id_rubro.nombre_rubro),
+                         (Decimal('3000.00'), 4, 'Accesorios'))
+        self.assertEqual(ProductoProveedor.objects.filter(id_proveedor=self.proveedor).count(), 2)
+
+        reporte = self.importar()
+        self.assertEqual((reporte['nuevos'], reporte['actualizados'], reporte['sin_cambios']), (0, 0, 2))
+
+    def test_reserva_durante_la_importacion_no_se_pierde(self):
+        ajustar = importacion.ajustar_stocks
+
+        def reservar_antes(deltas):
+            # otro vendedor reserva entre la lectura del lote y la escritura
+            reservar(self.casco.id, 2)
+            return ajustar(deltas)
+
+        lista = io.StringIO("nombre_producto;precio;stock_actual\nCasco;12,50;8\n")
+        with mock.patch.object(importacion, 'ajustar_stocks', reservar_antes):
+            reporte = importar_lista(self.proveedor, leer_csv(lista))
+        self.assertEqual((reporte['actualizados'], reporte['con_error']), (1, 0))
+        self.casco.refresh_from_db()
+        # 5 + (8 - 5) del proveedor - 2 reservadas
+        self.assertEqual((self.casco.precio, self.casco.stock_actual), (Decimal('12.50'), 6))
+
+        # bajar a 0 con 2 unidades reservadas dejaría el stock negativo
+        lista = io.StringIO("nombre_producto;stock_actual\nCasco;0\n")
+        with mock.patch.object(importacion, 'ajustar_stocks', reservar_antes):
+            reporte = importar_lista(self.proveedor, leer_csv(lista))
+        self.assertEqual([error['linea'] for error in reporte['errores']], [2])
+        self.casco.refresh_from_db()
+        self.assertEqual(self.casco.stock_actual, 4)
+
+
+# --------------------
+# Feed de cambios ###################################################################################################
+class FeedCambiosTests(TestCase):
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(Usuario.objects.create_user('admin@test.com', 'clave', rol='administrador'))
+
+    def feed(self, **parametros):
+        respuesta = self.cliente.get('/api/changes/', parametros)
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        return respuesta.json()
+
+    def test_eventos_de_compra_envio_y_venta_en_orden(self):
+        since = self.feed()['ultimo']
+        _, cliente, (compra,) = crear_compras(1)
+        compra.estado = 'completada'
+        compra.save()
+        compra.save()  # sin cambio de estado: no registra nada
+        envio = Envio.objects.get(compra=compra)
+        envio.fecha_recepcion = date.today()
+        envio.save()
+        Venta.objects.get(id_compra=compra).delete()
+
+        datos = self.feed(since=since)
+        self.assertEqual(
+            [(e['tipo'], e['estado_anterior'], e['estado_nuevo']) for e in datos['eventos']],
+            [
+                ('compra_creada', None, 'pendiente'),
+                ('envio_creado', None, 'enviado'),
+                ('venta_creada', None, None),
+                ('compra_estado', 'pendiente', 'completada'),
+                ('envio_recibido', None, 'recibido'),
+                ('venta_borrada', None, None),
+            ],
+        )
+        self.assertTrue(all(e['compra'] == compra.id for e in datos['eventos']))
+        seqs = [e['seq'] for e in datos['eventos']]
+        self.assertEqual(seqs, sorted(seqs))
+        self.assertEqual(datos['ultimo'], seqs[-1])
+        self.assertFalse(datos['hay_mas'])
+
+        # de a dos, siguiendo el cursor, sale la misma secuencia
+        paginas, cursor = [], since
+        while True:
+            pagina = self.feed(since=cursor, limite=2)
+            paginas += [e['seq'] for e in pagina['eventos']]
+            cursor = pagina['ultimo']
+            if not pagina['hay_mas']:
+                break
+        self.assertEqual(paginas, seqs)
+        # por dni solo las del cliente
+        self.assertEqual(len(self.feed(since=since, dni=cliente.dni_cliente_movil_local)['eventos']), 6)
+        self.assertEqual(self.feed(since=since, dni='99999999')['eventos'], [])
+
+    def test_transaccion_que_confirma_tarde_no_se_saltea(self):
+        # A inserta su evento primero (seq menor) pero confirma después que B.
+        # Sin confirmar, A no es visible: solo se numera B y el cliente avanza.
+        since = self.feed()['ultimo']
+        b = EventoCompra.objects.create(seq=1000, tipo='compra_creada', compra_id=2)
+        cambios.publicar()
+        datos = self.feed(since=since)
+        self.assertEqual([e['compra'] for e in datos['eventos']], [2])
+        # A confirma ahora: recibe una posición posterior al cursor del cliente
+        a = EventoCompra.objects.create(seq=999, tipo='compra_creada', compra_id=1)
+        cambios.publicar()
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertGreater(a.posicion, b.posicion)
+        datos = self.feed(since=datos['ultimo'])
+        self.assertEqual([e['compra'] for e in datos['eventos']], [1])
+        self.assertEqual(self.feed(since=datos['ultimo'])['eventos'], [])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.cliente.get('/api/changes/', {'since': 'abc'}).status_code, 400)
+        self.assertEqual(self.cliente.get('/api/changes/', {'since': 0, 'wait': -1}).status_code, 400)
+
+    def test_sin_dni_requiere_sesion(self):
+        _, cliente, _ = crear_compras(1)
+        anonimo = APIClient()
+        self.assertEqual(anonimo.get('/api/changes/', {'since': 0}).status_code, 401)
+        respuesta = anonimo.get('/api/changes/', {'since': 0, 'dni': cliente.dni_cliente_movil_local})
+        self.assertEqual((respuesta.status_code, len(respuesta.json()['eventos'])), (200, 3))
+
+
+# El vigía consulta desde su propio hilo: necesita ver datos confirmados
+@override_settings(CAMBIOS_INTERVALO_SEGUNDOS=0.05)
+class LongPollCambiosTests(TransactionTestCase):
+    def setUp(self):
+        # el flush entre tests reinicia la secuencia; el vigía del proceso no
+        cambios.vigia.ultimo = 0
+
+    def test_sin_eventos_vence_con_pagina_vacia(self):
+        crear_compras(1)
+        since = cambios.ultimo_visible()
+        inicio = time.monotonic()
+        datos = APIClient().get('/api/changes/', {'since': since, 'dni': '30123456', 'wait': 0.5}).json()
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.5)
+        self.assertEqual(datos, {'eventos': [], 'ultimo': since, 'hay_mas': False})
+
+    @override_settings(CAMBIOS_ESPERA_MAX_WSGI=1, CAMBIOS_REINTENTO_SEGUNDOS=5)
+    def test_tope_de_esperas_bajo_wsgi(self):
+        crear_compras(1)
+        since = cambios.ultimo_visible()
+        parametros = {'since': since, 'dni': '30123456', 'wait': 1}
+        respuestas = []
+
+        def esperar():
+            respuestas.append(APIClient().get('/api/changes/', parametros))
+            connection.close()
+
+        hilo = threading.Thread(target=esperar)
+        hilo.start()
+        while not cambios.hilos_espera.ocupados and hilo.is_alive():
+            time.sleep(0.01)
+        # sin cupo no espera: contesta al instante y pide volver a consultar
+        inicio = time.monotonic()
+        sondeo = APIClient().get('/api/changes/', parametros)
+        self.assertLess(time.monotonic() - inicio, 0.5)
+        self.assertEqual((sondeo.status_code, sondeo['Retry-After']), (200, '5'))
+        self.assertEqual((sondeo.data['eventos'], sondeo.data['ultimo']), ([], since))
+        # sin wait no ocupa el cupo
+        self.assertEqual(APIClient().get('/api/changes/', {**parametros, 'wait': 0}).status_code, 200)
+        hilo.join()
+        self.assertEqual(respuestas[0].status_code, 200)
+        self.assertEqual(cambios.hilos_espera.ocupados, 0)
+
+    def test_evento_despierta_al_que_espera(self):
+        _, _, (compra,) = crear_compras(1)
+        since = cambios.ultimo_visible()
+
+        def cambiar():
+            time.sleep(0.2)
+            compra.estado = 'en_proceso'
+            compra.save()
+            connection.close()
+
+        hilo = threading.Thread(target=cambiar)
+        hilo.start()
+        inicio = time.monotonic()
+        datos = cambios.cambios(since, espera=5)
+        hilo.join()
+        self.assertLess(time.monotonic() - inicio, 4)
+        self.assertEqual([e['tipo'] for e in datos['eventos']], ['compra_estado'])
+
+    def test_un_evento_despierta_a_muchos_en_asgi(self):
+        _, _, (compra,) = crear_compras(1)
+        since = cambios.ultimo_visible()
+        esperas = 1000
+        consultas = cambios.vigia.consultas
+
+        def cambiar():
+            # todos esperando en el mismo vigía antes de que aparezca el evento
+            for _ in range(1000):
+                if len(cambios.vigia._futuros) >= esperas:
+                    break
+                time.sleep(0.01)
+            compra.estado = 'en_proceso'
+            compra.save()
+            connection.close()
+
+        async def esperar_todos():
+            return await asyncio.gather(*(cambios.acambios(since, espera=10) for _ in range(esperas)))
+
+        hilo = threading.Thread(target=cambiar)
+        hilo.start()
+        inicio = time.monotonic()
+        resultados = async_to_sync(esperar_todos)()
+        hilo.join()
+        self.assertLess(time.monotonic() - inicio, 8)
+        self.assertEqual({tuple(e['tipo'] for e in r['eventos']) for r in resultados}, {('compra_estado',)})
+        # una consulta por intervalo mientras esperan, no una por cliente
+        self.assertLess(cambios.vigia.consultas - consultas, esperas // 10)
+
+    def test_vigia_sigue_sondeando_despues_de_un_error(self):
+        _, _, (compra,) = crear_compras(1)
+        since = cambios.ultimo_visible()
+        numerar = cambios.numerar
+        fallas = [OperationalError('database table is locked')] * 2
+
+        def numerar_que_falla(*args):
+            if fallas:
+                raise fallas.pop()
+            return numerar(*args)
+
+        def cambiar():
+            time.sleep(0.2)
+            with mock.patch.object(cambios.transaction, 'on_commit'):
+                # sin publicar al confirmar: solo el vigía lo puede ver
+                compra.estado = 'en_proceso'
+                compra.save()
+            connection.close()
+
+        hilo = threading.Thread(target=cambiar)
+        with mock.patch.object(cambios, 'numerar', numerar_que_falla), self.assertLogs('core.cambios', 'ERROR'):
+            hilo.start()
+            self.assertTrue(cambios.vigia.esperar(since, 5))
+        hilo.join()
+        self.assertEqual(fallas, [])
+        # sin nadie esperando el hilo termina y queda listo para volver a arrancar
+        for _ in range(100):
+            if not cambios.vigia.activo:
+                break
+            time.sleep(0.05)
+        self.assertIsNone(cambios.vigia._hilo)
+
+
+# --------------------
+# Resúmenes de ventas ###############################################################################################
+class ResumenVentasTests(TestCase):
+    def test_un_solo_bucket_sin_vendedor(self):
+        ahora = timezone.now()
+        sumar_venta('venta_local', None, ahora, Decimal('10'))
+        sumar_venta('venta_local', None, ahora, Decimal('5'))
+        bucket = ResumenVentas.objects.get(periodo='dia', origen='venta_local', id_vendedor__isnull=True)
+        self.assertEqual((bucket.cantidad, bucket.monto_total), (2, Decimal('15')))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ResumenVentas.objects.create(periodo='dia', fecha=bucket.fecha, origen='venta_local')
+
+    def test_borrar_vendedor_pasa_sus_ventas_a_sin_vendedor(self):
+        vendedor, _, _ = crear_compras(0)
+        cliente = ClienteLocal.objects.create(nombre_cliente='Eva', apellido_cliente='Ruiz', dni='30000000')
+        VentaLocal.objects.create(id_cliente_local=cliente, monto_total=4)
+        VentaLocal.objects.create(id_cliente_local=cliente, id_vendedor=vendedor, monto_total=6)
+        vendedor.delete()
+        bucket = ResumenVentas.objects.get(periodo='mes', origen='venta_local')
+        self.assertEqual((bucket.id_vendedor_id, bucket.cantidad, bucket.monto_total), (None, 2, Decimal('10')))
+
+    def test_borrar_vendedor_con_compras_y_ventas(self):
+        vendedor, cliente, _ = crear_compras(2)
+        usuario = Usuario.objects.create_user('otro@test.com', 'clave', rol='vendedor')
+        otro = Vendedor.objects.create(
+            id_usuario=usuario, nombre_vendedor='Luis', apellido_vendedor='Sosa', email_vendedor='otro@test.com',
+            zona='Norte',
+        )
+        compra = Compra.objects.create(id_cliente_movil_local=cliente, id_vendedor=otro)
+        Venta.objects.create(id_compra=compra, id_vendedor=otro, monto_total=7)
+        # venta de una compra ajena: sobrevive al borrado con vendedor NULL
+        compra = Compra.objects.create(id_cliente_movil_local=cliente, id_vendedor=otro)
+        Venta.objects.create(id_compra=compra, id_vendedor=vendedor, monto_total=5)
+
+        vendedor.delete()
+        connection.check_constraints()
+
+        buckets = {
+            fila['id_vendedor_id']: (fila['cantidad'], fila['monto_total'])
+            for fila in ResumenVentas.objects.filter(periodo='mes', origen='venta').values(
+                'id_vendedor_id', 'cantidad', 'monto_total'
+            )
+        }
+        self.assertEqual(buckets, {otro.pk: (1, Decimal('7')), None: (1, Decimal('5'))})
+
+    def test_borrado_revertido_no_deja_estado(self):
+        vendedor, _, (compra, _) = crear_compras(2)
+        vendedor_id = vendedor.pk
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            vendedor.delete()
+            raise RuntimeError
+        # las ventas del vendedor siguen restando de su propio bucket
+        Venta.objects.get(id_compra=compra).delete()
+        buckets = dict(ResumenVentas.objects.filter(periodo='mes', origen='venta').values_list(
+            'id_vendedor_id', 'cantidad'
+        ))
+        self.assertEqual(buckets, {vendedor_id: 1})
+
+    def test_lineas_sin_consultas_por_relacion(self):
+        _, _, (compra,) = crear_compras(1)
+        linea = CompraProducto.objects.select_related('id_producto', 'id_compra').filter(id_compra=compra).first()
+        with self.assertNumQueries(0):
+            con_relaciones = reportes.datos_linea(linea)
+        linea = CompraProducto.objects.get(pk=linea.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(reportes.datos_linea(linea), con_relaciones)
+        # modificar una línea: una lectura para el aporte anterior y una para el nuevo
+        linea.cantidad = 3
+        with CaptureQueriesContext(connection) as consultas:
+            linea.save()
+        self.assertEqual(sum(c['sql'].startswith('SELECT') for c in consultas.captured_queries), 2)
+        self.assertEqual(
+            ResumenRubro.objects.get(periodo='mes', id_rubro=linea.id_producto.id_rubro_id).unidades, 4
+        )
+
+
+# --------------------
+# Outbox de notificaciones ##########################################################################################
+class EmisorQueFalla:
+    def __init__(self, fallas):
+        self.fallas = fallas
+        self.enviados = []
+
+    def __call__(self, usuario_id, mensaje):
+        if self.fallas:
+            self.fallas -= 1
+            raise ConnectionError('sin conexión')
+        self.enviados.append((usuario_id, mensaje))
+
+
+class FirebaseFalso:
+    """
+    Lo que usa EmisorFirebase de firebase_admin (app, Firestore y messaging),
+    con los tokens en memoria; registra cada llamada a send_each.
+    """
+    def __init__(self, tokens, rechazados=()):
+        self.tokens = tokens
+        self.rechazados = set(rechazados)
+        self.lecturas = 0
+        self.envios = []
+
+    def documento(self, usuario_id):
+        token = self.tokens.get(int(usuario_id))
+        return mock.Mock(id=usuario_id, exists=token is not None, to_dict=lambda: {'fcm_token': token})
+
+    def get_all(self, referencias):
+        self.lecturas += 1
+        return [self.documento(referencia) for referencia in referencias]
+
+    def send_each(self, mensajes, app=None):
+        self.envios.append([mensaje.token for mensaje in mensajes])
+        return mock.Mock(responses=[
+            mock.Mock(success=mensaje.token not in self.rechazados, exception=ConnectionError('token inválido'))
+            for mensaje in mensajes
+        ])
+
+    def modulos(self):
+        db = mock.Mock(get_all=self.get_all)
+        db.collection.return_value.document.side_effect = lambda usuario_id: usuario_id
+        messaging = mock.Mock(
+            send_each=self.send_each,
+            Message=lambda token, notification: mock.Mock(token=token),
+        )
+        firestore = mock.Mock(client=lambda app: db)
+        paquete = mock.Mock(get_app=lambda: 'app', messaging=messaging, firestore=firestore)
+        return {'firebase_admin': paquete, 'firebase_admin.messaging': messaging, 'firebase_admin.firestore': firestore}
+
+
+@override_settings(NOTIFICACIONES_EN_WEB=False, NOTIFICACIONES_MAX_INTENTOS=3, NOTIFICACIONES_BACKOFF_SEGUNDOS=30)
+class NotificacionesTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user('cliente@test.com', 'clave', rol='cliente')
+
+    def vencer(self):
+        NotificacionPendiente.objects.update(proximo_intento=timezone.now())
+
+    def test_lote_en_una_llamada(self):
+        emisor = EmisorMemoria()
+        for i in range(3):
+            encolar_notificacion(self.usuario.id, f'aviso {i}')
+        with self.assertNumQueries(4):  # ids, reclamo, lectura, bulk_update
+            self.assertEqual(despachar_lote(emisor, tamano=10), 3)
+        self.assertEqual(emisor.lotes, 1)
+        self.assertEqual([mensaje for _, mensaje in emisor.enviados], ['aviso 0', 'aviso 1', 'aviso 2'])
+        self.assertEqual(set(NotificacionPendiente.objects.values_list('estado', flat=True)), {'enviada'})
+        self.assertEqual(despachar_lote(emisor), 0)
+
+    def test_reintentos_con_espera_creciente_hasta_fallida(self):
+        notificacion = encolar_notificacion(self.usuario.id, 'aviso')
+        emisor = EmisorQueFalla(fallas=3)
+        esperas = []
+        for intento in range(1, 4):
+            antes = timezone.now()
+            self.assertEqual(despachar_lote(emisor), 1)
+            notificacion.refresh_from_db()
+            self.assertEqual((notificacion.intentos, notificacion.ultimo_error), (intento, 'sin conexión'))
+            if intento < 3:
+                self.assertEqual(notificacion.estado, 'pendiente')
+                esperas.append(round((notificacion.proximo_intento - antes).total_seconds()))
+                # no se reintenta antes de tiempo
+                self.assertEqual(despachar_lote(emisor), 0)
+                self.vencer()
+        self.assertEqual(esperas, [30, 60])
+        self.assertEqual(notificacion.estado, 'fallida')
+        self.vencer()
+        self.assertEqual(despachar_lote(emisor), 0)
+        self.assertEqual(emisor.enviados, [])
+
+    def test_reintento_exitoso_y_lease_vencido(self):
+        notificacion = encolar_notificacion(self.usuario.id, 'aviso')
+        emisor = EmisorQueFalla(fallas=1)
+        despachar_lote(emisor)
+        # un worker la reclamó y murió: se retoma al vencer el lease
+        self.vencer()
+        reclamar_lote(10)
+        self.assertEqual(despachar_lote(emisor), 0)
+        self.vencer()
+        self.assertEqual(despachar_lote(emisor), 1)
+        notificacion.refresh_from_db()
+        self.assertEqual((notificacion.estado, notificacion.intentos, notificacion.ultimo_error), ('enviada', 2, None))
+        self.assertEqual(emisor.enviados, [(self.usuario.id, 'aviso')])
+
+    def test_emisor_firebase_manda_el_lote_en_una_llamada(self):
+        otro = Usuario.objects.create_user('otro@test.com', 'clave', rol='cliente')
+        sin_token = Usuario.objects.create_user('nuevo@test.com', 'clave', rol='cliente')
+        firebase = FirebaseFalso({self.usuario.id: 'token-1', otro.id: 'token-2'}, rechazados={'token-2'})
+        for usuario in (self.usuario, otro, sin_token, self.usuario):
+            encolar_notificacion(usuario.id, 'aviso')
+        with mock.patch.dict(sys.modules, firebase.modulos()):
+            self.assertEqual(despachar_lote(EmisorFirebase()), 4)
+        self.assertEqual((firebase.lecturas, firebase.envios), (1, [['token-1', 'token-2', 'token-1']]))
+        self.assertEqual(
+            list(NotificacionPendiente.objects.order_by('id').values_list('estado', 'ultimo_error')),
+            [('enviada', None), ('pendiente', 'token inválido'),
+             ('pendiente', f'El usuario {sin_token.id} no tiene token FCM'), ('enviada', None)],
+        )
+
+    def test_worker_sigue_despues_de_un_error(self):
+        # KeyboardInterrupt no la atrapa el worker: corta el bucle en la tercera vuelta
+        with mock.patch('core.management.commands.despachar_notificaciones.despachar_lote',
+                        side_effect=[OperationalError('sin base'), 1, KeyboardInterrupt]) as despachar, \
+                mock.patch('time.sleep'), \
+                self.assertLogs('core.management.commands.despachar_notificaciones', 'ERROR'), \
+                self.assertRaises(KeyboardInterrupt):
+            call_command('despachar_notificaciones', stdout=io.StringIO())
+        self.assertEqual(despachar.call_count, 3)
+
+    def test_falla_del_lote_entero(self):
+        class EmisorCaido(EmisorMemoria):
+            def enviar_lote(self, pares):
+                raise ConnectionError('sin servicio')
+        encolar_notificacion(self.usuario.id, 'uno')
+        encolar_notificacion(self.usuario.id, 'dos')
+        self.assertEqual(despachar_lote(EmisorCaido()), 2)
+        self.assertEqual(
+            list(NotificacionPendiente.objects.values_list('estado', 'intentos', 'ultimo_error')),
+            [('pendiente', 1, 'sin servicio')] * 2,
+        )
+
+
+@override_settings(
+    NOTIFICACIONES_EN_WEB=True, NOTIFICACIONES_EMISOR='core.notificaciones.emisor_memoria',
+    NOTIFICACIONES_INTERVALO_SEGUNDOS=60,
+)
+class DespachadorWebTests(TransactionTestCase):
+    def tearDown(self):
+        despachador.detener()
+        emisor_memoria.enviados.clear()
+
+    def test_al_confirmar_despierta_al_despachador(self):
+        usuario = Usuario.objects.create_user('cliente@test.com', 'clave', rol='cliente')
+        with transaction.atomic():
+            encolar_notificacion(usuario.id, 'aviso')
+            time.sleep(0.1)
+            self.assertEqual(emisor_memoria.enviados, [])
+        limite = time.monotonic() + 5
+        while not emisor_memoria.enviados and time.monotonic() < limite:
+            time.sleep(0.02)
+        self.assertEqual(emisor_memoria.enviados, [(usuario.id, 'aviso')])
+
+
+# --------------------
+# Sincronización incremental ########################################################################################
+# Las posiciones se asignan al confirmar (on_commit): necesita commits reales
+class SincronizacionTests(TransactionTestCase):
+    def setUp(self):
+        self.vendedor, _, _ = crear_compras(0)
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.vendedor.id_usuario)
+
+    def bajar(self, token=None, limite=None, estado=200):
+        parametros = {'token': token} if token else {}
+        if limite:
+            parametros['limite'] = limite
+        respuesta = self.cliente.get('/api/sync/', parametros)
+        self.assertEqual(respuesta.status_code, estado, respuesta.content)
+        return respuesta.json()
+
+    def subir(self, **datos):
+        respuesta = self.cliente.post('/api/sync/subir/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        return respuesta.json()
+
+    def test_paginas_por_token(self):
+        for i in range(5):
+            Rubro.objects.create(nombre_rubro=f'Rubro {i}')
+        vistos, token = [], None
+        while True:
+            datos = self.bajar(token, limite=2)
+            vistos += [rubro['nombre_rubro'] for rubro in datos['cambios']['rubros']]
+            token = datos['token']
+            if not datos['hay_mas']:
+                break
+        self.assertEqual(vistos, ['Repuestos'] + [f'Rubro {i}' for i in range(5)])
+        self.assertEqual(self.bajar(token)['cambios']['rubros'], [])
+
+        rubro = Rubro.objects.get(nombre_rubro='Rubro 1')
+        rubro.nombre_rubro = 'Rubro uno'
+        rubro.save()
+        datos = self.bajar(token)
+        self.assertEqual([r['nombre_rubro'] for r in datos['cambios']['rubros']], ['Rubro uno'])
+        self.assertEqual(self.bajar(datos['token'])['cambios']['rubros'], [])
+
+    def test_escritura_que_confirma_tarde_no_se_saltea(self):
+        token = self.bajar()['token']
+        # escrita (actualizado_en) antes de la última entrega, confirmada después
+        rubro = Rubro.objects.create(nombre_rubro='Tarde')
+        Rubro.objects.filter(pk=rubro.pk).update(actualizado_en=timezone.now() - timedelta(minutes=5))
+        datos = self.bajar(token)
+        self.assertEqual([r['nombre_rubro'] for r in datos['cambios']['rubros']], ['Tarde'])
+
+    def test_lectura_no_numera(self):
+        token = self.bajar()['token']
+        with mock.patch.object(sincronizacion, 'numerar') as numerar:
+            self.bajar(token)
+        numerar.assert_not_called()
+        with transaction.atomic():
+            Rubro.objects.create(nombre_rubro='Sin confirmar')
+            # todavía sin posición: no se entrega aunque la lectura la vea
+            self.assertEqual(self.bajar(token)['cambios']['rubros'], [])
+        self.assertEqual([r['nombre_rubro'] for r in self.bajar(token)['cambios']['rubros']], ['Sin confirmar'])
+
+    def test_ajuste_de_stock_viaja(self):
+        token = self.bajar()['token']
+        producto = Producto.objects.create(
+            id_rubro=Rubro.objects.get(), nombre_producto='Casco', precio=10, stock_actual=3
+        )
+        token = self.bajar(token)['token']
+        ajustar_stock(producto.id, 2)
+        datos = self.bajar(token)
+        self.assertEqual([(p['id'], p['stock_actual']) for p in datos['cambios']['productos']], [(producto.id, 5)])
+
+    def test_borrados_y_token_vencido(self):
+        producto = Producto.objects.create(
+            id_rubro=Rubro.objects.get(), nombre_producto='Casco', precio=10, stock_actual=3
+        )
+        token = self.bajar()['token']
+        producto_id = producto.id
+        producto.delete()
+        datos = self.bajar(token)
+        self.assertEqual(datos['borrados']['productos'], [producto_id])
+        self.assertEqual(self.bajar(datos['token'])['borrados']['productos'], [])
+
+        # el borrado se purga antes de que un cliente atrasado lo reciba
+        Borrado.objects.update(borrado_en=timezone.now() - timedelta(days=365))
+        self.assertEqual(purgar_borrados(), 1)
+        self.assertEqual(self.bajar(token, estado=410)['error'][:13], 'Token vencido')
+        # el que ya lo tenía sigue; sin token se vuelve a empezar
+        self.bajar(datos['token'])
+        self.bajar(self.bajar()['token'])
+
+    def test_token_por_fecha_vence(self):
+        viejo = codificar_token({'rubros': ['2025-01-01T00:00:00+00:00', 3]})
+        self.bajar(viejo, estado=410)
+        self.bajar('no-es-un-token', estado=400)
+
+    def test_subida_repetida_no_duplica(self):
+        cliente_uuid = str(uuid.uuid4())
+        venta_uuid = str(uuid.uuid4())
+        lote = {
+            'clientes_locales': [{'uuid_sync': cliente_uuid, 'nombre_cliente': 'Eva', 'apellido_cliente': 'Ruiz'}],
+            # la venta apunta al cliente creado en el mismo lote
+            'ventas_locales': [{'uuid_sync': venta_uuid, 'cliente_uuid': cliente_uuid, 'monto_total': '12.50'}],
+        }
+        primera = self.subir(**lote)
+        self.assertEqual(primera['clientes_locales'][0]['estado'], 'creado')
+        self.assertEqual(primera['ventas_locales'][0]['estado'], 'creado')
+        venta = VentaLocal.objects.get(uuid_sync=venta_uuid)
+        self.assertEqual(
+            (venta.id_cliente_local_id, venta.id_vendedor_id, venta.monto_total),
+            (primera['clientes_locales'][0]['id'], self.vendedor.id, Decimal('12.50')),
+        )
+
+        segunda = self.subir(**lote)
+        self.assertEqual(
+            [segunda['clientes_locales'][0]['estado'], segunda['ventas_locales'][0]['estado']], ['existente'] * 2
+        )
+        self.assertEqual(segunda['clientes_locales'][0]['id'], primera['clientes_locales'][0]['id'])
+        self.assertEqual((ClienteLocal.objects.count(), VentaLocal.objects.count()), (1, 1))
+
+        sin_cliente = self.subir(ventas_locales=[
+            {'uuid_sync': str(uuid.uuid4()), 'cliente_uuid': str(uuid.uuid4()), 'monto_total': '1'}
+        ])
+        self.assertEqual(sin_cliente['ventas_locales'][0]['estado'], 'error')
+
+    def test_venta_de_vendedor_con_otro_id_vendedor(self):
+        otro = Vendedor.objects.create(
+            id_usuario=Usuario.objects.create_user('otro@test.com', 'clave', rol='vendedor'),
+            nombre_vendedor='Luis', apellido_vendedor='Sosa', email_vendedor='otro@test.com', zona='Sur',
+        )
+        resultado = self.subir(ventas_locales=[
+            {'uuid_sync': str(uuid.uuid4()), 'id_vendedor': otro.id, 'monto_total': '5'}
+        ])
+        venta = VentaLocal.objects.get(pk=resultado['ventas_locales'][0]['id'])
+        self.assertEqual(venta.id_vendedor_id, self.vendedor.id)
+
+    def test_conflicto_de_modificacion(self):
+        cliente = ClienteLocal.objects.create(nombre_cliente='Eva', apellido_cliente='Ruiz')
+        version = self.bajar()['cambios']['clientes_locales'][0]['actualizado_en']
+        resultado = self.subir(clientes_locales=[{'id': cliente.id, 'actualizado_en': version, 'telefono_cliente': '1'}])
+        self.assertEqual(resultado['clientes_locales'][0]['estado'], 'actualizado')
+        # otra modificación sobre la versión vieja: no se aplica
+        resultado = self.subir(clientes_locales=[{'id': cliente.id, 'actualizado_en': version, 'telefono_cliente': '2'}])
+        conflicto = resultado['clientes_locales'][0]
+        self.assertEqual((conflicto['estado'], conflicto['actual']['telefono_cliente']), ('conflicto', '1'))
+        cliente.refresh_from_db()
+        self.assertEqual(cliente.telefono_cliente, '1')
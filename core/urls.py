@@ -5,14 +5,22 @@ from .views import (
     RubroViewSet, ProductoViewSet, ProveedorViewSet, ProductoProveedorViewSet,
     ClienteViewSet, VendedorViewSet, CompraViewSet, CompraProductoViewSet,
     VentaViewSet, FacturaViewSet, EnvioViewSet, EmailTokenObtainPairView, 
-    RegistroUsuarioView, UsuarioViewSet, ClienteLocalViewSet, VentaLocalViewSet, ClienteMovilLocalViewSet
+    RegistroUsuarioView, UsuarioViewSet, ClienteLocalViewSet, VentaLocalViewSet, ClienteMovilLocalViewSet,
+    ReservaStockViewSet
 )
-from .views import crear_admin, usuario_actual, productos_en_promocion
+from .views import crear_admin, usuario_actual, productos_en_promocion, cambios
 from . import views
 from django.urls import path
-from graphene_django.views import GraphQLView
+from django.conf import settings
+from .consultas_graphql import GraphQLViewOptimizada as GraphQLView
 from django.views.decorators.csrf import csrf_exempt
 
+# Despliegue ASGI: los endpoints públicos de lectura pasan a sus versiones async
+if settings.SERVIDOR_ASGI:
+    from .views_async import productos_en_promocion, estado_compra, cambios, AsyncGraphQLView as GraphQLView
+else:
+    estado_compra = views.estado_compra
+
 
 router = routers.DefaultRouter()
 router.register(r'rubros', RubroViewSet)
@@ -30,6 +38,7 @@ router.register(r'usuarios', UsuarioViewSet) # Despues lo borramos
 router.register(r'clientes_locales', ClienteLocalViewSet) 
 router.register(r'ventas_locales', VentaLocalViewSet)
 router.register(r'clientes_moviles_locales', ClienteMovilLocalViewSet)
+router.register(r'reservas_stock', ReservaStockViewSet)
 
 
 
@@ -38,7 +47,7 @@ urlpatterns = [
     # Productos en promocíon
     path('productos/promocion/', productos_en_promocion, name='productos_en_promocion'),
     # Estado de la compra
-    path('compras/estado/', views.estado_compra, name='estado_compra'),
+    path('compras/estado/', estado_compra, name='estado_compra'),
 
 
     path('', include(router.urls)),
@@ -57,9 +66,29 @@ urlpatterns = [
     path('solicitud/crear/', views.crear_solicitud, name=""),
     path('solicitud/cancelar/', views.cancelar_solicitud, name=""),
     path('solicitudes/pendientes/', views.solicitudes_pendientes, name=""),
+    path('solicitudes/stream/', views.solicitudes_stream, name='solicitudes_stream'),
 
     path('solicitud/<int:solicitud_id>/aceptar/', views.aceptar_solicitud),
 
-       path("graphql/", csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    # Exportación del historial
+    path('exportar/<str:nombre>/', views.exportar_historial, name='exportar_historial'),
+
+    # Búsqueda
+    path('search/', views.buscar, name='buscar'),
+
+    # Métricas (staff)
+    path('metricas/', views.metricas, name='metricas'),
+
+    # Feed de cambios de compras (long-poll)
+    path('changes/', cambios, name='cambios'),
+
+    # Sincronización incremental (clientes sin conexión)
+    path('sync/', views.sincronizar, name='sincronizar'),
+    path('sync/subir/', views.sincronizar_subida, name='sincronizar_subida'),
+
+    # Reportes
+    path('reportes/ventas/', views.reporte_ventas, name='reporte_ventas'),
+
+       path("graphql/", csrf_exempt(GraphQLView.as_view(graphiql=True)), name="graphql"),
     
 ] 
\ No newline at end of file
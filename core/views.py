@@ -1,29 +1,45 @@
 # core/views.py
-from rest_framework import viewsets, status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework import viewsets, status, generics, permissions, mixins
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.dateparse import parse_date
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from django.http import HttpResponse, StreamingHttpResponse
+from django.conf import settings
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from .models import (
     Rubro, Producto, Proveedor, ProductoProveedor,
     Cliente, Vendedor, Compra, CompraProducto, Usuario,
-    Venta, Factura, Envio, ClienteLocal, VentaLocal, ClienteMovilLocal, SolicitudContacto
+    Venta, Factura, Envio, ClienteLocal, VentaLocal, ClienteMovilLocal, SolicitudContacto, ReservaStock
 )
 from .serializer import (
     RubroSerializer, ProductoSerializer, ProveedorSerializer, ProductoProveedorSerializer, UsuarioSerializer,
     ClienteSerializer, VendedorSerializer, CompraSerializer, CompraProductoSerializer, VentaLocalSerializer,
     VentaSerializer, FacturaSerializer, EnvioSerializer, EmailTokenObtainPairSerializer, RegistroUsuarioSerializer, ClienteLocalSerializer,
-    ClienteMovilLocalSerializer, SolicitudContactoSerializer
+    ClienteMovilLocalSerializer, SolicitudContactoSerializer, CompraCompletaSerializer, ReservaStockSerializer
 )
+from .optimizacion import QuerysetOptimizadoMixin, ListadoRapidoMixin, optimizar_queryset
+from .pagination import CompraCursorPagination, VentaCursorPagination, BusquedaPagination
+from .catalogo import respuesta_catalogo
+from .notificaciones import encolar_notificacion
+from .perfiles import perfil_request
+from .reportes import consultar_resumen
+from . import busqueda, avisos, sincronizacion, cambios as feed_cambios
+from .metricas import registro as registro_metricas
+from .exportacion import EXPORTABLES, FORMATOS, respuesta_exportacion
+from .renderers import RendererEventos, RendererJSONRapido
+from .importacion import ImportacionInvalida, importar_lista, leer_archivo
+from .stock import ajustar_stock, confirmar_reserva, liberar_reserva, StockInsuficiente, ReservaNoActiva
 
 
 # --------------------
 # ViewSets para cada modelo ##################################################################################################
-class RubroViewSet(viewsets.ModelViewSet):
+class RubroViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Rubro.objects.all()
     serializer_class = RubroSerializer
     permission_classes = [] 
@@ -31,44 +47,78 @@ class RubroViewSet(viewsets.ModelViewSet):
 
 # --------------------
 # ViewSets para cada modelo ####################################################################################################
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
     permission_classes = [] 
     # permission_classes = [IsAuthenticated]
 
+    # Listado público: sale de la cache del catálogo (ETag / 304)
+    def list(self, request, *args, **kwargs):
+        listar = super().list
+        return respuesta_catalogo(request, lambda: listar(request, *args, **kwargs).data)
 
-class ProveedorViewSet(viewsets.ModelViewSet):
+    # Suma/resta stock con un UPDATE atómico (body: {"delta": -3})
+    @action(detail=True, methods=['post'], url_path='ajustar_stock')
+    def ajustar_stock(self, request, pk=None):
+        try:
+            delta = int(request.data.get('delta'))
+        except (TypeError, ValueError):
+            return Response({"error": "Falta parámetro delta"}, status=400)
+        producto = self.get_object()
+        try:
+            ajustar_stock(producto.id, delta)
+        except StockInsuficiente as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        producto.refresh_from_db(fields=['stock_actual'])
+        return Response(self.get_serializer(producto).data)
+
+
+class ProveedorViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Proveedor.objects.all()
     serializer_class = ProveedorSerializer
     permission_classes = []
 
+    # Importa la lista de precios del proveedor (multipart: archivo=.csv|.xlsx, dry_run=1 para simular)
+    @action(detail=True, methods=['post'], url_path='importar_precios', permission_classes=[IsAuthenticated])
+    def importar_precios(self, request, pk=None):
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({"error": "Falta el archivo"}, status=400)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'si')
+        try:
+            filas = leer_archivo(archivo, archivo.name)
+            reporte = importar_lista(self.get_object(), filas, dry_run=dry_run)
+        except (ImportacionInvalida, UnicodeDecodeError) as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(reporte)
+
 
-class ProductoProveedorViewSet(viewsets.ModelViewSet):
+class ProductoProveedorViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = ProductoProveedor.objects.all()
     serializer_class = ProductoProveedorSerializer
     permission_classes = []
 
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
     permission_classes = []
 
 
-class VendedorViewSet(viewsets.ModelViewSet):
+class VendedorViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Vendedor.objects.all()
     serializer_class = VendedorSerializer
     permission_classes = []
 
 
-class CompraViewSet(viewsets.ModelViewSet):
+class CompraViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Compra.objects.all()
     serializer_class = CompraSerializer
     permission_classes = []
 
 
-class CompraProductoViewSet(viewsets.ModelViewSet):
+class CompraProductoViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = CompraProducto.objects.all()
     serializer_class = CompraProductoSerializer
     def get_queryset(self):
@@ -80,19 +130,19 @@ class CompraProductoViewSet(viewsets.ModelViewSet):
     permission_classes = []
 
 
-class VentaViewSet(viewsets.ModelViewSet):
+class VentaViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Venta.objects.all()
     serializer_class = VentaSerializer
     permission_classes = []
 
 
-class FacturaViewSet(viewsets.ModelViewSet):
+class FacturaViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Factura.objects.all()
     serializer_class = FacturaSerializer
     permission_classes = []
 
 
-class EnvioViewSet(viewsets.ModelViewSet):
+class EnvioViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Envio.objects.all()
     serializer_class = EnvioSerializer
     permission_classes = []
@@ -152,26 +202,27 @@ class RegistroUsuarioView(generics.CreateAPIView):
 
 
 # Despues lo borramos #############################################################################
-class UsuarioViewSet(viewsets.ModelViewSet):
+class UsuarioViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = RegistroUsuarioSerializer
     permission_classes = [permissions.AllowAny]
 
 
-class ClienteLocalViewSet(viewsets.ModelViewSet):
+class ClienteLocalViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = ClienteLocal.objects.all()
     serializer_class = ClienteLocalSerializer
     permission_classes = []
 
-class ClienteMovilLocalViewSet(viewsets.ModelViewSet):
+class ClienteMovilLocalViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = ClienteMovilLocal.objects.all()
     serializer_class = ClienteMovilLocalSerializer
     permission_classes = []  # ajustar según necesidad
 
 
-class CompraViewSet(viewsets.ModelViewSet):
+class CompraViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Compra.objects.all().order_by('-fecha')
     serializer_class = CompraSerializer
+    pagination_class = CompraCursorPagination
 
     def perform_create(self, serializer):
         cliente = serializer.validated_data['id_cliente']
@@ -180,9 +231,8 @@ class CompraViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='pendientes')
     def pendientes(self, request):
-        pendientes = self.queryset.filter(estado='Pendiente')
-        serializer = self.get_serializer(pendientes, many=True)
-        return Response(serializer.data)
+        pendientes = self.get_queryset().filter(estado='Pendiente')
+        return self._lista_paginada(pendientes)
     permission_classes = []
 
     @action(detail=False, methods=['get'])
@@ -190,13 +240,55 @@ class CompraViewSet(viewsets.ModelViewSet):
         dni = request.query_params.get('dni')
         if not dni:
             return Response({"error": "Falta parámetro dni"}, status=400)
-        compras = Compra.objects.filter(id_cliente_movil_local__dni_cliente_movil_local=dni)
-        serializer = self.get_serializer(compras, many=True)
+        compras = self.get_queryset().filter(id_cliente_movil_local__dni_cliente_movil_local=dni)
+        return self._lista_paginada(compras)
+
+    # Compra con todas sus líneas (y venta/envío opcionales) en una sola transacción
+    @action(detail=False, methods=['post'], url_path='completa')
+    def completa(self, request):
+        serializer = CompraCompletaSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def _lista_paginada(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
-class VentaLocalViewSet(viewsets.ModelViewSet):
+# Reservas de stock: reservar (POST), confirmar y liberar
+class ReservaStockViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                          viewsets.GenericViewSet):
+    queryset = ReservaStock.objects.all()
+    serializer_class = ReservaStockSerializer
+    permission_classes = []
+    lookup_value_regex = r'\d+'
+
+    @action(detail=True, methods=['post'])
+    def confirmar(self, request, pk=None):
+        return self._transicion(confirmar_reserva, pk)
+
+    @action(detail=True, methods=['post'])
+    def liberar(self, request, pk=None):
+        return self._transicion(liberar_reserva, pk)
+
+    def _transicion(self, funcion, pk):
+        reserva = self.get_object()  # 404 si no existe
+        try:
+            funcion(reserva.pk)
+        except ReservaNoActiva as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        reserva.refresh_from_db()
+        return Response(self.get_serializer(reserva).data)
+
+
+class VentaLocalViewSet(ListadoRapidoMixin, QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = VentaLocal.objects.all()
     serializer_class = VentaLocalSerializer
+    pagination_class = VentaCursorPagination
     permission_classes = []
 
 
@@ -204,34 +296,16 @@ class VentaLocalViewSet(viewsets.ModelViewSet):
 @permission_classes([IsAuthenticated])
 def usuario_actual(request):
     user = request.user
-    nombre = ""
-    apellido = ""
-    dni = ""
-
-    if user.rol.lower() == "cliente":
-        try:
-            cliente = Cliente.objects.get(id_usuario=user)
-            nombre = cliente.nombre_cliente
-            apellido = cliente.apellido_cliente
-            dni = cliente.dni_cliente
-        except Cliente.DoesNotExist:
-            pass
-    elif user.rol.lower() == "vendedor":
-        try:
-            vendedor = Vendedor.objects.get(id_usuario=user)
-            nombre = vendedor.nombre_vendedor
-            apellido = vendedor.apellido_vendedor
-            dni = vendedor.dni_vendedor
-        except Vendedor.DoesNotExist:
-            pass
+    # De la cache de perfiles o del claim del token (core/perfiles.py)
+    perfil = perfil_request(request)
 
     return Response({
         "id": user.id,
         "email": user.email,
         "rol": user.rol,
-        "nombre": nombre,
-        "apellido": apellido,
-        "dni": dni
+        "nombre": perfil["nombre"],
+        "apellido": perfil["apellido"],
+        "dni": perfil["dni"]
     })
 
 
@@ -287,9 +361,10 @@ def register_user(request):
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def productos_en_promocion(request):
-    productos = Producto.objects.filter(en_promocion=True)
-    serializer = ProductoSerializer(productos, many=True)
-    return Response(serializer.data)
+    def construir():
+        productos = optimizar_queryset(Producto.objects.filter(en_promocion=True), ProductoSerializer)
+        return ProductoSerializer(productos, many=True).data
+    return respuesta_catalogo(request, construir)
 
 
 @api_view(['GET'])
@@ -304,7 +379,9 @@ def estado_compra(request):
         return Response({'error': 'No se encontró el DNI en clientes móviles.'}, status=404)
     
     # Buscar compras asociadas a esos clientes
-    compras = Compra.objects.filter(id_cliente_movil_local__in=clientes_movil)
+    compras = optimizar_queryset(
+        Compra.objects.filter(id_cliente_movil_local__in=clientes_movil), CompraSerializer
+    )
     serializer = CompraSerializer(compras, many=True)
     return Response(serializer.data)
 
@@ -356,6 +433,35 @@ def solicitudes_pendientes(request):
     return Response(serializer.data)
 
 
+# Solicitudes en tiempo real (Server-Sent Events): el listado de solicitudes_pendientes
+# al conectarse y después cada solicitud creada, aceptada o cancelada (ver core/avisos.py)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([RendererEventos, RendererJSONRapido])
+def solicitudes_stream(request):
+    if request.user.rol.lower() not in ("vendedor", "cliente"):
+        return Response({"detail": "Rol no autorizado."}, status=403)
+    if settings.SERVIDOR_ASGI:
+        suscripcion, listado = avisos.conectar(request.user)
+        contenido = avisos.aflujo(request.user, suscripcion, listado)
+    elif not avisos.hilos_sse.tomar():
+        # sin cupo: el listado y que EventSource reconecte más tarde (sondeo)
+        response = HttpResponse(avisos.instantanea(request.user), content_type='text/event-stream; charset=utf-8')
+        response['Cache-Control'] = 'no-cache'
+        return response
+    else:
+        try:
+            suscripcion, listado = avisos.conectar(request.user)
+        except Exception:
+            avisos.hilos_sse.liberar()
+            raise
+        contenido = avisos.flujo(request.user, suscripcion, listado)
+    response = StreamingHttpResponse(contenido, content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # sin buffer en nginx
+    return response
+
+
 # Aceptar solicitudes - vendedores
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -363,9 +469,8 @@ def aceptar_solicitud(request, solicitud_id):
     if request.user.rol.lower() != "vendedor":
         return Response({"detail": "Solo vendedores."}, status=403)
 
-    try:
-        vendedor = Vendedor.objects.get(id_usuario=request.user)
-    except Vendedor.DoesNotExist:
+    vendedor_id = perfil_request(request)["id"]
+    if vendedor_id is None:
         return Response({"detail": "Perfil de vendedor no encontrado."}, status=404)
 
     try:
@@ -380,27 +485,157 @@ def aceptar_solicitud(request, solicitud_id):
         return Response({"detail": "Cliente no encontrado."}, status=404)
 
 
-    # Crear cliente móvil
-    ClienteMovilLocal.objects.create(
-        nombre_cliente_movil_local = cliente.nombre_cliente,
-        apellido_cliente_movil_local = cliente.apellido_cliente,
-        telefono_cliente_movil_local = cliente.telefono_cliente,
-        email_cliente_movil_local = cliente.email_cliente,
-        direccion_cliente_movil_local = cliente.direccion,
-        dni_cliente_movil_local = cliente.dni_cliente,
-    )
+    with transaction.atomic():
+        # Crear cliente móvil
+        ClienteMovilLocal.objects.create(
+            nombre_cliente_movil_local = cliente.nombre_cliente,
+            apellido_cliente_movil_local = cliente.apellido_cliente,
+            telefono_cliente_movil_local = cliente.telefono_cliente,
+            email_cliente_movil_local = cliente.email_cliente,
+            direccion_cliente_movil_local = cliente.direccion,
+            dni_cliente_movil_local = cliente.dni_cliente,
+        )
 
-    # Marcar quién aceptó
-    solicitud.vendedor_acepta = vendedor
-    solicitud.estado = "aceptada"
-    solicitud.save()
+        # Marcar quién aceptó
+        solicitud.vendedor_acepta_id = vendedor_id
+        solicitud.estado = "aceptada"
+        solicitud.save()
 
-    # comienza integración Firebase
-    from moto_api.firebase.firebase import enviar_notificacion
-    enviar_notificacion(usuario.id, "Tu solicitud fue aceptada")
+        # La notificación Firebase sale del outbox al confirmar (core/notificaciones.py)
+        encolar_notificacion(usuario.id, "Tu solicitud fue aceptada")
 
-    # Finalmente eliminar la solicitud
-    solicitud.delete()
+        # Finalmente eliminar la solicitud
+        solicitud.delete()
 
     return Response({"detail": "Solicitud aceptada."}, status=200)
 
+
+# Reporte de ventas desde los resúmenes materializados
+# ?periodo=dia|mes&desde=AAAA-MM-DD&hasta=AAAA-MM-DD&agrupar=vendedor|rubro[&origen=venta|venta_local]
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def reporte_ventas(request):
+    periodo = request.query_params.get('periodo', 'dia')
+    agrupar = request.query_params.get('agrupar', 'vendedor')
+    origen = request.query_params.get('origen')
+    try:
+        desde = parse_date(request.query_params.get('desde', ''))
+        hasta = parse_date(request.query_params.get('hasta', ''))
+    except ValueError:
+        desde = hasta = None
+
+    if not desde or not hasta:
+        return Response({"error": "Se requieren desde y hasta (AAAA-MM-DD)"}, status=400)
+    if periodo not in ('dia', 'mes') or agrupar not in ('vendedor', 'rubro'):
+        return Response({"error": "periodo debe ser dia|mes y agrupar vendedor|rubro"}, status=400)
+    if origen not in (None, 'venta', 'venta_local'):
+        return Response({"error": "origen debe ser venta|venta_local"}, status=400)
+
+    return Response(consultar_resumen(periodo, desde, hasta, agrupar=agrupar, origen=origen))
+
+
+# Búsqueda por productos / clientes (?q=texto&tipo=producto,cliente,cliente_local)
+# Sin autenticación solo se buscan productos.
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def buscar(request):
+    consulta = request.GET.get('q', '').strip()
+    if not busqueda.trigramas(consulta):
+        return Response({'error': 'Se requiere el parámetro q'}, status=status.HTTP_400_BAD_REQUEST)
+
+    permitidos = list(busqueda.INDEXADOS) if request.user.is_authenticated else ['producto']
+    tipos = [t for t in request.GET.get('tipo', ','.join(permitidos)).split(',') if t]
+    invalidos = [t for t in tipos if t not in permitidos]
+    if invalidos:
+        return Response({'error': f'Tipos no permitidos: {", ".join(invalidos)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    paginador = BusquedaPagination()
+    filas = paginador.paginate_queryset(busqueda.candidatos(consulta, tipos), request)
+    return paginador.get_paginated_response(busqueda.resultados(filas, consulta))
+
+
+# Exportación completa del historial, en streaming
+# /exportar/<compras|ventas|ventas_locales>/?formato=csv|ndjson[&desde=AAAA-MM-DD&hasta=AAAA-MM-DD]
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def exportar_historial(request, nombre):
+    formato = request.query_params.get('formato', 'csv')
+    if nombre not in EXPORTABLES or formato not in FORMATOS:
+        return Response({"error": "Exportación o formato no válido"}, status=400)
+    try:
+        desde = parse_date(request.query_params.get('desde', '')) or None
+        hasta = parse_date(request.query_params.get('hasta', '')) or None
+    except ValueError:
+        return Response({"error": "Fechas con formato AAAA-MM-DD"}, status=400)
+
+    return respuesta_exportacion(nombre, formato, desde, hasta)
+
+
+# Sincronización incremental (escritorio / móvil sin conexión)
+# GET ?token=...&limite=N: lo cambiado y borrado desde el token (sin token, todo por páginas)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sincronizar(request):
+    try:
+        limite = int(request.query_params.get('limite') or settings.SINCRONIZACION_LIMITE)
+        if limite < 1:
+            raise ValueError
+        return Response(sincronizacion.cambios_desde(request.query_params.get('token'), limite))
+    except sincronizacion.TokenVencido:
+        return Response({"error": "Token vencido: sincronizar desde cero (sin token)"}, status=410)
+    except ValueError as error:
+        return Response({"error": str(error) or "limite debe ser un número positivo"}, status=400)
+
+
+# POST {"clientes_locales": [...], "ventas_locales": [...]}: lo creado o modificado sin conexión,
+# con el resultado de cada elemento (creado, existente, actualizado, conflicto, borrado, error)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def sincronizar_subida(request):
+    vendedor_id = perfil_request(request)["id"] if request.user.rol.lower() == "vendedor" else None
+    try:
+        return Response(sincronizacion.subir(request.data, vendedor_id))
+    except ValueError as error:
+        return Response({"error": str(error)}, status=400)
+
+
+# Métricas por ruta (latencia, consultas, tiempo de base y render) en formato Prometheus;
+# con ?formato=json, resumen por ruta con percentiles
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metricas(request):
+    if request.query_params.get('formato') == 'json':
+        return Response([
+            {'metodo': metodo, 'ruta': ruta, **datos}
+            for (metodo, ruta), datos in sorted(registro_metricas.resumen().items())
+        ])
+    return HttpResponse(registro_metricas.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# Feed de cambios de compras (?since=<posicion>[&dni=...][&limite=N][&wait=segundos])
+# Sin since devuelve el cursor actual; con wait espera eventos nuevos (long-poll).
+# Sin dni (todas las compras) requiere iniciar sesión.
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def cambios(request):
+    try:
+        since, dni, limite, espera = feed_cambios.parametros(request.query_params)
+    except ValueError:
+        return Response({"error": "since, limite y wait deben ser números positivos"}, status=400)
+    if not dni and not request.user.is_authenticated:
+        return Response({"error": "Se requiere el DNI o iniciar sesión"}, status=401)
+    if since is None:
+        return Response(feed_cambios.inicio())
+    clientes = feed_cambios.clientes_por_dni(dni) if dni else None
+    if not espera:
+        return Response(feed_cambios.cambios(since, clientes, limite))
+    if not feed_cambios.hilos_espera.tomar():
+        # sin cupo responde sin esperar: el cliente vuelve a pedir tras Retry-After
+        return Response(
+            feed_cambios.cambios(since, clientes, limite),
+            headers={'Retry-After': str(settings.CAMBIOS_REINTENTO_SEGUNDOS)},
+        )
+    try:
+        return Response(feed_cambios.cambios(since, clientes, limite, espera))
+    finally:
+        feed_cambios.hilos_espera.liberar()
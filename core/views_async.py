@@ -0,0 +1,138 @@
+# core/views_async.py
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotAllowed
+from graphene_django.views import GraphQLView, HttpError
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import Producto, Compra, ClienteMovilLocal
+from .serializer import ProductoSerializer, CompraSerializer
+from .optimizacion import optimizar_queryset
+from .catalogo import arespuesta_catalogo
+from .renderers import RendererJSONRapido
+from .authentication import JWTAuthenticationCache
+from .consultas_graphql import GraphQLOptimizadoMixin, cache_graphql
+from . import cambios as feed_cambios
+
+
+# --------------------
+# Vistas async (despliegue ASGI) ####################################################################################
+# Versiones async de los endpoints públicos de lectura: las consultas usan el
+# ORM async y la serialización corre sobre instancias ya cargadas
+# (select_related / prefetch_related), así ningún acceso a la base bloquea el
+# event loop. Se enrutan en lugar de las síncronas con SERVIDOR_MODO=asgi.
+def respuesta_json(data, status_code=status.HTTP_200_OK):
+    contenido = b'' if data is None else RendererJSONRapido().render(data)
+    return HttpResponse(contenido, status=status_code, content_type='application/json')
+
+
+def solo_get(vista):
+    async def envoltura(request, *args, **kwargs):
+        if request.method != 'GET':
+            return HttpResponseNotAllowed(['GET'])
+        return await vista(request, *args, **kwargs)
+    envoltura.__name__ = vista.__name__
+    return envoltura
+
+
+async def autenticado(request):
+    # el mismo JWT que usan las vistas DRF; un token inválido cuenta como anónimo
+    try:
+        return await sync_to_async(JWTAuthenticationCache().authenticate)(request) is not None
+    except AuthenticationFailed:
+        return False
+
+
+@solo_get
+async def productos_en_promocion(request):
+    async def construir():
+        productos = optimizar_queryset(Producto.objects.filter(en_promocion=True), ProductoSerializer)
+        return ProductoSerializer([p async for p in productos], many=True).data
+    return await arespuesta_catalogo(request, construir, respuesta_json)
+
+
+@solo_get
+async def estado_compra(request):
+    dni = request.GET.get('dni')
+    if not dni:
+        return respuesta_json({'error': 'Se requiere el DNI'}, status.HTTP_400_BAD_REQUEST)
+
+    clientes_movil = ClienteMovilLocal.objects.filter(dni_cliente_movil_local=dni)
+    if not await clientes_movil.aexists():
+        return respuesta_json({'error': 'No se encontró el DNI en clientes móviles.'}, status.HTTP_404_NOT_FOUND)
+
+    compras = optimizar_queryset(
+        Compra.objects.filter(id_cliente_movil_local__in=clientes_movil), CompraSerializer
+    )
+    return respuesta_json(CompraSerializer([c async for c in compras], many=True).data)
+
+
+@solo_get
+async def cambios(request):
+    # el long-poll espera en el event loop: miles de clientes no ocupan hilos
+    try:
+        since, dni, limite, espera = feed_cambios.parametros(request.GET)
+    except ValueError:
+        return respuesta_json(
+            {'error': 'since, limite y wait deben ser números positivos'}, status.HTTP_400_BAD_REQUEST
+        )
+    if not dni and not await autenticado(request):
+        return respuesta_json({'error': 'Se requiere el DNI o iniciar sesión'}, status.HTTP_401_UNAUTHORIZED)
+    if since is None:
+        return respuesta_json(await sync_to_async(feed_cambios.inicio)())
+    clientes = await sync_to_async(feed_cambios.clientes_por_dni)(dni) if dni else None
+    return respuesta_json(await feed_cambios.acambios(since, clientes, limite, espera))
+
+
+# --------------------
+# GraphQL async #####################################################################################################
+class AsyncGraphQLView(GraphQLOptimizadoMixin, GraphQLView):
+    """
+    GraphQLView que ejecuta la consulta en el event loop. Los campos raíz ven
+    request.graphql_async y precargan las compras con el ORM async
+    (ver core.loaders.resolver_compras). Misma respuesta, persistidas, límite
+    de costo y cache que la vista síncrona; GraphiQL y los requests batch
+    siguen por el camino síncrono.
+    """
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ('get', 'post'):
+                raise HttpError(HttpResponseNotAllowed(
+                    ['GET', 'POST'], 'GraphQL only supports GET and POST requests.'
+                ))
+
+            data = self.parse_body(request)
+            if self.batch or (self.graphiql and self.can_display_graphiql(request, data)):
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            result, status_code = await self.aget_response(request, data)
+            return HttpResponse(status=status_code, content=result, content_type='application/json')
+
+        except HttpError as e:
+            response = e.response
+            response['Content-Type'] = 'application/json'
+            response.content = self.json_encode(request, {'errors': [self.format_error(e)]})
+            return response
+
+    async def aget_response(self, request, data):
+        query, variables, operation_name, clave, error = await sync_to_async(self.preparar)(request, data)
+        if error:
+            return error
+        if clave:
+            guardado = await cache_graphql().aget(clave)
+            if guardado is not None:
+                return guardado, 200
+        request.graphql_async = True
+
+        execution_result = self.execute_graphql_request(request, data, query, variables, operation_name)
+        if inspect.isawaitable(execution_result):
+            execution_result = await execution_result
+
+        result, status_code = self.armar_respuesta(request, execution_result)
+        if clave and self.cacheable(request, execution_result, status_code):
+            await cache_graphql().aset(clave, result)
+        return result, status_code
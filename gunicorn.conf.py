@@ -0,0 +1,42 @@
+# gunicorn.conf.py (gunicorn lo carga solo desde el directorio de trabajo)
+import multiprocessing
+import os
+
+# SERVIDOR_MODO=asgi sirve moto_api.asgi con workers de uvicorn (vistas async
+# para los endpoints públicos de lectura, ver core/views_async.py); por
+# defecto se sirve WSGI con hilos.
+SERVIDOR_ASGI = os.getenv('SERVIDOR_MODO', 'wsgi') == 'asgi'
+
+# Cada hilo mantiene su propia conexión persistente a MySQL (CONN_MAX_AGE),
+# así que GUNICORN_THREADS es el tamaño del pool de conexiones por worker.
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Los workers heredan el entorno: settings.py decide con esto si el broker
+# local de avisos alcanza (un proceso) o si los streams SSE tienen que sondear.
+os.environ['WEB_CONCURRENCY'] = str(workers)
+BROKER_LOCAL = os.getenv('SOLICITUDES_BROKER', 'core.avisos.BrokerLocal') == 'core.avisos.BrokerLocal'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+if SERVIDOR_ASGI:
+    wsgi_app = 'moto_api.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'moto_api.wsgi:application'
+    worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+
+
+def on_starting(server):
+    if BROKER_LOCAL and workers > 1:
+        server.log.warning(
+            "SOLICITUDES_BROKER=core.avisos.BrokerLocal con %d workers: los avisos de solicitudes de otros "
+            "workers llegan por sondeo (cada SOLICITUDES_SSE_LATIDO segundos). Para entregarlos al instante "
+            "usar SOLICITUDES_BROKER=core.avisos.BrokerRedis.", workers,
+        )
+
+
+def post_worker_init(worker):
+    # Cada worker vacía el outbox de notificaciones en un hilo propio (y revisa
+    # reintentos periódicamente); ver NOTIFICACIONES_EN_WEB en settings.py.
+    from django.conf import settings
+    if settings.NOTIFICACIONES_EN_WEB:
+        from core.notificaciones import despachador
+        despachador.arrancar()
@@ -9,8 +9,23 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
+from django.views import static
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moto_api.settings')
 
-application = get_asgi_application()
+
+class EstaticosASGI(ASGIStaticFilesHandler):
+    """
+    Sirve STATIC_URL desde STATIC_ROOT (lo que deja collectstatic, como
+    WhiteNoise bajo WSGI) y pasa el resto a la aplicación sin adaptar.
+    """
+    def serve(self, request):
+        response = static.serve(request, self.file_path(request.path), document_root=settings.STATIC_ROOT)
+        response['Cache-Control'] = 'public, max-age=3600'
+        return response
+
+
+application = EstaticosASGI(get_asgi_application())
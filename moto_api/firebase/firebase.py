@@ -0,0 +1,92 @@
+# moto_api/firebase/firebase.py
+import threading
+
+from django.conf import settings
+
+
+# --------------------
+# Notificaciones push (Firebase Cloud Messaging) ####################################################################
+# El token FCM de cada usuario está en Firestore, en el documento
+# <FIREBASE_COLECCION_USUARIOS>/<id del usuario>, campo FIREBASE_CAMPO_TOKEN.
+# El emisor cumple el protocolo de core/notificaciones.py: enviar_lote lee
+# los tokens del lote con una sola lectura (get_all) y manda todos los
+# mensajes con una llamada a messaging.send_each.
+MAXIMO_POR_LLAMADA = 500  # límite de send_each
+
+
+class SinToken(Exception):
+    pass
+
+
+class EmisorFirebase:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._app = None
+
+    def app(self):
+        with self._lock:
+            if self._app is None:
+                import firebase_admin
+                from firebase_admin import credentials
+                try:
+                    self._app = firebase_admin.get_app()
+                except ValueError:
+                    self._app = firebase_admin.initialize_app(
+                        credentials.Certificate(str(settings.FIREBASE_CREDENTIALS_PATH))
+                    )
+            return self._app
+
+    def tokens(self, usuario_ids):
+        """{usuario_id: token} de los usuarios que tienen uno registrado."""
+        from firebase_admin import firestore
+
+        db = firestore.client(self.app())
+        coleccion = db.collection(settings.FIREBASE_COLECCION_USUARIOS)
+        tokens = {}
+        for documento in db.get_all([coleccion.document(str(usuario_id)) for usuario_id in set(usuario_ids)]):
+            token = (documento.to_dict() or {}).get(settings.FIREBASE_CAMPO_TOKEN) if documento.exists else None
+            if token:
+                tokens[int(documento.id)] = token
+        return tokens
+
+    def enviar_lote(self, pares):
+        """
+        [None | excepción, ...] con una entrada por (usuario_id, mensaje).
+        """
+        from firebase_admin import messaging
+
+        tokens = self.tokens([usuario_id for usuario_id, _ in pares])
+        errores = [None] * len(pares)
+        mensajes, posiciones = [], []
+        for i, (usuario_id, mensaje) in enumerate(pares):
+            if usuario_id not in tokens:
+                errores[i] = SinToken(f"El usuario {usuario_id} no tiene token FCM")
+                continue
+            mensajes.append(messaging.Message(
+                token=tokens[usuario_id],
+                notification=messaging.Notification(title=settings.NOTIFICACIONES_TITULO, body=mensaje),
+            ))
+            posiciones.append(i)
+
+        for inicio in range(0, len(mensajes), MAXIMO_POR_LLAMADA):
+            respuesta = messaging.send_each(mensajes[inicio:inicio + MAXIMO_POR_LLAMADA], app=self.app())
+            for i, resultado in zip(posiciones[inicio:inicio + MAXIMO_POR_LLAMADA], respuesta.responses):
+                if not resultado.success:
+                    errores[i] = resultado.exception
+        return errores
+
+    def __call__(self, usuario_id, mensaje):
+        error = self.enviar_lote([(usuario_id, mensaje)])[0]
+        if error is not None:
+            raise error
+
+
+emisor = EmisorFirebase()
+
+
+def enviar_notificacion(usuario_id, mensaje):
+    emisor(usuario_id, mensaje)
+
+
+# con NOTIFICACIONES_EMISOR apuntando a la función también se envía por lotes
+enviar_notificacion.enviar_lote = emisor.enviar_lote
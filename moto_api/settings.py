@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import hashlib
 import os
 from pathlib import Path
 from datetime import timedelta
@@ -64,6 +65,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'core.Usuario'
 
 MIDDLEWARE = [
+    # Primero, para medir el request completo (ver core/metricas.py)
+    'core.metricas.MetricasMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -99,35 +102,138 @@ WSGI_APPLICATION = 'moto_api.wsgi.application'
 ca_cert_env = os.getenv("AIVEN_CA_CERT")
 
 if ca_cert_env:
-    temp_ca = tempfile.NamedTemporaryFile(delete=False, suffix=".pem")
-    temp_ca.write(ca_cert_env.replace("\\n", "\n").encode())
-    temp_ca.flush()
-    CA_CERT_PATH = temp_ca.name
+    # Un archivo por contenido: se reutiliza entre imports y workers en vez
+    # de crear un temporal nuevo cada vez. Va en un directorio propio (0700,
+    # no en /tmp) y antes de usarlo se compara con el certificado: si no
+    # coincide se reescribe.
+    ca_cert = ca_cert_env.replace("\\n", "\n").encode()
+    CA_CERT_DIR = os.getenv("AIVEN_CA_DIR", os.path.join(BASE_DIR, ".certificados"))
+    os.makedirs(CA_CERT_DIR, mode=0o700, exist_ok=True)
+    CA_CERT_PATH = os.path.join(CA_CERT_DIR, f"aiven-ca-{hashlib.sha256(ca_cert).hexdigest()[:16]}.pem")
+    try:
+        with open(CA_CERT_PATH, "rb") as archivo:
+            ca_vigente = archivo.read() == ca_cert
+    except OSError:
+        ca_vigente = False
+    if not ca_vigente:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pem", dir=CA_CERT_DIR) as temp_ca:
+            temp_ca.write(ca_cert)
+        os.replace(temp_ca.name, CA_CERT_PATH)
 else:
     CA_CERT_PATH = None
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Conexiones persistentes: cada hilo de gunicorn reutiliza su conexión (y el
+# handshake TLS) durante DB_CONN_MAX_AGE segundos; con health checks se
+# descarta la que se haya cortado antes de usarla. El tamaño del "pool" por
+# worker es la cantidad de hilos (GUNICORN_THREADS, ver gunicorn.conf.py).
+#
+# DB_PERFIL elige la base:
+#   aiven (por defecto) -> MySQL remoto de producción
+#   mysql               -> MySQL local (DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD)
+#   sqlite              -> archivo SQLite local (DB_NAME), para benchmarks y pruebas
+#
+# Bajo ASGI (SERVIDOR_MODO=asgi) cada request async abre su conexión en un
+# hilo propio, así que por defecto no se mantienen conexiones persistentes.
+
+SERVIDOR_ASGI = os.getenv('SERVIDOR_MODO', 'wsgi') == 'asgi'
+
+# WhiteNoise solo sabe ser síncrono: en la cadena ASGI obligaría a adaptar
+# cada request con async_to_sync. Bajo ASGI se saca y los estáticos los sirve
+# moto_api/asgi.py antes de llegar a Django.
+MIDDLEWARE_SOLO_WSGI = ['whitenoise.middleware.WhiteNoiseMiddleware']
+if SERVIDOR_ASGI:
+    MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in MIDDLEWARE_SOLO_WSGI]
+
+DB_PERFIL = os.getenv('DB_PERFIL', 'aiven')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '0' if SERVIDOR_ASGI else '300'))
+
+if DB_PERFIL == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', str(BASE_DIR / 'local.sqlite3')),
+        }
+    }
+elif DB_PERFIL == 'mysql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.getenv('DB_NAME', 'moto_top'),
+            'USER': os.getenv('DB_USER', 'root'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', '127.0.0.1'),
+            'PORT': os.getenv('DB_PORT', '3306'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': 'moto_top',
+            'USER': 'avnadmin',
+            'PASSWORD':os.getenv('AIVEN_PASSWORD'),
+            'HOST': 'mysql-mototop-36526d8b-jonathanobregon2409-b0b4.c.aivencloud.com',
+            'PORT': '19726',
+            "OPTIONS": {
+                "ssl": {"ca": CA_CERT_PATH} if CA_CERT_PATH else {}
+             },
+        }
+    }
+
+DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
 
-DATABASES = {
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'catalogo' guarda los listados públicos de productos. Las claves llevan la
+# versión del catálogo, que está en la base (VersionCache) y comparten todos los
+# workers: con LocMemCache cada worker arma su copia, pero ninguno sirve una
+# vieja. Para compartir también el contenido usar FileBasedCache (LOCATION =
+# directorio) o RedisCache (LOCATION = redis://...).
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'moto_top',
-        'USER': 'avnadmin',
-        'PASSWORD':os.getenv('AIVEN_PASSWORD'),
-        'HOST': 'mysql-mototop-36526d8b-jonathanobregon2409-b0b4.c.aivencloud.com',
-        'PORT': '19726',
-        "OPTIONS": {
-            "ssl": {"ca": CA_CERT_PATH} if CA_CERT_PATH else {}
-         },
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalogo': {
+        'BACKEND': os.getenv('CATALOGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CATALOGO_CACHE_LOCATION', 'catalogo'),
+        'TIMEOUT': int(os.getenv('CATALOGO_CACHE_TIMEOUT', '3600')),
+    },
+    # Consultas GraphQL persistidas y resultados cacheados (ver core.consultas_graphql);
+    # como en 'catalogo', la versión de los resultados está en la base (VersionCache)
+    'graphql': {
+        'BACKEND': os.getenv('GRAPHQL_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('GRAPHQL_CACHE_LOCATION', 'graphql'),
+        'TIMEOUT': int(os.getenv('GRAPHQL_CACHE_TIMEOUT', '300')),
+    },
 }
 
+# Segundos que cada proceso reutiliza la versión leída de VersionCache (0: una
+# consulta por request); es lo que tarda otro worker en ver una invalidación.
+CACHE_VERSION_SEGUNDOS = float(os.getenv('CACHE_VERSION_SEGUNDOS', '1'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# El primero es el preferido: los hashes con otras iteraciones se actualizan en el login
+PASSWORD_HASHERS = [
+    'core.hashers.PBKDF2IteracionesHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Recomendación OWASP para PBKDF2-HMAC-SHA256 (Django 5.2 usa 1.000.000 por defecto)
+PASSWORD_PBKDF2_ITERACIONES = int(os.getenv('PASSWORD_PBKDF2_ITERACIONES', '600000'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -171,15 +277,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.JWTAuthenticationCache',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Paginación por cursor en los listados, a pedido del cliente (?page_size=...,
+    # después ?cursor=...); sin esos parámetros se devuelve el array completo
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.IdCursorPagination',
+    'PAGE_SIZE': 100,
+    # JSON con orjson (misma salida que el JSONRenderer de DRF); cada vista
+    # puede elegir otros con renderer_classes
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.RendererJSONRapido',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
+# EmailBackend extiende ModelBackend (permisos y admin incluidos); con un solo
+# backend cada login verifica la contraseña una única vez
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
     'core.backend.EmailBackend',
 ]
 
@@ -193,11 +310,120 @@ CORS_ALLOWED_ORIGINS = [
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'TOKEN_REFRESH_SERIALIZER': 'core.serializer.TokenRefreshConPerfilSerializer',
 }
 
+# Cache de Usuario / perfil para los requests autenticados (core/perfiles.py).
+# Con LocMemCache cada worker tiene la suya: el TTL acota cuánto puede quedar
+# desactualizada en los otros procesos.
+USUARIOS_CACHE_SEGUNDOS = int(os.getenv('USUARIOS_CACHE_SEGUNDOS', '60'))
+
+# Incluye rol y perfil (nombre, apellido, dni) como claims del token de acceso.
+# El servidor usa el claim solo cuando el perfil no está en la cache: si el
+# perfil cambia, un token ya emitido puede mostrar los datos viejos hasta que
+# vence (ACCESS_TOKEN_LIFETIME; el refresh arma el claim de nuevo).
+JWT_PERFIL_EN_TOKEN = os.getenv('JWT_PERFIL_EN_TOKEN', 'False') == 'True'
+
+
+# Métricas por ruta en /api/metricas/ (formato Prometheus, solo staff).
+# METRICAS_N_MAS_UNO: repeticiones de una misma consulta en un request que
+# se registran como posible N+1. METRICAS_CABECERAS agrega X-Consultas y
+# X-Tiempo-DB a cada respuesta (lo usa la suite de bench_suite).
+METRICAS_ACTIVAS = os.getenv('METRICAS_ACTIVAS', 'True') == 'True'
+METRICAS_N_MAS_UNO = int(os.getenv('METRICAS_N_MAS_UNO', '5'))
+METRICAS_CABECERAS = os.getenv('METRICAS_CABECERAS', 'False') == 'True'
+
+
+# Minutos que dura una reserva de stock sin confirmar (ver core/stock.py)
+STOCK_RESERVA_MINUTOS = int(os.getenv('STOCK_RESERVA_MINUTOS', '15'))
+
 
 FIREBASE_CREDENTIALS_PATH = BASE_DIR / "moto_api" / "firebase" / "credenciales.json"
+# Documento de Firestore con el token FCM de cada usuario (<colección>/<id>, campo)
+FIREBASE_COLECCION_USUARIOS = os.getenv('FIREBASE_COLECCION_USUARIOS', 'usuarios')
+FIREBASE_CAMPO_TOKEN = os.getenv('FIREBASE_CAMPO_TOKEN', 'fcm_token')
+
+# Outbox de notificaciones. Por defecto lo vacía un hilo de cada proceso web
+# (core.notificaciones.Despachador, arrancado desde gunicorn.conf.py) y el
+# Procfile no declara worker; con un worker aparte (python manage.py
+# despachar_notificaciones) poner NOTIFICACIONES_EN_WEB=False en el web. El
+# emisor de Firebase manda cada lote con una llamada (messaging.send_each).
+# En pruebas se puede usar 'core.notificaciones.emisor_memoria'
+NOTIFICACIONES_EMISOR = os.getenv('NOTIFICACIONES_EMISOR', 'moto_api.firebase.firebase.emisor')
+NOTIFICACIONES_TITULO = 'Moto Top'
+NOTIFICACIONES_EN_WEB = os.getenv('NOTIFICACIONES_EN_WEB', 'True') == 'True'
+NOTIFICACIONES_INTERVALO_SEGUNDOS = float(os.getenv('NOTIFICACIONES_INTERVALO_SEGUNDOS', '30'))
+NOTIFICACIONES_MAX_INTENTOS = 5
+NOTIFICACIONES_BACKOFF_SEGUNDOS = 30
+NOTIFICACIONES_LEASE_SEGUNDOS = 300
 
 GRAPHENE = {
     "SCHEMA": "core.schema.schema"
 }
+
+# Límites de /api/graphql/: costo estimado (objetos a resolver; las listas sin
+# first/last cuentan GRAPHQL_TAMANO_LISTA elementos, o lo que indique
+# GRAPHQL_TAMANO_CAMPOS para las que no se paginan) y profundidad máxima.
+# GRAPHQL_SOLO_PERSISTIDAS rechaza consultas no registradas (salvo staff); las
+# de GRAPHQL_CONSULTAS_DIR (*.graphql) quedan registradas al arrancar.
+GRAPHQL_COSTO_MAXIMO = int(os.getenv('GRAPHQL_COSTO_MAXIMO', '1000'))
+GRAPHQL_PROFUNDIDAD_MAXIMA = int(os.getenv('GRAPHQL_PROFUNDIDAD_MAXIMA', '10'))
+GRAPHQL_TAMANO_LISTA = int(os.getenv('GRAPHQL_TAMANO_LISTA', '20'))  # también la página por defecto
+# 'Tipo.campo': elementos típicos de una lista sin paginar (renglones por compra)
+GRAPHQL_TAMANO_CAMPOS = {'CompraType.productos': 5}
+GRAPHQL_PAGINA_MAXIMA = int(os.getenv('GRAPHQL_PAGINA_MAXIMA', '100'))
+GRAPHQL_SOLO_PERSISTIDAS = os.getenv('GRAPHQL_SOLO_PERSISTIDAS', 'False') == 'True'
+GRAPHQL_CONSULTAS_DIR = os.getenv('GRAPHQL_CONSULTAS_DIR')
+GRAPHQL_CACHE_RESULTADOS = os.getenv('GRAPHQL_CACHE_RESULTADOS', 'True') == 'True'
+GRAPHQL_DOCUMENTOS_EN_MEMORIA = 512
+
+# Feed de cambios de compras (/api/changes/). Los eventos se numeran al
+# confirmar (core/posiciones.py); el long-poll (?wait=) consulta la base cada
+# CAMBIOS_INTERVALO_SEGUNDOS mientras haya clientes esperando, uno por proceso.
+# Con muchos clientes en espera conviene SERVIDOR_MODO=asgi: cada espera es un
+# future del event loop y no hay tope. Bajo WSGI cada espera ocupa un hilo: se
+# admiten CAMBIOS_ESPERA_MAX_WSGI por proceso (por defecto un cuarto de
+# GUNICORN_THREADS, en total workers * hilos / 4) y el resto recibe el lote
+# sin esperar, con Retry-After CAMBIOS_REINTENTO_SEGUNDOS: esos clientes
+# quedan sondeando cada pocos segundos en lugar de recibir un error.
+CAMBIOS_INTERVALO_SEGUNDOS = float(os.getenv('CAMBIOS_INTERVALO_SEGUNDOS', '0.5'))
+CAMBIOS_LIMITE = int(os.getenv('CAMBIOS_LIMITE', '500'))
+CAMBIOS_ESPERA_MAXIMA = int(os.getenv('CAMBIOS_ESPERA_MAXIMA', '25'))
+CAMBIOS_ESPERA_MAX_WSGI = int(os.getenv(
+    'CAMBIOS_ESPERA_MAX_WSGI', max(1, int(os.getenv('GUNICORN_THREADS', '4')) // 4)
+))
+CAMBIOS_REINTENTO_SEGUNDOS = 5
+
+# Avisos de solicitudes de contacto por SSE (/api/solicitudes/stream/). El
+# broker local reparte dentro de un proceso: con varios workers
+# (WEB_CONCURRENCY, que gunicorn.conf.py deja en el entorno) cada stream además
+# vuelve a consultar el listado en cada latido (SOLICITUDES_SSE_SONDEO), así lo
+# publicado en otro worker llega con hasta SOLICITUDES_SSE_LATIDO segundos de
+# demora. 'core.avisos.BrokerRedis' lo entrega al instante entre workers.
+# El modo recomendado para este endpoint es SERVIDOR_MODO=asgi: las conexiones
+# esperan en el event loop y no hay tope. Bajo WSGI cada conexión ocupa un hilo
+# hasta SOLICITUDES_SSE_DURACION: se admiten SOLICITUDES_SSE_MAX_WSGI por worker
+# (por defecto la mitad de GUNICORN_THREADS, en total workers * hilos / 2) y el
+# resto recibe el listado con retry SOLICITUDES_SSE_SONDEO_MS: EventSource
+# reconecta solo y esas conexiones quedan sondeando hasta que haya lugar.
+SOLICITUDES_BROKER = os.getenv('SOLICITUDES_BROKER', 'core.avisos.BrokerLocal')
+SOLICITUDES_BROKER_URL = os.getenv('SOLICITUDES_BROKER_URL', 'redis://localhost:6379/0')
+SOLICITUDES_BROKER_CANAL = os.getenv('SOLICITUDES_BROKER_CANAL', 'solicitudes_contacto')
+SOLICITUDES_SSE_LATIDO = int(os.getenv('SOLICITUDES_SSE_LATIDO', '15'))
+SOLICITUDES_SSE_DURACION = int(os.getenv('SOLICITUDES_SSE_DURACION', '300'))
+SOLICITUDES_SSE_MAX_WSGI = int(os.getenv(
+    'SOLICITUDES_SSE_MAX_WSGI', max(1, int(os.getenv('GUNICORN_THREADS', '4')) // 2)
+))
+SOLICITUDES_SSE_REINTENTO_MS = 3000
+SOLICITUDES_SSE_SONDEO_MS = int(os.getenv('SOLICITUDES_SSE_SONDEO_MS', '10000'))
+SOLICITUDES_SSE_SONDEO = (
+    SOLICITUDES_BROKER == 'core.avisos.BrokerLocal' and int(os.getenv('WEB_CONCURRENCY', '1')) > 1
+)
+SOLICITUDES_SSE_BUFFER = 100
+
+# Sincronización incremental de los clientes sin conexión (/api/sync/). Los
+# borrados se conservan SINCRONIZACION_BORRADOS_DIAS (purgar_borrados); un
+# token más viejo tiene que sincronizar desde cero.
+SINCRONIZACION_LIMITE = int(os.getenv('SINCRONIZACION_LIMITE', '1000'))
+SINCRONIZACION_LOTE_MAXIMO = int(os.getenv('SINCRONIZACION_LOTE_MAXIMO', '500'))
+SINCRONIZACION_BORRADOS_DIAS = int(os.getenv('SINCRONIZACION_BORRADOS_DIAS', '90'))